@@ -0,0 +1,65 @@
+# (C) British Crown Copyright 2011 - 2012, Met Office
+#
+# This file is part of cartopy.
+#
+# cartopy is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cartopy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with cartopy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measures the per-line overhead of cartopy.trace.project_linear for short
+lines, with the prepared projection domain cached on the projection and
+with it re-prepared for every line (as it used to be).
+
+Usage::
+
+    python benchmarks/project_line_overhead.py [n_lines]
+
+"""
+import sys
+import time
+
+import numpy
+import shapely.geometry as sgeom
+
+import cartopy.crs as ccrs
+import cartopy.trace
+
+
+def per_line_time(projection, lines, src_crs, reprepare):
+    start = time.time()
+    for line in lines:
+        if reprepare:
+            projection.__dict__.pop('_prepared_domains', None)
+        cartopy.trace.project_linear(line, src_crs, projection)
+    return (time.time() - start) / len(lines)
+
+
+def main(n_lines=2000):
+    lons = numpy.random.uniform(-170, 170, n_lines)
+    lats = numpy.random.uniform(-80, 80, n_lines)
+    lines = [sgeom.LineString([(lon, lat), (lon + 0.5, lat + 0.5)])
+             for lon, lat in zip(lons, lats)]
+
+    for projection in [ccrs.PlateCarree(), ccrs.Robinson(),
+                       ccrs.InterruptedGoodeHomolosine()]:
+        src_crs = projection.as_geodetic()
+        n_vertices = len(projection.boundary.coords)
+        before = per_line_time(projection, lines, src_crs, True)
+        after = per_line_time(projection, lines, src_crs, False)
+        print('{:28s} ({:4d} boundary vertices): {:8.1f}us/line re-prepared,'
+              ' {:8.1f}us/line cached'.format(type(projection).__name__,
+                                              n_vertices, before * 1e6,
+                                              after * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
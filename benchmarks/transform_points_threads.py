@@ -0,0 +1,68 @@
+# (C) British Crown Copyright 2011 - 2012, Met Office
+#
+# This file is part of cartopy.
+#
+# cartopy is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# cartopy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with cartopy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measures how CRS.transform_points scales with the number of threads for
+a Mercator to PlateCarree transformation.
+
+Usage::
+
+    python benchmarks/transform_points_threads.py [n_points] [max_threads]
+
+"""
+import multiprocessing
+import sys
+import time
+
+import numpy
+
+import cartopy.crs as ccrs
+
+
+def best_time(func, repeats=3):
+    times = []
+    for _ in range(repeats):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def main(n_points=10 ** 7, max_threads=None):
+    if max_threads is None:
+        max_threads = multiprocessing.cpu_count()
+
+    merc = ccrs.Mercator()
+    pc = ccrs.PlateCarree()
+    x = numpy.random.uniform(-180, 180, n_points)
+    y = numpy.random.uniform(-150, 150, n_points)
+    out = numpy.empty((n_points, 3))
+
+    print('{} points, Mercator -> PlateCarree'.format(n_points))
+    serial = None
+    threads = 1
+    while threads <= max_threads:
+        elapsed = best_time(lambda: pc.transform_points(merc, x, y, out=out,
+                                                        threads=threads))
+        if serial is None:
+            serial = elapsed
+        print('{:3d} thread(s): {:7.3f}s  speed-up {:5.2f}x'.format(
+            threads, elapsed, serial / elapsed))
+        threads *= 2
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -18,6 +18,27 @@
 
 cdef extern from "proj_api.h":
     ctypedef void *projPJ
+    ctypedef void *projCtx
+
+
+cdef class _Proj4Context:
+    """
+    Owns a proj.4 context, which is freed when it is collected.
+
+    """
+
+    cdef projCtx ctx
+
+
+cdef class _Proj4Handle:
+    """
+    Owns a proj.4 projPJ, which is freed when the handle is collected.
+
+    """
+
+    cdef projPJ proj
+    # The context the projPJ belongs to, if not the default one.
+    cdef _Proj4Context context
 
 
 cdef class CRS:
@@ -27,7 +48,11 @@ cdef class CRS:
     """
 
     cdef projPJ proj4
+    cdef _Proj4Handle _handle
     cdef readonly proj4_init
     cdef proj4_params
 
     cpdef is_geodetic(self)
+
+
+cdef projPJ _thread_proj4(CRS crs) except NULL
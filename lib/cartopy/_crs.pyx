@@ -16,6 +16,9 @@
 # along with cartopy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import math
+import threading
+
 import numpy as np
 
 cimport numpy as np
@@ -24,9 +27,14 @@ cimport numpy as np
 from cython.operator cimport dereference as deref
 
 
-cdef extern from "proj_api.h":
+cdef extern from "proj_api.h" nogil:
     ctypedef void *projPJ
+    ctypedef void *projCtx
     projPJ pj_init_plus(char *)
+    projPJ pj_init_plus_ctx(projCtx, char *)
+    projCtx pj_ctx_alloc()
+    void pj_ctx_free(projCtx)
+    int pj_ctx_get_errno(projCtx)
     void pj_free(projPJ)
     int pj_transform(projPJ, projPJ, long, int, double *, double *, double *)
     int pj_is_latlong(projPJ)
@@ -37,17 +45,455 @@ cdef extern from "proj_api.h":
 
 
 cdef double NAN = float('nan')
+cdef double HUGE_VAL = float('inf')
+
+# The pj_transform status codes which only indicate that some of the
+# points could not be transformed. proj.4 marks those points with HUGE_VAL
+# and carries on with the rest, unless only a single point was given.
+_TRANSIENT_ERRORS = frozenset([-6, -14, -15, -17, -18, -19, -20, -27, 33, 34])
 
 
 class Proj4Error(Exception):
-    def __init__(self):
-        cdef int status
-        status = deref(pj_get_errno_ref())
+    def __init__(self, status=None):
+        if status is None:
+            status = deref(pj_get_errno_ref())
         msg = 'Error from proj.4: {}'.format(pj_strerrno(status))
         self.status = status
         Exception.__init__(self, msg)
 
 
+cdef class _Proj4Context:
+    def __cinit__(self):
+        self.ctx = pj_ctx_alloc()
+
+    def __dealloc__(self):
+        if self.ctx != NULL:
+            pj_ctx_free(self.ctx)
+
+
+cdef class _Proj4Handle:
+    def __dealloc__(self):
+        if self.proj != NULL:
+            pj_free(self.proj)
+
+
+# The process-wide registry of proj.4 handles, keyed on the canonical
+# proj4 initialisation string. Handles are never freed once registered,
+# as the number of distinct CRS definitions in a session is small.
+_HANDLES = {}
+_HANDLE_STATS = {'created': 0, 'reused': 0}
+
+
+cdef _Proj4Handle _proj4_handle(proj4_init):
+    cdef _Proj4Handle handle = _HANDLES.get(proj4_init)
+    if handle is None:
+        handle = _Proj4Handle()
+        handle.proj = pj_init_plus(proj4_init)
+        if not handle.proj:
+            raise Proj4Error()
+        _HANDLES[proj4_init] = handle
+        _HANDLE_STATS['created'] += 1
+    else:
+        _HANDLE_STATS['reused'] += 1
+    return handle
+
+
+# Each thread's proj.4 context and handles, for code which runs without
+# the GIL. (The shared handles from the registry are not thread-safe.)
+_thread_state = threading.local()
+
+
+cdef projPJ _thread_proj4(CRS crs) except NULL:
+    """
+    Returns the calling thread's proj.4 handle for the given CRS, which
+    remains valid for the lifetime of the thread.
+
+    """
+    cdef _Proj4Handle handle
+    try:
+        handles = _thread_state.handles
+    except AttributeError:
+        handles = _thread_state.handles = {}
+        _thread_state.context = _Proj4Context()
+    handle = handles.get(crs.proj4_init)
+    if handle is None:
+        handle = _Proj4Handle()
+        handle.context = _thread_state.context
+        handle.proj = pj_init_plus_ctx(handle.context.ctx, crs.proj4_init)
+        if not handle.proj:
+            raise Proj4Error(pj_ctx_get_errno(handle.context.ctx))
+        handles[crs.proj4_init] = handle
+    return handle.proj
+
+
+# The number of threads used by transform_points when none is specified.
+_default_threads = 1
+
+# The smallest number of points worth handing to a separate thread.
+_MIN_POINTS_PER_THREAD = 50000
+
+
+def set_default_threads(threads):
+    """
+    Sets the number of threads used by :meth:`CRS.transform_points` when
+    its ``threads`` keyword is not given. The default is 1.
+
+    """
+    global _default_threads
+    if threads < 1:
+        raise ValueError('The number of threads must be at least 1.')
+    _default_threads = int(threads)
+
+
+def get_default_threads():
+    """
+    Returns the number of threads used by :meth:`CRS.transform_points`
+    when its ``threads`` keyword is not given.
+
+    """
+    return _default_threads
+
+
+cdef int _transform_block(src_init, dest_init,
+                          np.ndarray[np.double_t, ndim=2] result,
+                          long start, long stop):
+    """
+    Transforms the rows start:stop of the (N, 3) result array in place,
+    using a private proj.4 context and handles so that the GIL can be
+    released. (The shared handles from the registry are not thread-safe.)
+
+    Returns the status of pj_transform.
+
+    """
+    cdef:
+        char *c_src_init = src_init
+        char *c_dest_init = dest_init
+        long npts = stop - start
+        double *x = &result[start, 0]
+        double *y = &result[start, 1]
+        double *z = &result[start, 2]
+        projCtx ctx
+        projPJ src_proj
+        projPJ dest_proj
+        int status
+
+    with nogil:
+        ctx = pj_ctx_alloc()
+        src_proj = pj_init_plus_ctx(ctx, c_src_init)
+        dest_proj = pj_init_plus_ctx(ctx, c_dest_init)
+        if src_proj != NULL and dest_proj != NULL:
+            status = pj_transform(src_proj, dest_proj, npts, 3, x, y, z)
+        else:
+            status = pj_ctx_get_errno(ctx)
+        if src_proj != NULL:
+            pj_free(src_proj)
+        if dest_proj != NULL:
+            pj_free(dest_proj)
+        pj_ctx_free(ctx)
+    return status
+
+
+def _transform_block_worker(src_init, dest_init, result, start, stop,
+                            statuses, index):
+    statuses[index] = _transform_block(src_init, dest_init, result,
+                                       start, stop)
+
+
+cdef int _threaded_transform(CRS src_crs, CRS dest_crs,
+                             np.ndarray[np.double_t, ndim=2] result,
+                             int threads):
+    """
+    Splits the (N, 3) result array into one block per thread and
+    transforms the blocks concurrently.
+
+    Returns the first non-zero status from pj_transform, or 0.
+
+    """
+    npts = result.shape[0]
+    bounds = [npts * i // threads for i in range(threads + 1)]
+    statuses = [0] * threads
+    workers = []
+    for i in range(1, threads):
+        worker = threading.Thread(target=_transform_block_worker,
+                                  args=(src_crs.proj4_init,
+                                        dest_crs.proj4_init, result,
+                                        bounds[i], bounds[i + 1],
+                                        statuses, i))
+        worker.start()
+        workers.append(worker)
+    # Make use of the calling thread for the first block.
+    statuses[0] = _transform_block(src_crs.proj4_init, dest_crs.proj4_init,
+                                   result, bounds[0], bounds[1])
+    for worker in workers:
+        worker.join()
+    for status in statuses:
+        if status:
+            return status
+    return 0
+
+
+cdef void _finalise_points(np.ndarray[np.double_t, ndim=2] result,
+                           double scale,
+                           np.ndarray[np.uint8_t, ndim=1] valid,
+                           bint nan_invalid):
+    """
+    Scales the x and y values of the (N, 3) result array, and records
+    which of the points were transformed successfully.
+
+    """
+    cdef:
+        Py_ssize_t i
+        double px, py
+        bint ok
+    for i in range(result.shape[0]):
+        px = result[i, 0]
+        py = result[i, 1]
+        # Failed points are marked with HUGE_VAL, but NaN can also be
+        # produced by some of the projections.
+        ok = (px == px and py == py and
+              px != HUGE_VAL and px != -HUGE_VAL and
+              py != HUGE_VAL and py != -HUGE_VAL)
+        valid[i] = ok
+        if ok or not nan_invalid:
+            result[i, 0] = px * scale
+            result[i, 1] = py * scale
+        else:
+            result[i, 0] = result[i, 1] = NAN
+
+
+def _is_column(array, out, column):
+    """
+    Returns whether the array is exactly the given column of the last
+    axis of out, i.e. the same memory viewed in the same way.
+
+    """
+    view = out[..., column]
+    return (array.shape == view.shape and array.strides == view.strides and
+            array.__array_interface__['data'][0] ==
+            view.__array_interface__['data'][0])
+
+
+# Whether transform_points may use the closed-form implementations of
+# the simplest CRSs instead of proj.4.
+_fast_paths_enabled = True
+
+# The closed-form kernels (or None) for each pair of proj4 definitions.
+_FAST_KERNELS = {}
+
+# proj.4's tolerances, in degrees.
+_SPI = math.degrees(3.14159265359)
+_MAX_LON = math.degrees(10.)
+_LAT_EPS = math.degrees(1e-12)
+
+_LATLONG_NAMES = frozenset(['lonlat', 'latlong', 'longlat', 'latlon'])
+
+
+def set_fast_paths(enabled):
+    """
+    Sets whether :meth:`CRS.transform_points` may bypass proj.4 for pairs
+    of CRSs with a closed-form relationship. Disabling the fast paths is
+    useful for validating their results against proj.4.
+
+    The fast paths are enabled by default, and cover transformations
+    between Geodetic, PlateCarree, RotatedPole and RotatedGeodetic.
+
+    """
+    global _fast_paths_enabled
+    _fast_paths_enabled = bool(enabled)
+
+
+def fast_paths_enabled():
+    """
+    Returns whether :meth:`CRS.transform_points` may bypass proj.4 for
+    pairs of CRSs with a closed-form relationship.
+
+    """
+    return _fast_paths_enabled
+
+
+def _adjlon(lon):
+    """Wraps finite longitudes into [-180, 180] in place, as adjlon does."""
+    wrap = np.abs(lon) > _SPI
+    wrap &= np.isfinite(lon)
+    if wrap.any():
+        lon[wrap] = (lon[wrap] + 180) % 360 - 180
+
+
+def _check_lonlat(lon, lat):
+    """Marks the points which pj_fwd would refuse with HUGE_VAL."""
+    bad = (np.abs(lat) - 90 > _LAT_EPS) | (np.abs(lon) > _MAX_LON)
+    if bad.any():
+        lon[bad] = HUGE_VAL
+        lat[bad] = HUGE_VAL
+
+
+def _check_xy(x, y):
+    """Marks the points which pj_inv would refuse with HUGE_VAL."""
+    bad = np.isinf(x) | np.isinf(y)
+    if bad.any():
+        x[bad] = HUGE_VAL
+        y[bad] = HUGE_VAL
+
+
+def _aatan2(n, d):
+    """proj.4's atan2, which is zero when both arguments are tiny."""
+    result = np.arctan2(n, d)
+    result[(np.abs(n) < 1e-50) & (np.abs(d) < 1e-50)] = 0
+    return result
+
+
+def _plate_carree_forward(lon, lat, lon_0):
+    _check_lonlat(lon, lat)
+    lon -= lon_0
+    _adjlon(lon)
+
+
+def _plate_carree_inverse(x, y, lon_0):
+    _check_xy(x, y)
+    x += lon_0
+    _adjlon(x)
+
+
+def _rotated_pole_forward(lon, lat, lon_0, pole_latitude):
+    _check_lonlat(lon, lat)
+    lon -= lon_0
+    _adjlon(lon)
+    lam = np.deg2rad(lon)
+    phi = np.deg2rad(lat)
+    sphip = math.sin(math.radians(pole_latitude))
+    cphip = math.cos(math.radians(pole_latitude))
+    coslam = np.cos(lam)
+    cosphi = np.cos(phi)
+    sinphi = np.sin(phi)
+    lon[...] = np.rad2deg(_aatan2(cosphi * np.sin(lam),
+                                  sphip * cosphi * coslam + cphip * sinphi))
+    lat[...] = np.rad2deg(np.arcsin(np.clip(
+        sphip * sinphi - cphip * cosphi * coslam, -1, 1)))
+
+
+def _rotated_pole_inverse(x, y, lon_0, pole_latitude):
+    _check_xy(x, y)
+    lam = np.deg2rad(x)
+    phi = np.deg2rad(y)
+    sphip = math.sin(math.radians(pole_latitude))
+    cphip = math.cos(math.radians(pole_latitude))
+    coslam = np.cos(lam)
+    cosphi = np.cos(phi)
+    sinphi = np.sin(phi)
+    x[...] = np.rad2deg(_aatan2(cosphi * np.sin(lam),
+                                sphip * cosphi * coslam - cphip * sinphi))
+    y[...] = np.rad2deg(np.arcsin(np.clip(
+        sphip * sinphi + cphip * cosphi * coslam, -1, 1)))
+    x += lon_0
+    _adjlon(x)
+
+
+def _closed_form(params):
+    """
+    Returns the (forward, inverse) functions which implement the CRS with
+    the given proj4 parameters in closed form, or None if there are none.
+    The functions convert between longitude/latitude and native
+    coordinates, in place. Geodetic CRSs have no functions at all.
+
+    """
+    keys = set(params)
+    proj = params.get('proj')
+    if proj in _LATLONG_NAMES and keys <= set(['proj', 'ellps', 'datum']):
+        return None, None
+    if (proj == 'eqc' and keys <= set(['proj', 'lon_0', 'a', 'ellps']) and
+            params.get('a') == math.degrees(1)):
+        # NB. eqc ignores the eccentricity of the ellipse.
+        lon_0 = float(params.get('lon_0', 0))
+        return (lambda lon, lat: _plate_carree_forward(lon, lat, lon_0),
+                lambda x, y: _plate_carree_inverse(x, y, lon_0))
+    if (proj == 'ob_tran' and params.get('o_proj') in _LATLONG_NAMES and
+            keys <= set(['proj', 'o_proj', 'o_lon_p', 'o_lat_p', 'lon_0',
+                         'to_meter', 'ellps', 'datum']) and
+            params.get('o_lon_p', 0) == 0 and 'o_lat_p' in params and
+            params.get('to_meter') == math.radians(1)):
+        lon_0 = float(params.get('lon_0', 0))
+        pole_latitude = float(params['o_lat_p'])
+        return (lambda lon, lat: _rotated_pole_forward(lon, lat, lon_0,
+                                                       pole_latitude),
+                lambda x, y: _rotated_pole_inverse(x, y, lon_0,
+                                                   pole_latitude))
+    return None
+
+
+def _datum_shift(src_params, dest_params):
+    """
+    Returns whether proj.4 would apply a datum shift between the CRSs
+    with the given proj4 parameters.
+
+    """
+    # proj.4 only applies a datum shift when both datums are known.
+    src_datum = src_params.get('datum')
+    dest_datum = dest_params.get('datum')
+    return not (src_datum is None or dest_datum is None or
+                (src_datum == dest_datum and
+                 src_params.get('ellps') == dest_params.get('ellps')))
+
+
+def _separable(CRS src_crs, CRS dest_crs):
+    """
+    Returns whether the transformation from src_crs to dest_crs maps x
+    and y independently, i.e. whether a grid transforms to a grid.
+
+    """
+    return (getattr(src_crs, '_separable', False) and
+            getattr(dest_crs, '_separable', False) and
+            not _datum_shift(src_crs.proj4_params, dest_crs.proj4_params))
+
+
+def _fast_kernel(CRS src_crs, CRS dest_crs):
+    """
+    Returns a function which transforms the x and y columns of the
+    (N, 3) result array in place from src_crs to dest_crs, or None if
+    the transformation must be done by proj.4.
+
+    """
+    key = (src_crs.proj4_init, dest_crs.proj4_init)
+    try:
+        return _FAST_KERNELS[key]
+    except KeyError:
+        pass
+
+    kernel = None
+    src_params = src_crs.proj4_params
+    dest_params = dest_crs.proj4_params
+    src_funcs = _closed_form(src_params)
+    dest_funcs = _closed_form(dest_params)
+    if (src_funcs is not None and dest_funcs is not None and
+            not _datum_shift(src_params, dest_params)):
+        inverse = src_funcs[1]
+        forward = dest_funcs[0]
+
+        def kernel(result):
+            x = result[:, 0]
+            y = result[:, 1]
+            if inverse is not None:
+                inverse(x, y)
+            if forward is not None:
+                forward(x, y)
+
+    _FAST_KERNELS[key] = kernel
+    return kernel
+
+
+def proj4_handle_stats():
+    """
+    Returns a dictionary describing the use of the shared proj.4 handles.
+
+    The dictionary contains the number of handles ``created``, the number
+    of times an existing handle was ``reused`` by a new CRS instance, and
+    the number of handles currently ``registered``.
+
+    """
+    stats = dict(_HANDLE_STATS)
+    stats['registered'] = len(_HANDLES)
+    return stats
+
+
 cdef class CRS:
     """
     Defines a Coordinate Reference System using proj.4.
@@ -58,12 +504,28 @@ cdef class CRS:
         # Use WGS84 ellipse if one is not specified in proj4_params
         if 'ellps' not in self.proj4_params:
             self.proj4_params['ellps'] = 'WGS84'
+        # Sort the parameters so that equivalent CRSs share a proj.4 handle.
         init_items = ['+{}={}'.format(k, v) for
-                      k, v in self.proj4_params.iteritems()]
+                      k, v in sorted(self.proj4_params.iteritems())]
         self.proj4_init = ' '.join(init_items)
-        self.proj4 = pj_init_plus(self.proj4_init)
-        if not self.proj4:
-            raise Proj4Error()
+        self._handle = _proj4_handle(self.proj4_init)
+        self.proj4 = self._handle.proj
+
+    def __eq__(self, other):
+        # XXX handle params that have been set to the default value on one, but not the other?
+        if not isinstance(other, CRS):
+            return NotImplemented
+        return (isinstance(self, type(other)) and
+                self.proj4_params == (<CRS>other).proj4_params)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(frozenset(self.proj4_params.iteritems()))
 
     def __reduce__(self):
         return self.__class__, tuple()
@@ -128,58 +590,186 @@ cdef class CRS:
             cx *= DEG_TO_RAD
             cy *= DEG_TO_RAD
         status = pj_transform(src_crs.proj4, self.proj4, 1, 1, &cx, &cy, NULL);
-        #if status == -14 or status == -20:
-            # -14 => "latitude or longitude exceeded limits"
-            # -20 => "tolerance condition error"
-        #    cx = cy = NAN
-        #elif status != 0:
-        #    raise Proj4Error()
+        if status in _TRANSIENT_ERRORS:
+            # e.g. -14 => "latitude or longitude exceeded limits"
+            #      -20 => "tolerance condition error"
+            cx = cy = NAN
+        elif status != 0:
+            raise Proj4Error(status)
         if self.is_geodetic():
             cx *= RAD_TO_DEG
             cy *= RAD_TO_DEG
         return (cx, cy)
 
-    def transform_points(self, CRS src_crs not None, 
-                                np.ndarray x not None, 
-                                np.ndarray y not None, 
-                                np.ndarray z=None):
+    def transform_points(self, CRS src_crs not None,
+                                np.ndarray x not None,
+                                np.ndarray y not None,
+                                np.ndarray z=None,
+                                np.ndarray out=None,
+                                threads=None,
+                                bint nan_invalid=False,
+                                bint return_valid=False):
+        """
+        Transforms the given coordinates, in the given source coordinate
+        system, into this coordinate system.
 
-        cdef np.ndarray[np.double_t, ndim=2] result
-        
+        Args:
 
-        if z is None:
-            if x.ndim != 1 or y.ndim != 1:
-                raise ValueError('x and y arrays must be one dimensional')
-            if x.shape[0] != y.shape[0]:
-                raise ValueError('x and y arrays must have the same length')
-        else:
-            if x.ndim != 1 or y.ndim != 1 or z.ndim != 1:
-                raise ValueError('x, y and z arrays must be one dimensional')
-            if not x.shape[0] == y.shape[0] == z.shape[0]:
-                raise ValueError('x, y, and z arrays must have the same length')
+            * src_crs - The CRS of the given coordinates.
+            * x, y    - Arrays of the source x and y coordinates. They may
+                        be of any (matching) shape, memory layout and
+                        numeric dtype.
 
-        npts = x.shape[0]
+        Kwargs:
 
-        result = np.empty([npts, 3], dtype=np.double)
-        result[:, 0] = x
-        result[:, 1] = y
-        if z is None:
-            result[:, 2] = 0
-        else:
-            result[:, 2] = z
+            * z       - Array of the source z coordinates, with the same
+                        shape as x and y.
+            * out     - A C-contiguous float64 array of shape
+                        ``x.shape + (3,)`` into which the result is
+                        written, avoiding the allocation of a new array.
+                        x, y and z may be views of it, e.g. to transform
+                        a previous result back in place.
+            * threads - The number of threads over which to divide the
+                        transformation. Each thread uses its own proj.4
+                        context and releases the GIL. Defaults to the
+                        value given to :func:`set_default_threads`.
+            * nan_invalid - Whether to set the coordinates of points which
+                        could not be transformed to NaN. By default they
+                        are left as infinity, as reported by proj.4.
+            * return_valid - Whether to also return a boolean array, of
+                        the same shape as x, which is True for the points
+                        that were transformed successfully.
+
+        Returns:
+            An array of shape ``x.shape + (3,)`` containing the x, y and z
+            coordinates in this coordinate system. If ``out`` was given,
+            it is returned. If ``return_valid`` is True, the tuple of this
+            array and the validity array is returned instead.
 
-        if src_crs.is_geodetic():
-            result = np.deg2rad(result)
+        """
+        cdef np.ndarray[np.double_t, ndim=2] result
+        cdef np.ndarray[np.uint8_t, ndim=1] valid_flags
 
-        status = pj_transform(src_crs.proj4, self.proj4, npts, 3,
-                              &result[0, 0], &result[0, 1], &result[0, 2]);
-                              
-        if self.is_geodetic():
-            result = np.rad2deg(result)
-        #if status:
-        #    raise Proj4Error()
+        if z is None:
+            if x.shape != y.shape:
+                raise ValueError('x and y arrays must have the same shape')
+        elif not x.shape == y.shape == z.shape:
+            raise ValueError('x, y, and z arrays must have the same shape')
+
+        shape = x.shape + (3,)
+        if out is None:
+            out = np.empty(shape, dtype=np.double)
+        elif (out.shape != shape or out.dtype != np.double or
+                not out.flags.c_contiguous):
+            raise ValueError('out must be a C-contiguous float64 array '
+                             'of shape {}'.format(shape))
+
+        # Copying into the output buffer takes care of any casting from
+        # other dtypes and non-contiguous input. NB. x and y may already
+        # be views of out, in which case these are no-ops. Any other view
+        # of out (e.g. y of the x column) would be overwritten before it
+        # is read, so is copied first.
+        if np.may_share_memory(y, out) and not _is_column(y, out, 1):
+            y = y.copy()
+        if (z is not None and np.may_share_memory(z, out) and
+                not _is_column(z, out, 2)):
+            z = z.copy()
+        out[..., 0] = x
+        out[..., 1] = y
+        if z is None:
+            out[..., 2] = 0
+        else:
+            out[..., 2] = z
+
+        # A view of the (contiguous) output buffer with one point per row.
+        result = out.reshape(-1, 3)
+        npts = result.shape[0]
+        if npts == 0:
+            if return_valid:
+                return out, np.empty(x.shape, dtype=np.bool_)
+            return out
+
+        kernel = _fast_kernel(src_crs, self) if _fast_paths_enabled else None
+        if kernel is not None:
+            kernel(result)
+            scale = 1.0
+        else:
+            if src_crs.is_geodetic():
+                np.multiply(result[:, :2], DEG_TO_RAD, result[:, :2])
+
+            if threads is None:
+                threads = _default_threads
+            threads = min(threads, npts // _MIN_POINTS_PER_THREAD)
+            if threads > 1:
+                status = _threaded_transform(src_crs, self, result, threads)
+            else:
+                status = pj_transform(src_crs.proj4, self.proj4, npts, 3,
+                                      &result[0, 0], &result[0, 1],
+                                      &result[0, 2]);
+            if status in _TRANSIENT_ERRORS:
+                if npts == 1:
+                    # proj.4 gives up on a lone point instead of marking it.
+                    result[0, 0] = result[0, 1] = HUGE_VAL
+            elif status != 0:
+                raise Proj4Error(status)
+
+            scale = RAD_TO_DEG if self.is_geodetic() else 1.0
+        if nan_invalid or return_valid:
+            # Scale the result and check the validity of each point in a
+            # single pass.
+            valid = np.empty(x.shape, dtype=np.bool_)
+            valid_flags = valid.reshape(-1).view(np.uint8)
+            _finalise_points(result, scale, valid_flags, nan_invalid)
+        elif scale != 1.0:
+            np.multiply(result[:, :2], scale, result[:, :2])
+
+        return (out, valid) if return_valid else out
+
+    def transform_grid(self, CRS src_crs not None, x, y,
+                       bint return_valid=False):
+        """
+        Transforms the grid of points defined by the 1d arrays of source x
+        and y coordinates into this coordinate system.
+
+        This is equivalent to transforming the points of
+        ``numpy.meshgrid(x, y)``, but when x depends only on longitude and
+        y only on latitude in both coordinate systems (e.g. Geodetic,
+        PlateCarree and Mercator) only the ``len(x) + len(y)`` axis values
+        are transformed.
+
+        Returns:
+            An array of shape ``(len(y), len(x), 3)``, and the validity
+            array if ``return_valid`` is True, as for
+            :meth:`transform_points`. In the separable case, only the
+            coordinate of an axis value which fails to transform is
+            HUGE_VAL, so that the other coordinate of each invalid point
+            is still that of its valid axis value.
 
-        return result
+        """
+        x = np.asanyarray(x, dtype=np.double)
+        y = np.asanyarray(y, dtype=np.double)
+        if x.ndim != 1 or y.ndim != 1:
+            raise ValueError('x and y must be 1d arrays')
+
+        if not _separable(src_crs, self):
+            xx, yy = np.meshgrid(x, y)
+            return self.transform_points(src_crs, xx, yy,
+                                         return_valid=return_valid)
+
+        # NB. The origin of each separable CRS is on the equator.
+        xs = self.transform_points(src_crs, x, np.zeros_like(x))[:, 0]
+        ys = self.transform_points(src_crs, np.zeros_like(y), y)[:, 1]
+        x_valid = np.isfinite(xs)
+        y_valid = np.isfinite(ys)
+        xs[~x_valid] = HUGE_VAL
+        ys[~y_valid] = HUGE_VAL
+        out = np.zeros((y.size, x.size, 3), dtype=np.double)
+        out[..., 0] = xs[np.newaxis, :]
+        out[..., 1] = ys[:, np.newaxis]
+        if not return_valid:
+            return out
+        # A point is only valid if both of its axis values are.
+        return out, x_valid[np.newaxis, :] & y_valid[:, np.newaxis]
 
 
 class Geodetic(CRS):
@@ -190,6 +780,9 @@ class Geodetic(CRS):
     NB. Coordinates are measured in degrees.
 
     """
+    # See Projection._separable.
+    _separable = True
+
     # XXX Providing a default datum is bad. Providing the ellipse on its own is sufficient to define the ellipse, 
     # and in some cases, can overwrite the desired, well defined ellipse.
     def __init__(self, ellipse='WGS84', datum='WGS84'):
@@ -18,11 +18,14 @@
 */
 
 
+#include <algorithm>
 #include <iostream>
 #include <list>
 #include <vector>
 
 #include <math.h>
+#include <stdarg.h>
+#include <stdio.h>
 
 #include <_trace.h>
 
@@ -33,6 +36,36 @@ void Interpolator::set_line(Point &start, Point &end)
     m_end = end;
 }
 
+void Interpolator::project_points(const Point *src, Point *dest,
+                                  unsigned int n)
+{
+    for (unsigned int i = 0; i < n; i++)
+    {
+        Point point = src[i];
+        dest[i] = project(point);
+    }
+}
+
+// Transforms the n points in place with a single call to pj_transform,
+// returning false if that failed for any reason other than some of the
+// points being outside the projection.
+static bool transform_points(projPJ src_proj, projPJ dest_proj,
+                             Point *points, unsigned int n)
+{
+    // NB. For more than one point, pj_transform marks the points which
+    // can't be projected with HUGE_VAL, rather than failing.
+    int status = pj_transform(src_proj, dest_proj, n, 2,
+                              &points[0].x, &points[0].y, NULL);
+    if (n == 1 && (status == -14 || status == -20))
+    {
+        // -14 => "latitude or longitude exceeded limits"
+        // -20 => "tolerance condition error"
+        points[0].x = points[0].y = HUGE_VAL;
+        status = 0;
+    }
+    return status == 0;
+}
+
 
 CartesianInterpolator::CartesianInterpolator(projPJ src_proj, projPJ dest_proj)
 {
@@ -43,6 +76,8 @@ CartesianInterpolator::CartesianInterpolator(projPJ src_proj, projPJ dest_proj)
 Point CartesianInterpolator::interpolate(double t)
 {
     Point xy;
+    if (m_stats)
+        m_stats->interpolate_calls++;
     xy.x = m_start.x + (m_end.x - m_start.x) * t;
     xy.y = m_start.y + (m_end.y - m_start.y) * t;
     return project(xy);
@@ -53,6 +88,9 @@ Point CartesianInterpolator::project(Point &src_xy)
     Point dest_xy;
     projLP xy;
 
+    if (m_stats)
+        m_stats->project_calls++;
+
     xy.u = src_xy.x;
     xy.v = src_xy.y;
 
@@ -77,6 +115,23 @@ Point CartesianInterpolator::project(Point &src_xy)
     return dest_xy;
 }
 
+void CartesianInterpolator::project_points(const Point *src, Point *dest,
+                                           unsigned int n)
+{
+    if (n == 0)
+        return;
+    std::copy(src, src + n, dest);
+    if (m_stats)
+        m_stats->project_calls += n;
+    if (!transform_points(m_src_proj, m_dest_proj, dest, n))
+    {
+        // Let project() deal with the problem point.
+        if (m_stats)
+            m_stats->project_calls -= n;
+        Interpolator::project_points(src, dest, n);
+    }
+}
+
 
 SphericalInterpolator::SphericalInterpolator(projPJ src_proj, projPJ dest_proj)
 {
@@ -141,6 +196,9 @@ Point SphericalInterpolator::interpolate(double t)
 {
     Point lonlat;
 
+    if (m_stats)
+        m_stats->interpolate_calls++;
+
     if (m_angle == 0.0)
     {
         lonlat = m_start;
@@ -182,6 +240,9 @@ Point SphericalInterpolator::project(Point &lonlat)
     Point xy;
     projLP dest;
 
+    if (m_stats)
+        m_stats->project_calls++;
+
     //std::cerr << "lon/lat: " << lonlat.x << ", " << lonlat.y;
 
     dest.u = lonlat.x * DEG_TO_RAD;
@@ -213,6 +274,329 @@ Point SphericalInterpolator::project(Point &lonlat)
     return xy;
 }
 
+void SphericalInterpolator::project_points(const Point *src, Point *dest,
+                                           unsigned int n)
+{
+    if (n == 0)
+        return;
+    for (unsigned int i = 0; i < n; i++)
+    {
+        dest[i].x = src[i].x * DEG_TO_RAD;
+        dest[i].y = src[i].y * DEG_TO_RAD;
+    }
+    if (m_stats)
+        m_stats->project_calls += n;
+    if (!transform_points(m_src_proj, m_dest_proj, dest, n))
+    {
+        // Let project() deal with the problem point.
+        if (m_stats)
+            m_stats->project_calls -= n;
+        Interpolator::project_points(src, dest, n);
+    }
+}
+
+
+static void geos_notice(const char *fmt, ...)
+{
+}
+
+static void geos_error(const char *fmt, ...)
+{
+    va_list args;
+    va_start(args, fmt);
+    fprintf(stderr, "GEOS error: ");
+    vfprintf(stderr, fmt, args);
+    fprintf(stderr, "\n");
+    va_end(args);
+}
+
+GEOSContextHandle_t _new_geos_context()
+{
+    return initGEOS_r(geos_notice, geos_error);
+}
+
+
+// The z component of (b - a) x (c - a), which is positive when c is to
+// the left of the line from a to b.
+static inline double cross(const Point &a, const Point &b, const Point &c)
+{
+    return (b.x - a.x) * (c.y - a.y) - (b.y - a.y) * (c.x - a.x);
+}
+
+Domain::Domain(GEOSContextHandle_t handle, const GEOSGeometry *g_domain,
+               double xmin, double ymin, double xmax, double ymax)
+{
+    m_handle = handle;
+    // Keep our own copy, so the prepared geometry can outlive the
+    // Python object it came from.
+    m_geometry = GEOSGeom_clone_r(handle, g_domain);
+    prepared = GEOSPrepare_r(handle, m_geometry);
+    m_xmin = xmin;
+    m_ymin = ymin;
+    m_xmax = xmax;
+    m_ymax = ymax;
+    m_kind = GENERAL;
+
+    if (GEOSGeomTypeId_r(handle, m_geometry) != GEOS_POLYGON ||
+            GEOSGetNumInteriorRings_r(handle, m_geometry) != 0)
+    {
+        return;
+    }
+
+    // Gather the distinct vertices of the exterior ring.
+    const GEOSGeometry *g_ring = GEOSGetExteriorRing_r(handle, m_geometry);
+    const GEOSCoordSequence *coords = GEOSGeom_getCoordSeq_r(handle, g_ring);
+    unsigned int size;
+    GEOSCoordSeq_getSize_r(handle, coords, &size);
+    for (unsigned int i = 0; i < size; i++)
+    {
+        Point point;
+        GEOSCoordSeq_getX_r(handle, coords, i, &point.x);
+        GEOSCoordSeq_getY_r(handle, coords, i, &point.y);
+        if (m_vertices.empty() || point.x != m_vertices.back().x ||
+                point.y != m_vertices.back().y)
+        {
+            m_vertices.push_back(point);
+        }
+    }
+    while (m_vertices.size() > 1 &&
+           m_vertices.front().x == m_vertices.back().x &&
+           m_vertices.front().y == m_vertices.back().y)
+    {
+        m_vertices.pop_back();
+    }
+    unsigned int n = m_vertices.size();
+    if (n < 3)
+    {
+        m_vertices.clear();
+        return;
+    }
+
+    // Make the vertices anti-clockwise.
+    double area = 0.0;
+    for (unsigned int i = 0; i < n; i++)
+    {
+        const Point &a = m_vertices[i];
+        const Point &b = m_vertices[(i + 1) % n];
+        area += a.x * b.y - b.x * a.y;
+    }
+    area *= 0.5;
+    if (area < 0.0)
+    {
+        std::reverse(m_vertices.begin(), m_vertices.end());
+        area = -area;
+    }
+
+    // Check every turn is to the left, allowing for collinear vertices
+    // and rounding errors.
+    double scale = std::max(m_xmax - m_xmin, m_ymax - m_ymin);
+    double tolerance = -1e-12 * scale * scale;
+    for (unsigned int i = 0; i < n; i++)
+    {
+        if (cross(m_vertices[i], m_vertices[(i + 1) % n],
+                  m_vertices[(i + 2) % n]) < tolerance)
+        {
+            m_vertices.clear();
+            return;
+        }
+    }
+
+    double envelope_area = (m_xmax - m_xmin) * (m_ymax - m_ymin);
+    if (fabs(envelope_area - area) <= 1e-12 * envelope_area)
+    {
+        m_kind = RECTANGLE;
+        m_vertices.clear();
+    }
+    else
+    {
+        m_kind = CONVEX;
+    }
+}
+
+Domain::~Domain()
+{
+    GEOSPreparedGeom_destroy_r(m_handle, prepared);
+    GEOSGeom_destroy_r(m_handle, m_geometry);
+}
+
+Domain::Kind Domain::kind() const
+{
+    return m_kind;
+}
+
+bool Domain::envelope_contains(const Point &point) const
+{
+    return (m_xmin <= point.x && point.x <= m_xmax &&
+            m_ymin <= point.y && point.y <= m_ymax);
+}
+
+bool Domain::envelope_disjoint(const Point &start, const Point &end) const
+{
+    return (std::max(start.x, end.x) < m_xmin ||
+            std::min(start.x, end.x) > m_xmax ||
+            std::max(start.y, end.y) < m_ymin ||
+            std::min(start.y, end.y) > m_ymax);
+}
+
+bool Domain::convex_contains(const Point &point) const
+{
+    unsigned int n = m_vertices.size();
+    for (unsigned int i = 0; i < n; i++)
+    {
+        if (cross(m_vertices[i], m_vertices[(i + 1) % n], point) < 0.0)
+        {
+            return false;
+        }
+    }
+    return true;
+}
+
+// Whether the segment touches or crosses any edge of a convex domain.
+bool Domain::crosses_edge(const Point &start, const Point &end) const
+{
+    unsigned int n = m_vertices.size();
+    for (unsigned int i = 0; i < n; i++)
+    {
+        const Point &a = m_vertices[i];
+        const Point &b = m_vertices[(i + 1) % n];
+        double d1 = cross(start, end, a);
+        double d2 = cross(start, end, b);
+        double d3 = cross(a, b, start);
+        double d4 = cross(a, b, end);
+        if (((d1 > 0.0 && d2 < 0.0) || (d1 < 0.0 && d2 > 0.0)) &&
+                ((d3 > 0.0 && d4 < 0.0) || (d3 < 0.0 && d4 > 0.0)))
+        {
+            return true;
+        }
+        // Collinear cases, where an end point lies on the other segment.
+        if ((d1 == 0.0 && std::min(start.x, end.x) <= a.x &&
+                a.x <= std::max(start.x, end.x) &&
+                std::min(start.y, end.y) <= a.y &&
+                a.y <= std::max(start.y, end.y)) ||
+            (d2 == 0.0 && std::min(start.x, end.x) <= b.x &&
+                b.x <= std::max(start.x, end.x) &&
+                std::min(start.y, end.y) <= b.y &&
+                b.y <= std::max(start.y, end.y)) ||
+            (d3 == 0.0 && std::min(a.x, b.x) <= start.x &&
+                start.x <= std::max(a.x, b.x) &&
+                std::min(a.y, b.y) <= start.y &&
+                start.y <= std::max(a.y, b.y)) ||
+            (d4 == 0.0 && std::min(a.x, b.x) <= end.x &&
+                end.x <= std::max(a.x, b.x) &&
+                std::min(a.y, b.y) <= end.y &&
+                end.y <= std::max(a.y, b.y)))
+        {
+            return true;
+        }
+    }
+    return false;
+}
+
+bool Domain::contains(GEOSContextHandle_t handle, const Point &point) const
+{
+    // NB. Points on the boundary are contained, as for GEOS "covers".
+    if (!envelope_contains(point))
+    {
+        return false;
+    }
+    if (m_kind == RECTANGLE)
+    {
+        return true;
+    }
+    if (m_kind == CONVEX)
+    {
+        return convex_contains(point);
+    }
+
+    GEOSCoordSequence *coords = GEOSCoordSeq_create_r(handle, 1, 2);
+    GEOSCoordSeq_setX_r(handle, coords, 0, point.x);
+    GEOSCoordSeq_setY_r(handle, coords, 0, point.y);
+    GEOSGeometry *g_point = GEOSGeom_createPoint_r(handle, coords);
+    bool result = GEOSPreparedCovers_r(handle, prepared, g_point);
+    GEOSGeom_destroy_r(handle, g_point);
+    return result;
+}
+
+static GEOSGeometry *segment(GEOSContextHandle_t handle,
+                             const Point &start, const Point &end)
+{
+    GEOSCoordSequence *coords = GEOSCoordSeq_create_r(handle, 2, 2);
+    GEOSCoordSeq_setX_r(handle, coords, 0, start.x);
+    GEOSCoordSeq_setY_r(handle, coords, 0, start.y);
+    GEOSCoordSeq_setX_r(handle, coords, 1, end.x);
+    GEOSCoordSeq_setY_r(handle, coords, 1, end.y);
+    return GEOSGeom_createLineString_r(handle, coords);
+}
+
+bool Domain::covers(GEOSContextHandle_t handle, const Point &start,
+                    const Point &end) const
+{
+    if (m_kind == GENERAL)
+    {
+        if (!(envelope_contains(start) && envelope_contains(end)))
+        {
+            return false;
+        }
+        GEOSGeometry *g_segment = segment(handle, start, end);
+        bool result = GEOSPreparedCovers_r(handle, prepared, g_segment);
+        GEOSGeom_destroy_r(handle, g_segment);
+        return result;
+    }
+    // A convex domain covers a segment iff it covers both ends.
+    return contains(handle, start) && contains(handle, end);
+}
+
+bool Domain::disjoint(GEOSContextHandle_t handle, const Point &start,
+                      const Point &end) const
+{
+    if (envelope_disjoint(start, end))
+    {
+        return true;
+    }
+    if (m_kind == GENERAL)
+    {
+        GEOSGeometry *g_segment = segment(handle, start, end);
+        bool result = GEOSPreparedDisjoint_r(handle, prepared, g_segment);
+        GEOSGeom_destroy_r(handle, g_segment);
+        return result;
+    }
+    // The segment is either inside a convex domain, or has to touch
+    // its boundary to enter it.
+    if (contains(handle, start) || contains(handle, end))
+    {
+        return false;
+    }
+    if (m_kind == RECTANGLE)
+    {
+        // Clip the segment to the rectangle (Liang-Barsky).
+        double t0 = 0.0, t1 = 1.0;
+        double dx = end.x - start.x, dy = end.y - start.y;
+        double p[4] = {-dx, dx, -dy, dy};
+        double q[4] = {start.x - m_xmin, m_xmax - start.x,
+                       start.y - m_ymin, m_ymax - start.y};
+        for (int i = 0; i < 4; i++)
+        {
+            if (p[i] == 0.0)
+            {
+                if (q[i] < 0.0)
+                    return true;
+            }
+            else
+            {
+                double r = q[i] / p[i];
+                if (p[i] < 0.0)
+                    t0 = std::max(t0, r);
+                else
+                    t1 = std::min(t1, r);
+                if (t0 > t1)
+                    return true;
+            }
+        }
+        return false;
+    }
+    return !crosses_edge(start, end);
+}
+
 
 typedef std::list<Point> Line;
 
@@ -223,9 +607,13 @@ class LineAccumulator
     void new_line();
     void add_point(Point &point);
     void add_point_if_empty(Point &point);
-    GEOSGeometry *as_geom(GEOSContextHandle_t handle);
+    GEOSGeometry *as_geom(GEOSContextHandle_t handle, TraceStats *stats);
+    void as_arrays(std::vector<double> &coords,
+                   std::vector<unsigned int> &offsets, TraceStats *stats);
 
     private:
+    void finish();
+
     std::list<Line> m_lines;
 };
 
@@ -267,11 +655,10 @@ bool close(double a, double b)
     return fabs(a - b) <= (1e-8 + 1e-5 * fabs(b));
 }
 
-GEOSGeometry *LineAccumulator::as_geom(GEOSContextHandle_t handle)
+// Removes the degenerate lines, and joins the last line to the first if
+// they meet.
+void LineAccumulator::finish()
 {
-    std::vector<GEOSGeometry *> geoms;
-    std::list<Line>::iterator ilines;
-
     m_lines.remove_if(degenerate_line);
 
     if(m_lines.size() > 1)
@@ -289,6 +676,15 @@ GEOSGeometry *LineAccumulator::as_geom(GEOSContextHandle_t handle)
             m_lines.pop_front();
         }
     }
+}
+
+GEOSGeometry *LineAccumulator::as_geom(GEOSContextHandle_t handle,
+                                       TraceStats *stats)
+{
+    std::vector<GEOSGeometry *> geoms;
+    std::list<Line>::iterator ilines;
+
+    finish();
 
     for(ilines = m_lines.begin(); ilines != m_lines.end(); ++ilines)
     {
@@ -302,8 +698,13 @@ GEOSGeometry *LineAccumulator::as_geom(GEOSContextHandle_t handle)
             GEOSCoordSeq_setY_r(handle, coords, i, ipoints->y);
         }
         geoms.push_back(GEOSGeom_createLineString_r(handle, coords));
+        if (stats)
+            stats->points += (*ilines).size();
     }
 
+    if (stats)
+        stats->lines += geoms.size();
+
     GEOSGeometry *geom;
     if(geoms.size() == 0)
     {
@@ -317,26 +718,51 @@ GEOSGeometry *LineAccumulator::as_geom(GEOSContextHandle_t handle)
     return geom;
 }
 
+// Appends the x, y pairs of the lines to coords, and the index of the
+// first point of each line to offsets.
+void LineAccumulator::as_arrays(std::vector<double> &coords,
+                                std::vector<unsigned int> &offsets,
+                                TraceStats *stats)
+{
+    std::list<Line>::iterator ilines;
+
+    finish();
+
+    for(ilines = m_lines.begin(); ilines != m_lines.end(); ++ilines)
+    {
+        std::list<Point>::iterator ipoints;
+
+        offsets.push_back(coords.size() / 2);
+        for(ipoints = (*ilines).begin(); ipoints != (*ilines).end(); ++ipoints)
+        {
+            coords.push_back(ipoints->x);
+            coords.push_back(ipoints->y);
+        }
+        if (stats)
+            stats->points += (*ilines).size();
+    }
+
+    if (stats)
+        stats->lines += m_lines.size();
+}
+
 enum State {
     POINT_IN=1,
     POINT_OUT,
     POINT_NAN
 };
 
-State get_state(Point &point, const GEOSPreparedGeometry *gp_domain,
-                GEOSContextHandle_t handle)
+State get_state(Point &point, const Domain *domain,
+                GEOSContextHandle_t handle, TraceStats *stats)
 {
     State state;
 
+    if (stats)
+        stats->state_queries++;
+
     if (isfinite(point.x) && isfinite(point.y))
     {
-        // TODO: Avoid create-destroy
-        GEOSCoordSequence *coords = GEOSCoordSeq_create_r(handle, 1, 2);
-        GEOSCoordSeq_setX_r(handle, coords, 0, point.x);
-        GEOSCoordSeq_setY_r(handle, coords, 0, point.y);
-        GEOSGeometry *g_point = GEOSGeom_createPoint_r(handle, coords);
-        state = GEOSPreparedCovers_r(handle, gp_domain, g_point) ? POINT_IN : POINT_OUT;
-        GEOSGeom_destroy_r(handle, g_point);
+        state = domain->contains(handle, point) ? POINT_IN : POINT_OUT;
     }
     else
     {
@@ -349,7 +775,7 @@ bool straightAndDomain(double t_start, Point &p_start,
                        double t_end, Point &p_end,
                        Interpolator *interpolator, double threshold,
                        GEOSContextHandle_t handle,
-                       const GEOSPreparedGeometry *gp_domain,
+                       const Domain *domain,
                        bool inside)
 {
     // Straight and in-domain (de9im[7] == 'F')
@@ -367,38 +793,32 @@ bool straightAndDomain(double t_start, Point &p_start,
     }
     else
     {
-        // TODO: Re-use geometries, instead of create-destroy!
-
-        // Create a LineString for the current end-point.
-        GEOSCoordSequence *coords = GEOSCoordSeq_create_r(handle, 2, 2);
-        GEOSCoordSeq_setX_r(handle, coords, 0, p_start.x);
-        GEOSCoordSeq_setY_r(handle, coords, 0, p_start.y);
-        GEOSCoordSeq_setX_r(handle, coords, 1, p_end.x);
-        GEOSCoordSeq_setY_r(handle, coords, 1, p_end.y);
-        GEOSGeometry *g_segment = GEOSGeom_createLineString_r(handle, coords);
-
         // Find the projected mid-point
         double t_mid = (t_start + t_end) * 0.5;
         Point p_mid = interpolator->interpolate(t_mid);
 
-        // Make it into a GEOS geometry
-        coords = GEOSCoordSeq_create_r(handle, 1, 2);
-        GEOSCoordSeq_setX_r(handle, coords, 0, p_mid.x);
-        GEOSCoordSeq_setY_r(handle, coords, 0, p_mid.y);
-        GEOSGeometry *g_mid = GEOSGeom_createPoint_r(handle, coords);
-
-        double along = GEOSProjectNormalized_r(handle, g_segment, g_mid);
-        if (isnan(along))
+        // Measure where the mid-point is along the segment, as a fraction
+        // of its length, and how far it is from it.
+        double dx = p_end.x - p_start.x;
+        double dy = p_end.y - p_start.y;
+        double length2 = dx * dx + dy * dy;
+        if (length2 == 0.0)
         {
             valid = true;
         }
+        else if (!(isfinite(p_mid.x) && isfinite(p_mid.y)))
+        {
+            valid = false;
+        }
         else
         {
+            double mx = p_mid.x - p_start.x;
+            double my = p_mid.y - p_start.y;
+            double along = (mx * dx + my * dy) / length2;
             valid = 0.0 < along and along < 1.0;
             if (valid)
             {
-                double separation;
-                GEOSDistance_r(handle, g_segment, g_mid, &separation);
+                double separation = fabs(dx * my - dy * mx) / sqrt(length2);
                 valid = separation <= threshold * 2.0 * (0.5 - fabs(0.5 - along));
             }
         }
@@ -406,13 +826,10 @@ bool straightAndDomain(double t_start, Point &p_start,
         if (valid)
         {
             if(inside)
-                valid = GEOSPreparedCovers_r(handle, gp_domain, g_segment);
+                valid = domain->covers(handle, p_start, p_end);
             else
-                valid = GEOSPreparedDisjoint_r(handle, gp_domain, g_segment);
+                valid = domain->disjoint(handle, p_start, p_end);
         }
-
-        GEOSGeom_destroy_r(handle, g_segment);
-        GEOSGeom_destroy_r(handle, g_mid);
     }
 
     return valid;
@@ -420,9 +837,10 @@ bool straightAndDomain(double t_start, Point &p_start,
 
 void bisect(double t_start, Point &p_start, Point &p_end,
             GEOSContextHandle_t handle,
-            const GEOSPreparedGeometry *gp_domain,
+            const Domain *domain,
             State &state, Interpolator *interpolator, double threshold,
-            double &t_min, Point &p_min, double &t_max, Point &p_max)
+            double &t_min, Point &p_min, double &t_max, Point &p_max,
+            TraceStats *stats)
 {
     double t_current;
     Point p_current;
@@ -446,20 +864,23 @@ void bisect(double t_start, Point &p_start, Point &p_end,
 #ifdef DEBUG
         std::cerr << "t: " << t_current << std::endl;
 #endif
+        if (stats)
+            stats->bisect_iterations++;
+
         bool valid;
         if (state == POINT_IN)
         {
             // Straight and entirely-inside-domain
             valid = straightAndDomain(t_start, p_start, t_current, p_current,
                                       interpolator, threshold,
-                                      handle, gp_domain, true);
+                                      handle, domain, true);
         }
         else if(state == POINT_OUT)
         {
             // Straight and entirely-outside-domain
             valid = straightAndDomain(t_start, p_start, t_current, p_current,
                                       interpolator, threshold,
-                                      handle, gp_domain, false);
+                                      handle, domain, false);
         }
         else
         {
@@ -485,38 +906,23 @@ void bisect(double t_start, Point &p_start, Point &p_end,
     }
 }
 
+// Projects the segment for which the interpolator is set up, given the
+// projected start and end points and the state of the start point.
 void _project_segment(GEOSContextHandle_t handle,
-                      const GEOSCoordSequence *src_coords,
-                      unsigned int src_idx_from, unsigned int src_idx_to,
+                      Point p_current, Point p_end, State state,
                       Interpolator *interpolator,
-                      const GEOSPreparedGeometry *gp_domain,
+                      const Domain *domain,
                       double threshold,
-                      LineAccumulator &lines)
+                      LineAccumulator &lines,
+                      TraceStats *stats)
 {
-    Point p_current, p_min, p_max, p_end;
+    Point p_min, p_max;
     double t_current, t_min, t_max;
-    State state;
 
-    GEOSCoordSeq_getX_r(handle, src_coords, src_idx_from, &p_current.x);
-    GEOSCoordSeq_getY_r(handle, src_coords, src_idx_from, &p_current.y);
-    GEOSCoordSeq_getX_r(handle, src_coords, src_idx_to, &p_end.x);
-    GEOSCoordSeq_getY_r(handle, src_coords, src_idx_to, &p_end.y);
-#ifdef DEBUG
-    std::cerr << "Setting line:" << std::endl;
-    std::cerr << "   " << p_current.x << ", " << p_current.y << std::endl;
-    std::cerr << "   " << p_end.x << ", " << p_end.y << std::endl;
-#endif
-    interpolator->set_line(p_current, p_end);
-    p_current = interpolator->project(p_current);
-    p_end = interpolator->project(p_end);
-#ifdef DEBUG
-    std::cerr << "Projected as:" << std::endl;
-    std::cerr << "   " << p_current.x << ", " << p_current.y << std::endl;
-    std::cerr << "   " << p_end.x << ", " << p_end.y << std::endl;
-#endif
+    if (stats)
+        stats->segments++;
 
     t_current = 0.0;
-    state = get_state(p_current, gp_domain, handle);
 
     while(t_current < 1.0)
     {
@@ -533,9 +939,9 @@ void _project_segment(GEOSContextHandle_t handle,
         std::cerr << "   " << p_current.x << ", " << p_current.y << std::endl;
         std::cerr << "   " << p_end.x << ", " << p_end.y << std::endl;
 #endif
-        bisect(t_current, p_current, p_end, handle, gp_domain, state,
+        bisect(t_current, p_current, p_end, handle, domain, state,
                interpolator, threshold,
-               t_min, p_min, t_max, p_max);
+               t_min, p_min, t_max, p_max, stats);
 #ifdef DEBUG
         std::cerr << "   => " << t_min << " to " << t_max << std::endl;
         std::cerr << "   => (" << p_min.x << ", " << p_min.y << ") to (" << p_max.x << ", " << p_max.y << ")" << std::endl;
@@ -553,7 +959,7 @@ void _project_segment(GEOSContextHandle_t handle,
             {
                 t_current = t_max;
                 p_current = p_max;
-                state = get_state(p_current, gp_domain, handle);
+                state = get_state(p_current, domain, handle, stats);
                 if (state == POINT_IN)
                 {
                     lines.new_line();
@@ -571,7 +977,7 @@ void _project_segment(GEOSContextHandle_t handle,
             {
                 t_current = t_max;
                 p_current = p_max;
-                state = get_state(p_current, gp_domain, handle);
+                state = get_state(p_current, domain, handle, stats);
                 if (state == POINT_IN)
                 {
                     lines.new_line();
@@ -583,34 +989,113 @@ void _project_segment(GEOSContextHandle_t handle,
         {
             t_current = t_max;
             p_current = p_max;
-            state = get_state(p_current, gp_domain, handle);
+            state = get_state(p_current, domain, handle, stats);
         }
     }
 }
 
-#define DEBUG
-GEOSGeometry *_project_line_string(GEOSContextHandle_t handle,
-                                   GEOSGeometry *g_line_string,
-                                   Interpolator *interpolator,
-                                   GEOSGeometry *g_domain, double threshold)
+static void _trace_line_string(GEOSContextHandle_t handle,
+                               GEOSGeometry *g_line_string,
+                               Interpolator *interpolator,
+                               Domain *domain, double threshold,
+                               TraceStats *stats,
+                               LineAccumulator &lines)
 {
     const GEOSCoordSequence *src_coords = GEOSGeom_getCoordSeq_r(handle, g_line_string);
     unsigned int src_size, src_idx;
 
-    
-    const GEOSPreparedGeometry *gp_domain = GEOSPrepare_r(handle, g_domain);
-
     GEOSCoordSeq_getSize_r(handle, src_coords, &src_size); // check exceptions
 
-    LineAccumulator lines;
+    interpolator->set_stats(stats);
+
+    // Project and classify all the vertices in one go.
+    std::vector<Point> src_points(src_size), dest_points(src_size);
+    std::vector<State> states(src_size);
+    for(src_idx = 0; src_idx < src_size; src_idx++)
+    {
+        GEOSCoordSeq_getX_r(handle, src_coords, src_idx, &src_points[src_idx].x);
+        GEOSCoordSeq_getY_r(handle, src_coords, src_idx, &src_points[src_idx].y);
+    }
+    if (src_size > 0)
+    {
+        interpolator->project_points(&src_points[0], &dest_points[0],
+                                     src_size);
+    }
+    for(src_idx = 0; src_idx < src_size; src_idx++)
+    {
+        states[src_idx] = get_state(dest_points[src_idx], domain, handle,
+                                    stats);
+    }
 
     for(src_idx = 1; src_idx < src_size; src_idx++)
     {
-        _project_segment(handle, src_coords, src_idx - 1, src_idx,
-                      interpolator, gp_domain, threshold, lines);
+        Point &p_start = dest_points[src_idx - 1];
+        Point &p_end = dest_points[src_idx];
+        interpolator->set_line(src_points[src_idx - 1], src_points[src_idx]);
+
+        // Most segments of a densely sampled line are short enough to
+        // be straight and inside the domain, which needs no bisection.
+        if (states[src_idx - 1] == POINT_IN && states[src_idx] == POINT_IN &&
+            straightAndDomain(0.0, p_start, 1.0, p_end, interpolator,
+                              threshold, handle, domain, true))
+        {
+            if (stats)
+                stats->segments++;
+            lines.add_point_if_empty(p_start);
+            lines.add_point(p_end);
+        }
+        else
+        {
+            _project_segment(handle, p_start, p_end, states[src_idx - 1],
+                             interpolator, domain, threshold, lines, stats);
+        }
     }
 
-    GEOSPreparedGeom_destroy_r(handle, gp_domain);
+    interpolator->set_stats(NULL);
+}
+
+GEOSGeometry *_project_line_string(GEOSContextHandle_t handle,
+                                   GEOSGeometry *g_line_string,
+                                   Interpolator *interpolator,
+                                   Domain *domain, double threshold,
+                                   TraceStats *stats)
+{
+    LineAccumulator lines;
+    _trace_line_string(handle, g_line_string, interpolator, domain,
+                       threshold, stats, lines);
+    return lines.as_geom(handle, stats);
+}
+
+void _project_line_strings(GEOSContextHandle_t handle,
+                           GEOSGeometry **g_line_strings, unsigned int n,
+                           Interpolator *interpolator,
+                           Domain *domain, double threshold,
+                           GEOSGeometry **g_results,
+                           TraceStats *stats)
+{
+    for(unsigned int i = 0; i < n; i++)
+    {
+        g_results[i] = _project_line_string(handle, g_line_strings[i],
+                                            interpolator, domain, threshold,
+                                            stats ? &stats[i] : NULL);
+    }
+}
 
-    return lines.as_geom(handle);
+void _project_line_strings_arrays(GEOSContextHandle_t handle,
+                                  GEOSGeometry **g_line_strings,
+                                  unsigned int n,
+                                  Interpolator *interpolator,
+                                  Domain *domain, double threshold,
+                                  std::vector<double> &coords,
+                                  std::vector<unsigned int> &offsets,
+                                  TraceStats *stats)
+{
+    for(unsigned int i = 0; i < n; i++)
+    {
+        LineAccumulator lines;
+        TraceStats *line_stats = stats ? &stats[i] : NULL;
+        _trace_line_string(handle, g_line_strings[i], interpolator, domain,
+                           threshold, line_stats, lines);
+        lines.as_arrays(coords, offsets, line_stats);
+    }
 }
@@ -22,6 +22,7 @@
 #define _TRACE_H
 
 #include <iostream>
+#include <vector>
 
 #include <geos_c.h>
 #include <proj_api.h>
@@ -39,15 +40,34 @@ typedef struct {
 } Vec3;
 
 
+// Counters of the work done while projecting lines, for diagnosing slow
+// geometries. Wherever a TraceStats pointer is NULL nothing is counted.
+typedef struct {
+    unsigned long segments;
+    unsigned long bisect_iterations;
+    unsigned long interpolate_calls;
+    unsigned long project_calls;
+    unsigned long state_queries;
+    unsigned long lines;
+    unsigned long points;
+} TraceStats;
+
+
 class Interpolator
 {
     public:
+    Interpolator() : m_stats(NULL) {}
     virtual void set_line(Point &start, Point &end);
     virtual Point interpolate(double t)=0;
     virtual Point project(Point &point)=0;
+    // Projects the n src points into dest, one at a time.
+    virtual void project_points(const Point *src, Point *dest,
+                                unsigned int n);
+    void set_stats(TraceStats *stats) { m_stats = stats; }
 
     protected:
     Point m_start, m_end;
+    TraceStats *m_stats;
 };
 
 
@@ -57,6 +77,7 @@ class CartesianInterpolator : public Interpolator
     CartesianInterpolator(projPJ src_proj, projPJ dest_proj);
     Point interpolate(double t);
     Point project(Point &point);
+    void project_points(const Point *src, Point *dest, unsigned int n);
 
     private:
     projPJ m_src_proj, m_dest_proj;
@@ -71,6 +92,7 @@ class SphericalInterpolator : public Interpolator
     void set_line(Point &start, Point &end);
     Point interpolate(double t);
     Point project(Point &point);
+    void project_points(const Point *src, Point *dest, unsigned int n);
 
     private:
     projPJ m_src_proj, m_dest_proj;
@@ -79,9 +101,77 @@ class SphericalInterpolator : public Interpolator
 };
 
 
+// The prepared geometry, and envelope, of a projection's domain.
+//
+// Rectangular and convex domains are tested directly against their
+// vertices, without any allocation. Other domains fall back to GEOS.
+class Domain
+{
+    public:
+    enum Kind {
+        RECTANGLE=1,
+        CONVEX,
+        GENERAL
+    };
+
+    Domain(GEOSContextHandle_t handle, const GEOSGeometry *g_domain,
+           double xmin, double ymin, double xmax, double ymax);
+    ~Domain();
+    Kind kind() const;
+    bool contains(GEOSContextHandle_t handle, const Point &point) const;
+    bool covers(GEOSContextHandle_t handle, const Point &start,
+                const Point &end) const;
+    bool disjoint(GEOSContextHandle_t handle, const Point &start,
+                  const Point &end) const;
+
+    const GEOSPreparedGeometry *prepared;
+
+    private:
+    bool envelope_contains(const Point &point) const;
+    bool envelope_disjoint(const Point &start, const Point &end) const;
+    bool convex_contains(const Point &point) const;
+    bool crosses_edge(const Point &start, const Point &end) const;
+
+    GEOSContextHandle_t m_handle;
+    GEOSGeometry *m_geometry;
+    double m_xmin, m_ymin, m_xmax, m_ymax;
+    Kind m_kind;
+    // The anti-clockwise vertices of a convex domain, without repeating
+    // the first vertex.
+    std::vector<Point> m_vertices;
+};
+
+
+// Returns a new reentrant GEOS context, for the use of a single thread.
+GEOSContextHandle_t _new_geos_context();
+
+
+// If stats is not NULL, the work done is added to it.
 GEOSGeometry *_project_line_string(GEOSContextHandle_t handle,
                                    GEOSGeometry *g_line_string,
                                    Interpolator *interpolator,
-                                   GEOSGeometry *g_domain, double threshold);
+                                   Domain *domain, double threshold,
+                                   TraceStats *stats);
+
+// If stats is not NULL, it must point to an array of n TraceStats, and
+// the work done for each line is added to the corresponding element.
+void _project_line_strings(GEOSContextHandle_t handle,
+                           GEOSGeometry **g_line_strings, unsigned int n,
+                           Interpolator *interpolator,
+                           Domain *domain, double threshold,
+                           GEOSGeometry **g_results,
+                           TraceStats *stats);
+
+// As _project_line_strings, but appends the x, y pairs of all the
+// resulting lines to coords, and the index of the first point of each
+// line to offsets, instead of creating GEOS geometries.
+void _project_line_strings_arrays(GEOSContextHandle_t handle,
+                                  GEOSGeometry **g_line_strings,
+                                  unsigned int n,
+                                  Interpolator *interpolator,
+                                  Domain *domain, double threshold,
+                                  std::vector<double> &coords,
+                                  std::vector<unsigned int> &offsets,
+                                  TraceStats *stats);
 
 #endif // _TRACE_H
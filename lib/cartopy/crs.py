@@ -22,13 +22,22 @@ between them.
 
 """
 from abc import ABCMeta, abstractproperty
+from collections import OrderedDict
+import hashlib
 import math
+from multiprocessing.pool import ThreadPool
+import os
+import sys
+import threading
 
 import numpy
 import shapely.geometry as sgeom
 from shapely.geometry.polygon import LinearRing
+from shapely.prepared import prep
 
-from cartopy._crs import CRS, Geocentric, Geodetic
+from cartopy._crs import (CRS, Geocentric, Geodetic, fast_paths_enabled,
+                          get_default_threads, proj4_handle_stats,
+                          set_default_threads, set_fast_paths)
 import cartopy.trace
 
 
@@ -60,6 +69,12 @@ class RotatedGeodetic(CRS):
         super(RotatedGeodetic, self).__init__(proj4_params)        
 
 
+# The (boundary, domain, x_limits, y_limits) of each projection whose
+# boundary is sampled (see Projection._set_sampled_boundary), keyed on its
+# class and proj.4 definition.
+_SAMPLED_BOUNDARIES = {}
+
+
 class Projection(CRS):
     """
     Defines a projected coordinate system with flat topology and Euclidean
@@ -75,13 +90,11 @@ class Projection(CRS):
         'MultiLineString': '_project_multiline',
         'MultiPolygon': '_project_multipolygon',
     }
-    
-    def __eq__(self, other):
-        # XXX handle params that have been set to the default value on one, but not the other? 
-        return isinstance(self, type(other)) and self.proj4_params == other.proj4_params
-    
-    def __ne__(self, other):
-        return not self == other
+
+    # Whether x depends only on longitude and y only on latitude, which
+    # allows grids to be transformed axis by axis (see
+    # CRS.transform_grid).
+    _separable = False
     
     @abstractproperty
     def boundary(self):
@@ -107,6 +120,32 @@ class Projection(CRS):
             domain = self._domain = sgeom.Polygon(self.boundary)
         return domain
 
+    def _set_sampled_boundary(self, lons, lats):
+        """
+        Sets the boundary, domain and limits of this projection from the
+        given longitudes and latitudes of points around its edge, in the
+        reverse order to that of the boundary.
+
+        These are only computed once for each class and proj.4 definition,
+        and are then shared by its instances.
+
+        """
+        key = (type(self), self.proj4_init)
+        try:
+            sampled = _SAMPLED_BOUNDARIES[key]
+        except KeyError:
+            points = self.transform_points(self.as_geodetic(),
+                                           numpy.asarray(lons, dtype=float),
+                                           numpy.asarray(lats, dtype=float))
+            x = points[:, 0]
+            y = points[:, 1]
+            boundary = sgeom.LineString(zip(x[::-1], y[::-1]))
+            sampled = (boundary, sgeom.Polygon(boundary),
+                       (x.min(), x.max()), (y.min(), y.max()))
+            _SAMPLED_BOUNDARIES[key] = sampled
+        (self._boundary, self._domain,
+         self._x_limits, self._y_limits) = sampled
+
     def _as_mpl_axes(self):
         import cartopy.mpl_integration.geoaxes as geoaxes
         return geoaxes.GeoAxes, {'map_projection': self}
@@ -117,33 +156,234 @@ class Projection(CRS):
             raise ValueError('Axes should be an instance of GeoAxes, got %s' % type(axes))
         return geoaxes.InterProjectionTransform(self, axes.projection) + axes.transData
         
-    def project_geometry(self, geometry, src_crs=None):
+    def project_geometry(self, geometry, src_crs=None, threads=None,
+                         threshold=None, extent=None):
         """
         Projects the given geometry into this projection.
 
         :param geometry: The geometry to (re-)project.
         :param src_crs: The source CRS, or geodetic CRS if None.
+        :param threads: The number of threads over which to divide the
+                        parts of a Multi* geometry. Defaults to the value
+                        given to :func:`set_default_threads`.
+        :param threshold: The maximum distance, in projected units, by
+                          which projected lines may deviate from the true
+                          curves. Defaults to the projection's threshold.
+                          Larger values do less work, e.g. for a coarse
+                          rendering.
+        :param extent: The (x0, x1, y0, y1) extent, in projected units,
+                       of the region of interest, e.g. the extent of a
+                       regional map. A geometry which lies outside a
+                       padded estimate of the extent in the source
+                       coordinates, made by sampling it, may be left out
+                       of the result, as may the parts of a geometry
+                       outside it if the source is not geodetic.
         :rtype: Shapely geometry.
 
         If src_crs is None, the source CRS is assumed to be a geodetic
         version of the target CRS.
 
+        If enabled, the result is cached (see :func:`enable_geometry_cache`).
+
+        """
+        src_crs = self._source_crs(src_crs)
+        cache = _geometry_cache
+        if cache is None:
+            return self._project_geometry(geometry, src_crs, threads,
+                                          threshold, extent)
+        key = cache.key(geometry, src_crs, self, threshold, extent)
+        result = cache.get(key)
+        if result is None:
+            result = self._project_geometry(geometry, src_crs, threads,
+                                            threshold, extent)
+            result = cache.put(key, result)
+        return result
+
+    def _project_geometry(self, geometry, src_crs, threads=None,
+                          threshold=None, extent=None):
+        # The uncached implementation of project_geometry.
+        if extent is not None:
+            geometry = self._clip_to_extent(geometry, src_crs, extent)
+            if geometry.is_empty:
+                return geometry
+        if threads is None:
+            threads = get_default_threads()
+        geom_type = geometry.geom_type
+        if threads > 1 and geom_type in ('MultiLineString', 'MultiPolygon'):
+            return self._project_multi_threaded(geometry, src_crs, threads,
+                                                threshold)
+        method_name = self._method_map.get(geom_type)
+        if not method_name:
+            raise ValueError('Unsupported geometry type {!r}'.format(geom_type))
+        return getattr(self, method_name)(geometry, src_crs, threshold)
+
+    def project_geometries(self, geometries, src_crs=None, threads=None,
+                           threshold=None):
         """
+        Projects each of the given geometries into this projection.
+
+        :param geometries: An iterable of the geometries to (re-)project.
+        :param src_crs: The source CRS, or geodetic CRS if None.
+        :param threads: The number of threads over which to divide the
+                        geometries. Defaults to the value given to
+                        :func:`set_default_threads`.
+        :param threshold: As for :meth:`project_geometry`.
+        :rtype: List of shapely geometries.
+
+        """
+        src_crs = self._source_crs(src_crs)
+        if threads is None:
+            threads = get_default_threads()
+        project = lambda geometry: self.project_geometry(
+            geometry, src_crs, threads=1, threshold=threshold)
+        return self._map_threaded(project, list(geometries), threads)
+
+    def _source_envelope(self, src_crs, extent):
+        """
+        Returns the (xmin, ymin, xmax, ymax) box in src_crs which contains
+        everything that projects into the given (x0, x1, y0, y1) extent of
+        this projection, or None if there is no simple such box.
+
+        """
+        key = (tuple(float(value) for value in extent), type(src_crs),
+               src_crs.proj4_init)
+        try:
+            envelopes = self._source_envelopes
+        except AttributeError:
+            envelopes = self._source_envelopes = {}
+        if key in envelopes:
+            return envelopes[key]
+
+        # Sample the whole of the extent, so that extremes inside it
+        # (e.g. in a rotated source) are found.
+        x0, x1, y0, y1 = extent
+        n = 32
+        x, y = numpy.meshgrid(numpy.linspace(x0, x1, n),
+                              numpy.linspace(y0, y1, n))
+        points = src_crs.transform_points(self, x.ravel(), y.ravel())
+        src_x = points[:, 0].reshape(n, n)
+        src_y = points[:, 1].reshape(n, n)
+
+        envelope = None
+        if numpy.isfinite(src_x).all() and numpy.isfinite(src_y).all():
+            spans = []
+            smooth = True
+            for values in (src_x, src_y):
+                span = values.max() - values.min()
+                spans.append(span)
+                # A cut in the source coordinates (e.g. the date line, or
+                # a pole of a geodetic source) makes neighbouring samples
+                # jump across the span.
+                step = max(numpy.abs(numpy.diff(values, axis=0)).max(),
+                           numpy.abs(numpy.diff(values, axis=1)).max())
+                smooth = smooth and step <= 0.25 * span
+            if smooth:
+                # Pad generously, to allow for curvature between the
+                # samples.
+                pad_x = 0.1 * spans[0]
+                pad_y = 0.1 * spans[1]
+                envelope = (src_x.min() - pad_x, src_y.min() - pad_y,
+                            src_x.max() + pad_x, src_y.max() + pad_y)
+                if src_crs.is_geodetic():
+                    envelope = (envelope[0], max(envelope[1], -90),
+                                envelope[2], min(envelope[3], 90))
+
+        envelopes[key] = envelope
+        return envelope
+
+    def _clip_to_extent(self, geometry, src_crs, extent):
+        """
+        Returns the part of the geometry which might project into the given
+        extent, which may be the whole geometry, or an empty geometry.
+
+        Only planar sources are clipped to the envelope. Straight lines in a
+        geodetic source are great circles, which can leave a box whose
+        corners they join, so the geometry is either kept whole, or dropped
+        if its bounds are entirely outside the envelope.
+
+        """
+        envelope = self._source_envelope(src_crs, extent)
+        if envelope is None or geometry.is_empty:
+            return geometry
+        gx0, gy0, gx1, gy1 = geometry.bounds
+        ex0, ey0, ex1, ey1 = envelope
+        if src_crs.is_geodetic() and (gx0 < -180 or gx1 > 180):
+            # The envelope can't describe longitudes out of the usual range.
+            return geometry
+
+        polygonal = geometry.geom_type in ('Polygon', 'MultiPolygon')
+        if gx1 < ex0 or gx0 > ex1 or gy1 < ey0 or gy0 > ey1:
+            # Entirely outside.
+            if polygonal:
+                return sgeom.MultiPolygon()
+            return sgeom.MultiLineString()
+        if (ex0 <= gx0 and gx1 <= ex1 and ey0 <= gy0 and gy1 <= ey1) or \
+                geometry.geom_type == 'LinearRing' or src_crs.is_geodetic():
+            # Entirely inside, or can't be clipped without losing its
+            # ring-ness, or its great circles.
+            return geometry
+
+        clipped = geometry.intersection(sgeom.box(*envelope))
+        parts = getattr(clipped, 'geoms', [clipped])
+        if polygonal:
+            return sgeom.MultiPolygon([part for part in parts
+                                       if part.geom_type == 'Polygon'])
+        return sgeom.MultiLineString([part for part in parts
+                                      if part.geom_type == 'LineString'])
+
+    def _source_crs(self, src_crs):
         if src_crs is None:
             src_crs = self.as_geodetic()
         elif not isinstance(src_crs, CRS):
             raise TypeError('Source CRS must be an instance of CRS'
                             ' or one of its subclasses, or None.')
+        return src_crs
+
+    def _map_threaded(self, func, items, threads):
+        """
+        Returns the list of func(item) for each of the items, evaluated
+        by a pool of the given number of threads.
+
+        """
+        threads = min(threads, len(items))
+        if threads <= 1:
+            return [func(item) for item in items]
+        # NB. The tracing of lines releases the GIL. Each of the given
+        # number of threads evaluates every threads'th item.
+        pool = _acquire_thread_pool(threads)
+        try:
+            chunks = pool.map(lambda chunk: [func(item) for item in chunk],
+                              [items[i::threads] for i in range(threads)])
+        finally:
+            _release_thread_pool(pool)
+        results = [None] * len(items)
+        for i, chunk in enumerate(chunks):
+            results[i::threads] = chunk
+        return results
+
+    def _project_multi_threaded(self, geometry, src_crs, threads,
+                                threshold=None):
         geom_type = geometry.geom_type
-        method_name = self._method_map.get(geom_type)
-        if not method_name:
-            raise ValueError('Unsupported geometry type {!r}'.format(geom_type))
-        return getattr(self, method_name)(geometry, src_crs)
+        parts = self._map_threaded(
+            lambda part: self._project_geometry(part, src_crs, threads=1,
+                                                threshold=threshold),
+            list(geometry.geoms), threads)
+        geoms = []
+        for r in parts:
+            if r:
+                geoms.extend(r.geoms)
+        if geom_type == 'MultiPolygon':
+            return sgeom.MultiPolygon(geoms)
+        elif geoms:
+            return sgeom.MultiLineString(geoms)
+        else:
+            return []
 
-    def _project_line_string(self, geometry, src_crs):
-        return cartopy.trace.project_linear(geometry, src_crs, self)
+    def _project_line_string(self, geometry, src_crs, threshold=None):
+        return cartopy.trace.project_linear(geometry, src_crs, self,
+                                            threshold)
 
-    def _project_linear_ring(self, linear_ring, src_crs):
+    def _project_linear_ring(self, linear_ring, src_crs, threshold=None):
         """
         Projects the given LinearRing from the src_crs into this CRS and
         returns the resultant LinearRing or MultiLineString.
@@ -154,9 +394,18 @@ class Projection(CRS):
         # def23ghi
         # jkl41
         multi_line_string = cartopy.trace.project_linear(linear_ring,
-                                                         src_crs, self)
+                                                         src_crs, self,
+                                                         threshold)
 
         # 2) Simplify the segments where appropriate.
+        return self._simplify_projected_ring(multi_line_string)
+
+    def _simplify_projected_ring(self, multi_line_string):
+        """
+        Returns the LinearRing or MultiLineString which results from
+        simplifying the projected MultiLineString of a LinearRing.
+
+        """
         result_geometry = multi_line_string
         n_lines = len(multi_line_string)
         # Check for a single ring
@@ -182,10 +431,10 @@ class Projection(CRS):
 
         return result_geometry
 
-    def _project_multiline(self, geometry, src_crs):
+    def _project_multiline(self, geometry, src_crs, threshold=None):
         geoms = []
-        for geom in geometry.geoms:
-            r = self._project_line_string(geom, src_crs)
+        for r in cartopy.trace.project_linear_many(geometry, src_crs, self,
+                                                   threshold):
             if r:
                 geoms.extend(r.geoms)
         if geoms:
@@ -193,17 +442,25 @@ class Projection(CRS):
         else:
             return []
 
-    def _project_multipolygon(self, geometry, src_crs):
+    def _project_multipolygon(self, geometry, src_crs, threshold=None):
+        # Project the rings of all the polygons in one go.
+        src_rings = [self._polygon_rings(polygon)
+                     for polygon in geometry.geoms]
+        projected = iter(cartopy.trace.project_linear_many(
+            [ring for rings in src_rings for ring in rings], src_crs, self,
+            threshold))
         geoms = []
-        for geom in geometry.geoms:
-            r = self._project_polygon(geom, src_crs)
+        for rings in src_rings:
+            r = self._polygon_from_projected_rings(
+                [next(projected) for ring in rings])
             if r:
                 geoms.extend(r.geoms)
         return sgeom.MultiPolygon(geoms)
 
-    def _project_polygon(self, polygon, src_crs):
+    def _polygon_rings(self, polygon):
         """
-        Returns the projected polygon(s) derived from the given polygon.
+        Returns the list of the exterior and interior rings of the given
+        polygon, ready for projection.
 
         """
         # XXX This shouldn't really be here?
@@ -218,14 +475,31 @@ class Projection(CRS):
         polygon = sgeom.polygon.orient(polygon, -1)
         # TODO: Consider checking the internal rings have the opposite
         # orientation to the external rings.
+        return [polygon.exterior] + list(polygon.interiors)
 
+    def _project_polygon(self, polygon, src_crs, threshold=None):
+        """
+        Returns the projected polygon(s) derived from the given polygon.
+
+        """
         # Project the polygon exterior/interior rings.
+        src_rings = self._polygon_rings(polygon)
+        return self._polygon_from_projected_rings(
+            cartopy.trace.project_linear_many(src_rings, src_crs, self,
+                                              threshold))
+
+    def _polygon_from_projected_rings(self, projected_rings):
+        """
+        Returns the projected polygon(s) derived from the projected
+        MultiLineStrings of a polygon's rings.
+
+        """
         # Each source ring will result in either a ring, or one or more
         # lines.
         rings = []
         multi_lines = []
-        for src_ring in [polygon.exterior] + list(polygon.interiors):
-            geometry = self._project_linear_ring(src_ring, src_crs)
+        for multi_line_string in projected_rings:
+            geometry = self._simplify_projected_ring(multi_line_string)
             if geometry.geom_type == 'LinearRing':
                 rings.append(geometry)
             else:
@@ -246,100 +520,94 @@ class Projection(CRS):
         lines and boundary.
 
         """
-        # Accumulate all the boundary and segment end points, along with
-        # their distance along the boundary.
-        edge_things = []
-
-        # Convert the boundary to a LineString so we can compute distances
-        # along it. (It doesn't work with a LinearRing)
-        boundary = sgeom.LineString(self.boundary)
-
-        def boundary_distance(xy):
-            return boundary.project(sgeom.Point(*xy))
-
-        # Squash all the LineStrings into a single list.
-        line_strings = []
-        for multi_line_string in multi_line_strings:
-            line_strings.extend(multi_line_string)
-
-        # Record the positions of all the segment ends
-        for i, line_string in enumerate(line_strings):
-            first_dist = boundary_distance(line_string.coords[0])
-            thing = _Thing(first_dist, False, (i, 'first', line_string.coords[0]))
-            edge_things.append(thing)
-            last_dist = boundary_distance(line_string.coords[-1])
-            thing = _Thing(last_dist, False, (i, 'last', line_string.coords[-1]))
-            edge_things.append(thing)
-
-        # Record the positions of all the boundary vertices
-        for xy in list(boundary.coords)[:-1]:
-            point = sgeom.Point(*xy)
-            dist = boundary.project(point)
-            thing = _Thing(dist, True, point)
-            edge_things.append(thing)
+        # Squash all the LineStrings into a single list of coordinate
+        # arrays.
+        line_coords = [numpy.array(line_string.coords)
+                       for multi_line_string in multi_line_strings
+                       for line_string in multi_line_string]
+        n_lines = len(line_coords)
+        if not n_lines:
+            return []
+
+        # NB. The distances are along the boundary as a LineString (rather
+        # than a LinearRing), starting from its first vertex.
+        boundary_coords = numpy.array(sgeom.LineString(self.boundary).coords)
+        boundary_points = boundary_coords[:-1]
+
+        # Accumulate all the segment end points and boundary points, along
+        # with their distance along the boundary. Line i has its first end
+        # at index 2 * i, and its last end at 2 * i + 1, and the boundary
+        # points follow the line ends.
+        ends = numpy.empty((n_lines, 2, 2))
+        for i, coords in enumerate(line_coords):
+            ends[i, 0] = coords[0]
+            ends[i, 1] = coords[-1]
+        points = numpy.concatenate([ends.reshape(-1, 2), boundary_points])
+        distances = _boundary_distances(boundary_coords, points)
+        n_ends = 2 * n_lines
+        is_boundary = numpy.arange(len(points)) >= n_ends
 
         # Order everything as if walking around the boundary.
         # NB. We make line end-points take precedence over boundary points
-        # to ensure that end-points are still found and followed when they coincide.
-        edge_things.sort(key=lambda thing: (thing.distance, thing.kind))
-        debug = 0
-        if debug:
-            print
-            print 'Edge things'
-            for thing in edge_things:
-                print '   ', thing
-
-        to_do = {i: line_string for i, line_string in enumerate(line_strings)}
+        # to ensure that end-points are still found and followed when they
+        # coincide. (The sort is stable, so ties are otherwise kept in
+        # their original order.)
+        order = numpy.lexsort((is_boundary, distances))
+        sorted_distances = distances[order]
+        # Which of the sorted things can still be visited.
+        active = numpy.ones(len(order), dtype=bool)
+        # Where each thing ended up in the sorted order.
+        sorted_position = numpy.empty(len(order), dtype=int)
+        sorted_position[order] = numpy.arange(len(order))
+        n_things = len(order)
+
+        def next_thing(distance):
+            # Returns the index of the first active thing strictly beyond
+            # the given distance, wrapping around to the start.
+            # TODO: Fix the problem of co-incident boundary & line points.
+            position = sorted_distances.searchsorted(distance, side='right')
+            while True:
+                if position == n_things:
+                    position = 0
+                if active[position]:
+                    return order[position]
+                position += 1
+
+        to_do = set(range(n_lines))
         done = []
         while to_do:
-            i, line_string = to_do.popitem()
-            if debug:
-                import sys
-                sys.stdout.write('+')
-                sys.stdout.flush()
-                print
-                print 'Processing: %s, %s' % (i, line_string)
-            edge_things = filter(lambda t: t.kind or t.data[0] != i or t.data[1] != 'last', edge_things)
+            i = to_do.pop()
+            # The last end of the line we start from is no longer of
+            # interest.
+            active[sorted_position[2 * i + 1]] = False
 
+            pieces = [line_coords[i]]
+            d_last = distances[2 * i + 1]
             while True:
-                # Find the distance of the last point
-                d_last = boundary_distance(line_string.coords[-1])
-                if debug:
-                    print '   d_last:', d_last
-                next_thing = _find_gt(edge_things, d_last)
-                if debug:
-                    print '   next_thing:', next_thing
-                if next_thing.kind:
-                    if debug:
-                        print '   adding boundary point'
-                    boundary_point = next_thing.data
-                    combined_coords = list(line_string.coords) + [(boundary_point.x, boundary_point.y)]
-                    line_string = sgeom.LineString(combined_coords)
-                    # XXX
-                    #edge_things.remove(next_thing)
-                elif next_thing.data[0] == i:
-                    if debug:
-                        print '   close loop'
-                    done.append(line_string)
+                thing = next_thing(d_last)
+                if is_boundary[thing]:
+                    # Add the boundary point.
+                    pieces.append(points[thing:thing + 1])
+                    d_last = distances[thing]
+                    continue
+
+                j, end = divmod(thing, 2)
+                if j == i:
+                    # Close the loop.
+                    done.append(numpy.concatenate(pieces))
                     break
                 else:
-                    if debug:
-                        print '   adding line'
-                    j = next_thing.data[0]
-                    line_to_append = line_strings[j]
-                    # XXX pelson: this was failing, before I added the if statement, but I don't understand how it could be failing... 
-                    if j in to_do:
-                        del to_do[j]
-                    coords_to_append = list(line_to_append.coords)
-                    if next_thing.data[1] == 'last':
-                        coords_to_append = coords_to_append[::-1]
-                    line_string = sgeom.LineString(list(line_string.coords) + coords_to_append)
+                    # Add line j, from whichever end we've arrived at.
+                    to_do.discard(j)
+                    if end == 0:
+                        pieces.append(line_coords[j])
+                        d_last = distances[2 * j + 1]
+                    else:
+                        pieces.append(line_coords[j][::-1])
+                        d_last = distances[2 * j]
 
         # XXX Is the last point in each ring actually the same as the first?
-        linear_rings = [LinearRing(line) for line in done]
-
-        if debug:
-            print '   DONE'
+        linear_rings = [LinearRing(coords) for coords in done]
 
         return linear_rings
 
@@ -354,22 +622,43 @@ class Projection(CRS):
 
         polygon_bits = []
 
+        # An interior ring can only be inside an exterior ring if its
+        # bounds are, so index the interior rings by their minimum x.
+        if interior_rings:
+            interior_bounds = numpy.array([ring.bounds
+                                           for ring in interior_rings])
+            by_x = numpy.argsort(interior_bounds[:, 0], kind='mergesort')
+            sorted_xmin = interior_bounds[by_x, 0]
+        used = numpy.zeros(len(interior_rings), dtype=bool)
+
         # Turn all the exterior rings into polygon definitions,
         # "slurping up" and interior rings they contain.
         for exterior_ring in exterior_rings:
-            polygon = sgeom.Polygon(exterior_ring)
             holes = []
-            for interior_ring in interior_rings[:]:
-                if polygon.contains(interior_ring):
-                    holes.append(interior_ring)
-                    interior_rings.remove(interior_ring)
+            if interior_rings:
+                x1, y1, x2, y2 = exterior_ring.bounds
+                candidates = by_x[sorted_xmin.searchsorted(x1, 'left'):
+                                  sorted_xmin.searchsorted(x2, 'right')]
+                bounds = interior_bounds[candidates]
+                candidates = candidates[(bounds[:, 1] >= y1) &
+                                        (bounds[:, 2] <= x2) &
+                                        (bounds[:, 3] <= y2) &
+                                        ~used[candidates]]
+                if len(candidates):
+                    polygon = prep(sgeom.Polygon(exterior_ring))
+                    for i in numpy.sort(candidates):
+                        if polygon.contains(interior_rings[i]):
+                            holes.append(interior_rings[i])
+                            used[i] = True
             polygon_bits.append((exterior_ring.coords,
                                  [ring.coords for ring in holes]))
 
         # Any left over "interior" rings need "inverting" with respect
         # to the boundary.
+        interior_rings = [ring for ring, ring_used in
+                          zip(interior_rings, used) if not ring_used]
         if interior_rings:
-            boundary_poly = sgeom.Polygon(self.boundary)
+            boundary_poly = self.domain
             x3, y3, x4, y4 = boundary_poly.bounds
             bx = (x4 - x3) * 0.1
             by = (y4 - y3) * 0.1
@@ -440,6 +729,8 @@ class _CylindricalProjection(_RectangularProjection):
 
 
 class PlateCarree(_CylindricalProjection):
+    _separable = True
+
     def __init__(self, central_longitude=0.0):
         proj4_params = {'proj': 'eqc', 'lon_0': central_longitude, 'a': math.degrees(1)}
         super(PlateCarree, self).__init__(proj4_params, 180, 90)
@@ -487,6 +778,8 @@ class OSGB(Projection):
 
 
 class Mercator(_RectangularProjection):
+    _separable = True
+
     def __init__(self, central_longitude=0.0):
         proj4_params = {'proj': 'merc', 'lon_0': central_longitude, 'a': math.degrees(1)}
         super(Mercator, self).__init__(proj4_params, 180, 180)
@@ -497,6 +790,8 @@ class Mercator(_RectangularProjection):
 
 
 class LambertCylindrical(_RectangularProjection):
+    _separable = True
+
     def __init__(self, central_longitude=0.0):
         proj4_params = {'proj': 'cea', 'lon_0': central_longitude, 'a': math.degrees(1)}
         super(LambertCylindrical, self).__init__(proj4_params, 180, math.degrees(1))
@@ -507,6 +802,8 @@ class LambertCylindrical(_RectangularProjection):
 
 
 class Miller(_RectangularProjection):
+    _separable = True
+
     def __init__(self, central_longitude=0.0):
         proj4_params = {'proj': 'mill', 'lon_0': central_longitude, 'a': math.degrees(1)}
         # XXX How can we derive the vertical limit of 131.98?
@@ -615,21 +912,14 @@ class _WarpedRectangularProjection(Projection):
         super(_WarpedRectangularProjection, self).__init__(proj4_params)
 
         # Obtain boundary points
-        points = []
         n = 91
-        geodetic_crs = self.as_geodetic()
-        for lat in numpy.linspace(-90, 90, n):
-            points.append(self.transform_point(180 + central_longitude, lat, geodetic_crs))
-        for lat in numpy.linspace(90, -90, n):
-            points.append(self.transform_point(-180 + central_longitude, lat, geodetic_crs))
-        points.append(self.transform_point(180 + central_longitude, -90, geodetic_crs))
-
-        self._boundary = sgeom.LineString(points[::-1])
-
-        x = [p[0] for p in points]
-        y = [p[1] for p in points]
-        self._x_limits = min(x), max(x)
-        self._y_limits = min(y), max(y)
+        lons = numpy.empty(2 * n + 1)
+        lons[:n] = 180 + central_longitude
+        lons[n:] = -180 + central_longitude
+        lons[-1] = 180 + central_longitude
+        lats = numpy.concatenate([numpy.linspace(-90, 90, n),
+                                  numpy.linspace(90, -90, n), [-90]])
+        self._set_sampled_boundary(lons, lats)
 
     @property
     def boundary(self):
@@ -670,56 +960,40 @@ class InterruptedGoodeHomolosine(Projection):
         super(InterruptedGoodeHomolosine, self).__init__(proj4_params)
 
         # Obtain boundary points
-        points = []
+        lons = []
+        lats = []
         n = 31
-        geodetic_crs = self.as_geodetic()
+
+        def add(lon, lat_from, lat_to):
+            lons.append(numpy.repeat(lon + central_longitude, n))
+            lats.append(numpy.linspace(lat_from, lat_to, n))
 
         # Right boundary
-        for lat in numpy.linspace(-90, 90, n):
-            points.append(self.transform_point(180 + central_longitude,
-                                               lat, geodetic_crs))
+        add(180, -90, 90)
 
         # Top boundary
         interrupted_lons = (-40.0,)
         delta = 0.001
         for lon in interrupted_lons:
-            for lat in numpy.linspace(90, 0, n):
-                points.append(self.transform_point(lon + delta +
-                                                   central_longitude,
-                                                   lat, geodetic_crs))
-            for lat in numpy.linspace(0, 90, n):
-                points.append(self.transform_point(lon - delta +
-                                                   central_longitude,
-                                                   lat, geodetic_crs))
+            add(lon + delta, 90, 0)
+            add(lon - delta, 0, 90)
 
         # Left boundary
-        for lat in numpy.linspace(90, -90, n):
-            points.append(self.transform_point(-180 + central_longitude,
-                                               lat, geodetic_crs))
+        add(-180, 90, -90)
 
         # Bottom boundary
         interrupted_lons = (-100.0, -20.0, 80.0)
         delta = 0.001
         for lon in interrupted_lons:
-            for lat in numpy.linspace(-90, 0, n):
-                points.append(self.transform_point(lon - delta +
-                                                   central_longitude,
-                                                   lat, geodetic_crs))
-            for lat in numpy.linspace(0, -90, n):
-                points.append(self.transform_point(lon + delta +
-                                                   central_longitude,
-                                                   lat, geodetic_crs))
+            add(lon - delta, -90, 0)
+            add(lon + delta, 0, -90)
 
         # Close loop
-        points.append(self.transform_point(180 + central_longitude, -90,
-                                           geodetic_crs))
-
-        self._boundary = sgeom.LineString(points[::-1])
+        lons.append([180 + central_longitude])
+        lats.append([-90])
 
-        x = [p[0] for p in points]
-        y = [p[1] for p in points]
-        self._x_limits = min(x), max(x)
-        self._y_limits = min(y), max(y)
+        self._set_sampled_boundary(numpy.concatenate(lons),
+                                   numpy.concatenate(lats))
 
     @property
     def boundary(self):
@@ -738,20 +1012,215 @@ class InterruptedGoodeHomolosine(Projection):
         return self._y_limits
 
 
-class _Thing(object):
-    def __init__(self, distance, kind, data):
-        self.distance = distance
-        self.kind = kind
-        self.data = data
+# The pool of threads used by Projection._map_threaded, which persists so
+# that its threads' proj.4 handles, GEOS contexts and prepared domains are
+# reused, with its number of threads and the process which created it.
+_pool = None
+_pool_size = 0
+_pool_pid = None
+# The number of callers using each pool. A pool which has been replaced
+# by a larger one is closed once it has none.
+_pool_users = {}
+_pool_lock = threading.Lock()
+
+
+def _acquire_thread_pool(threads):
+    """
+    Returns the shared pool of at least the given number of threads, which
+    must be given back to :func:`_release_thread_pool` once used.
+
+    """
+    global _pool, _pool_size, _pool_pid, _pool_users
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            # The threads of a parent process's pools don't exist here.
+            _pool = None
+            _pool_users = {}
+        if _pool is None or _pool_size < threads:
+            old_pool = _pool
+            _pool = ThreadPool(threads)
+            _pool_size = threads
+            _pool_pid = os.getpid()
+            if old_pool is not None and old_pool not in _pool_users:
+                old_pool.close()
+        _pool_users[_pool] = _pool_users.get(_pool, 0) + 1
+        return _pool
+
+
+def _release_thread_pool(pool):
+    """Gives back a pool returned by :func:`_acquire_thread_pool`."""
+    with _pool_lock:
+        if pool not in _pool_users:
+            # It belongs to a parent process.
+            return
+        _pool_users[pool] -= 1
+        if not _pool_users[pool]:
+            del _pool_users[pool]
+            if pool is not _pool:
+                pool.close()
+
+
+class _GeometryCache(object):
+    """
+    A thread-safe cache of projected geometries, which discards the least
+    recently used geometries to keep within a memory budget.
 
-    def __repr__(self):
-        return '_Thing(%r, %r, %s)' % (self.distance, self.kind, self.data)
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Maps each key to its (geometry, nbytes), in order of use.
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, geometry, src_crs, projection, threshold, extent=None):
+        if threshold is None:
+            threshold = projection.threshold
+        # NB. Subclasses of a projection may share its proj.4 definition,
+        # but have a different domain.
+        try:
+            domain_digest = projection._domain_digest
+        except AttributeError:
+            domain_digest = projection._domain_digest = hashlib.md5(
+                projection.domain.wkb).digest()
+        return (hashlib.md5(geometry.wkb).digest(),
+                type(src_crs), src_crs.proj4_init,
+                type(projection), projection.proj4_init, domain_digest,
+                float(threshold),
+                None if extent is None else tuple(float(value)
+                                                  for value in extent))
+
+    def get(self, key):
+        with self._lock:
+            try:
+                entry = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    # The approximate number of bytes taken by each entry besides its
+    # key and coordinates, e.g. by the geometry object and the link in
+    # the ordered dictionary.
+    ENTRY_OVERHEAD = 512
+
+    def nbytes(self, key, geometry):
+        """Returns the number of bytes charged for the given entry."""
+        return (self.ENTRY_OVERHEAD + sys.getsizeof(key) +
+                sum(sys.getsizeof(value) for value in key
+                    if not isinstance(value, type)) +
+                len(getattr(geometry, 'wkb', '')))
+
+    def put(self, key, geometry):
+        """
+        Caches the given result, and returns it as it should be given to
+        callers, i.e. with an empty list replaced by an empty tuple so
+        that it can be shared.
 
+        """
+        if isinstance(geometry, list) and not geometry:
+            geometry = ()
+        nbytes = self.nbytes(key, geometry)
+        if nbytes > self.max_bytes:
+            return geometry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+            self._entries[key] = (geometry, nbytes)
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                _, (_, old_nbytes) = self._entries.popitem(last=False)
+                self._nbytes -= old_nbytes
+                self.evictions += 1
+        return geometry
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self._nbytes,
+                    'max_bytes': self.max_bytes}
+
+
+# The cache used by Projection.project_geometry, or None if disabled.
+_geometry_cache = None
+
+
+def enable_geometry_cache(max_bytes=64 * 1024 * 1024):
+    """
+    Enables caching of the results of :meth:`Projection.project_geometry`,
+    which is shared by all projections (and therefore all GeoAxes).
+
+    Results are keyed on the WKB of the source geometry, the source and
+    target CRSs, and the threshold. The least recently used results are
+    discarded once their total size, as WKB, exceeds max_bytes.
+
+    Enabling the cache again replaces it with an empty one.
+
+    """
+    global _geometry_cache
+    if max_bytes <= 0:
+        raise ValueError('The cache size must be positive.')
+    _geometry_cache = _GeometryCache(max_bytes)
 
-def _find_gt(a, x):
-    for v in a:
-        # TODO: Fix the problem of co-incident boundary & line points
-        #if v.distance >= x:
-        if v.distance > x:
-            return v
-    return a[0]
+
+def disable_geometry_cache():
+    """Disables, and empties, the cache of projected geometries."""
+    global _geometry_cache
+    _geometry_cache = None
+
+
+def geometry_cache_stats():
+    """
+    Returns a dictionary describing the use of the cache of projected
+    geometries, or None if it is disabled.
+
+    The dictionary contains the number of cache ``hits``, ``misses`` and
+    ``evictions``, the number of ``entries`` and their total size in
+    ``bytes``, and the ``max_bytes`` allowed.
+
+    """
+    cache = _geometry_cache
+    if cache is None:
+        return None
+    return cache.stats()
+
+
+def _boundary_distances(boundary_coords, points):
+    """
+    Returns the distance along the line with the given (K, 2) array of
+    vertices of the nearest point on it to each of the given (M, 2)
+    points, as for shapely's LineString.project().
+
+    """
+    starts = boundary_coords[:-1]
+    deltas = boundary_coords[1:] - starts
+    lengths2 = (deltas ** 2).sum(axis=1)
+    lengths = numpy.sqrt(lengths2)
+    offsets = numpy.concatenate([[0], numpy.cumsum(lengths)[:-1]])
+    # Avoid dividing by zero for any repeated vertices.
+    safe_lengths2 = numpy.where(lengths2 == 0, 1, lengths2)
+
+    result = numpy.empty(len(points))
+    # Limit the size of the (points x segments) arrays.
+    chunk = max(1, 2 ** 20 // len(starts))
+    for i in range(0, len(points), chunk):
+        # The fraction along each segment of the nearest point to each
+        # point, and the (squared) distance to it.
+        rel = points[i:i + chunk, numpy.newaxis, :] - starts
+        fractions = (rel * deltas).sum(axis=2) / safe_lengths2
+        fractions = numpy.clip(fractions, 0, 1)
+        separations = ((rel - fractions[..., numpy.newaxis] * deltas) ** 2
+                       ).sum(axis=2)
+        # NB. Like GEOS, choose the first of any equally near segments.
+        nearest = separations.argmin(axis=1)
+        rows = numpy.arange(len(nearest))
+        result[i:i + chunk] = (offsets[nearest] +
+                               fractions[rows, nearest] * lengths[nearest])
+    return result
@@ -18,8 +18,10 @@
 
 import matplotlib.image
 import numpy
+import scipy.sparse
 import scipy.spatial
 
+from cartopy._crs import _separable
 import cartopy.crs as ccrs
 
 
@@ -62,6 +64,18 @@ def mesh_projection(projection, nx, ny, x_extents=[None, None], y_extents=[None,
         
     The return value is native coordinate system.
     
+    """
+    x, y, extent = _mesh_axes(projection, nx, ny, x_extents, y_extents)
+    x, y = numpy.meshgrid(x, y)
+    return x, y, extent
+
+
+def _mesh_axes(projection, nx, ny, x_extents=[None, None],
+               y_extents=[None, None]):
+    """
+    Returns the 1d x and y axes of the coords of mesh_projection, and
+    their extent.
+
     """
     x_lower = x_extents[0] or projection.x_limits[0]
     x_upper = x_extents[1] or projection.x_limits[1]
@@ -74,7 +88,6 @@ def mesh_projection(projection, nx, ny, x_extents=[None, None], y_extents=[None,
     x += 0.5 * xstep
     y += 0.5 * ystep
 
-    x, y = numpy.meshgrid(x, y)
     return x, y, [x_lower, x_upper, y_lower, y_upper]
 
 
@@ -106,14 +119,327 @@ def get_img_coords_and_nxy(fname, projection):
     return img, xyz, nx, ny
 
 
-def warp_img(fname, target_proj, source_proj=None, target_res=(400, 200)):
+def _approx_grid(transform, x, y, tolerance, initial_cell=32, min_cell=4):
+    """
+    Evaluates ``transform`` over the 2d grid of points x, y by
+    interpolating bilinearly between the exactly transformed corners of
+    rectangular cells of the grid.
+
+    Starting from cells of ``initial_cell`` points a side, the centre and
+    edge mid-points of each cell are transformed exactly and compared
+    with their interpolated values. Cells which interpolate to within
+    ``tolerance`` are filled by interpolation, the others are split in
+    four until they are no more than ``min_cell`` points a side, at which
+    point they are transformed exactly. Each level of the refinement
+    costs a single call to ``transform``.
+
+    ``transform`` takes 1d arrays of x and y and returns an (n, 3) array.
+
+    """
+    ny, nx = x.shape
+    result = numpy.empty((ny, nx, 3), dtype=numpy.float64)
+    # The points which have been transformed exactly.
+    exact = numpy.zeros((ny, nx), dtype=bool)
+
+    def transform_exactly(rows, cols):
+        todo = numpy.logical_not(exact[rows, cols])
+        if todo.any():
+            rows_todo, cols_todo = rows[todo], cols[todo]
+            result[rows_todo, cols_todo] = transform(x[rows_todo, cols_todo],
+                                                     y[rows_todo, cols_todo])
+            exact[rows_todo, cols_todo] = True
+        return result[rows, cols]
+
+    def edges(n):
+        return numpy.unique(numpy.r_[numpy.arange(0, n - 1, initial_cell),
+                                     n - 1])
+
+    if ny < 2 or nx < 2:
+        transform_exactly(*[a.ravel() for a in numpy.indices((ny, nx))])
+        return result
+
+    row_edges = edges(ny)
+    col_edges = edges(nx)
+    # The inclusive row and column bounds of each cell.
+    j0, i0 = [a.ravel() for a in numpy.meshgrid(col_edges[:-1],
+                                                row_edges[:-1])]
+    j1, i1 = [a.ravel() for a in numpy.meshgrid(col_edges[1:],
+                                                row_edges[1:])]
+
+    while len(i0):
+        im = (i0 + i1) // 2
+        jm = (j0 + j1) // 2
+        rows = numpy.concatenate([i0, i0, i1, i1, im, i0, i1, im, im])
+        cols = numpy.concatenate([j0, j1, j0, j1, jm, jm, jm, j0, j1])
+        values = transform_exactly(rows, cols).reshape(9, -1, 3)
+        c00, c01, c10, c11 = values[:4]
+
+        # Compare the bilinear interpolation of the test points with
+        # their exact values.
+        v = ((numpy.array([im, i0, i1, im, im]) - i0) /
+             (i1 - i0).astype(numpy.float64))[..., numpy.newaxis]
+        u = ((numpy.array([jm, jm, jm, j0, j1]) - j0) /
+             (j1 - j0).astype(numpy.float64))[..., numpy.newaxis]
+        with numpy.errstate(invalid='ignore'):
+            approx = ((1 - v) * (1 - u) * c00 + (1 - v) * u * c01 +
+                      v * (1 - u) * c10 + v * u * c11)
+            error = numpy.abs(approx - values[4:]).max(axis=2).max(axis=0)
+            # NB. Any non-finite values fail the test.
+            accept = error <= tolerance
+        small = ((i1 - i0) <= min_cell) | ((j1 - j0) <= min_cell)
+
+        for a0, a1, b0, b1, k in zip(i0[accept], i1[accept],
+                                     j0[accept], j1[accept],
+                                     numpy.flatnonzero(accept)):
+            v = numpy.linspace(0, 1, a1 - a0 + 1)[:, numpy.newaxis,
+                                                  numpy.newaxis]
+            u = numpy.linspace(0, 1, b1 - b0 + 1)[numpy.newaxis, :,
+                                                  numpy.newaxis]
+            block = ((1 - v) * (1 - u) * c00[k] + (1 - v) * u * c01[k] +
+                     v * (1 - u) * c10[k] + v * u * c11[k])
+            fill = numpy.logical_not(exact[a0:a1 + 1, b0:b1 + 1])
+            result[a0:a1 + 1, b0:b1 + 1][fill] = block[fill]
+
+        reject = numpy.logical_not(accept)
+        fallback = reject & small
+        if fallback.any():
+            indices = [numpy.indices((a1 - a0 + 1, b1 - b0 + 1)) +
+                       numpy.array([a0, b0])[:, numpy.newaxis, numpy.newaxis]
+                       for a0, a1, b0, b1 in zip(i0[fallback], i1[fallback],
+                                                 j0[fallback], j1[fallback])]
+            transform_exactly(
+                numpy.concatenate([index[0].ravel() for index in indices]),
+                numpy.concatenate([index[1].ravel() for index in indices]))
+
+        split = reject & numpy.logical_not(small)
+        i0, i1, j0, j1, im, jm = [a[split] for a in (i0, i1, j0, j1, im, jm)]
+        i0, i1, j0, j1 = (numpy.concatenate([i0, i0, im, im]),
+                          numpy.concatenate([im, im, i1, i1]),
+                          numpy.concatenate([j0, jm, j0, jm]),
+                          numpy.concatenate([jm, j1, jm, j1]))
+
+    return result
+
+
+def approx_transform_points(target_crs, source_crs, x, y, tolerance,
+                            return_valid=False):
+    """
+    Returns an approximation of ``target_crs.transform_points(source_crs,
+    x, y)`` for the 2d grid of points x, y, which is accurate to within
+    ``tolerance`` target units.
+
+    Only a fraction of the points are transformed by proj.4, the rest are
+    interpolated. The grid is refined adaptively, so discontinuities and
+    points which fail to transform are still handled exactly.
+
+    """
+    x = numpy.asanyarray(x, dtype=numpy.float64)
+    y = numpy.asanyarray(y, dtype=numpy.float64)
+    if x.ndim != 2 or x.shape != y.shape:
+        raise ValueError('x and y must be 2d arrays of the same shape.')
+
+    def transform(xs, ys):
+        return target_crs.transform_points(source_crs, xs, ys)
+
+    result = _approx_grid(transform, x, y, tolerance)
+    if return_valid:
+        valid = numpy.isfinite(result[..., :2]).all(axis=-1)
+        return result, valid
+    return result
+
+
+def _scaled_tolerance(target_proj, crs, x, y, tolerance):
+    """
+    Converts a tolerance in target_proj units into crs units, e.g.
+    geocentric metres, using the scale at the centre of the target grid.
+
+    """
+    ny, nx = x.shape
+    i, j = ny // 2, max(nx // 2 - 1, 0)
+    k = min(j + 1, nx - 1)
+    pts = crs.transform_points(target_proj, x[i, [j, k]], y[i, [j, k]])
+    native = numpy.hypot(x[i, k] - x[i, j], y[i, k] - y[i, j])
+    distance = numpy.sqrt(((pts[1] - pts[0]) ** 2).sum())
+    scale = distance / native
+    if not numpy.isfinite(scale) or scale <= 0:
+        scale = 1.0
+    return tolerance * scale
+
+
+def _open_image(fname):
+    """
+    Returns the shape and dtype of the source image of warp_img, and a
+    function which reads the pixels in the given slices of its rows and
+    columns.
+
+    """
+    if isinstance(fname, basestring):
+        if not fname.endswith('.npy'):
+            from PIL import Image
+            img = Image.open(fname)
+            sample = numpy.asarray(img.crop((0, 0, 1, 1)))
+            shape = (img.size[1], img.size[0]) + sample.shape[2:]
+
+            def read(rows, cols):
+                box = (cols.start, rows.start, cols.stop, rows.stop)
+                return numpy.asarray(img.crop(box))
+            return shape, sample.dtype, read
+        array = numpy.load(fname, mmap_mode='r')
+    else:
+        array = numpy.asanyarray(fname)
+
+    def read(rows, cols):
+        return numpy.asarray(array[rows, cols])
+    return array.shape, array.dtype, read
+
+
+def _warp_block(read, source_axes, source_shape, source_origin, source_cs,
+                target_proj, x, y, method, fill_value, approx_tolerance):
+    """
+    Returns the block of the warped image at the given target points,
+    reading only the window of the source image which it needs.
+
+    """
+    ny, nx = source_shape
+    i, j, valid, wraps, source_points = _source_fractions(
+        source_axes, source_shape, source_cs, target_proj, x, y,
+        approx_tolerance)
+    # NB. This may overwrite the source points.
+    valid &= numpy.logical_not(_round_trip_invalid(source_cs, target_proj,
+                                                   x, y, approx_tolerance,
+                                                   source_points))
+    # Only the points within half a cell of the source have a value.
+    valid &= (i >= -0.5) & (i <= ny - 0.5)
+    if not wraps:
+        valid &= (j >= -0.5) & (j <= nx - 0.5)
+    if not valid.any():
+        return fill_value
+
+    # The window of source rows and columns needed by both the nearest
+    # and the bilinear neighbours of the block.
+    i0 = max(int(numpy.floor(i[valid].min())), 0)
+    i1 = min(int(numpy.floor(i[valid].max())) + 2, ny)
+    j_min = int(numpy.floor(j[valid].min()))
+    j_max = int(numpy.floor(j[valid].max()))
+    if wraps and (j_min < 0 or j_max + 1 > nx - 1):
+        # The block needs the columns on both sides of the wrap.
+        j0, j1 = 0, nx
+    else:
+        wraps = False
+        j0, j1 = max(j_min, 0), min(j_max + 2, nx)
+
+    if source_origin == 'upper':
+        window = read(slice(ny - i1, ny - i0), slice(j0, j1))[::-1]
+    else:
+        window = read(slice(i0, i1), slice(j0, j1))
+    window_shape = (i1 - i0, j1 - j0)
+
+    regridder = Regridder.__new__(Regridder)
+    if method == 'nearest':
+        indices, mask = _nearest_fractions(i - i0, j - j0, valid, wraps,
+                                           window_shape)
+        regridder._set(method, window_shape, x.shape, mask, indices=indices)
+    else:
+        weights = _bilinear_fractions(i - i0, j - j0, valid, wraps,
+                                      window_shape)
+        mask = (numpy.diff(weights.indptr) == 0).reshape(x.shape)
+        regridder._set(method, window_shape, x.shape, mask, weights=weights)
+    return numpy.ma.filled(regridder(window), fill_value)
+
+
+def warp_img(fname, target_proj, source_proj=None, target_res=(400, 200),
+             source_extent=None, target_extent=None, source_origin='upper',
+             block_shape=(256, 256), out=None, fill_value=0,
+             method='nearest', approx_tolerance=None):
+    """
+    Warps the image in the given file onto target_proj, a block of the
+    target at a time, so that neither the image nor the result need fit
+    in memory.
+
+    Args:
+
+        * fname - The filename of a .npy file, which is memory mapped, or
+            of an image which PIL can open, or an array such as a
+            numpy.memmap.
+        * target_proj - The projection to warp the image onto.
+
+    Kwargs:
+
+        * source_proj - The projection of the image (default PlateCarree).
+        * target_res - The (nx, ny) of the warped image.
+        * source_extent - The extent of the image, in source coordinates
+            (see warp_array).
+        * target_extent - The extent of the warped image, in target
+            coordinates (see warp_array).
+        * source_origin - 'upper' (the default) if the first row of the
+            image is its top, as for image files, or 'lower'.
+        * block_shape - The (ny, nx) of the blocks of the target which
+            are warped at a time.
+        * out - An array, such as a numpy.memmap, or the filename of a
+            .npy file to create, into which the warped image is written.
+        * fill_value - The value of the target points which have no
+            value (default 0).
+        * method - 'nearest' (the default) or 'bilinear' (see Regridder).
+        * approx_tolerance - See regrid.
+
+    Returns:
+        The warped image, with its first row at the bottom, and its
+        extent in target coordinates.
+
+    NB. PIL can only read windows of some formats, e.g. uncompressed
+    TIFFs, without decoding the whole image. Convert others to .npy
+    files first.
+
+    """
     if source_proj is None:
         source_proj = ccrs.PlateCarree()
+    if method not in ('nearest', 'bilinear'):
+        raise ValueError('Unsupported warp_img method {!r}'.format(method))
+    if source_origin not in ('upper', 'lower'):
+        raise ValueError("Expected a source_origin of 'upper' or 'lower', "
+                         "got {!r}".format(source_origin))
+    if source_extent is None:
+        source_extent = [None] * 4
+    if target_extent is None:
+        target_extent = [None] * 4
+
+    shape, dtype, read = _open_image(fname)
+    source_shape = shape[:2]
+    bands = shape[2:]
+    source_x, source_y, (x_lower, x_upper, y_lower, y_upper) = _mesh_axes(
+        source_proj, shape[1], shape[0], source_extent[:2], source_extent[2:])
+    source_axes = ((source_x[0], (x_upper - x_lower) / float(shape[1])),
+                   (source_y[0], (y_upper - y_lower) / float(shape[0])))
 
-    raise NotImplementedError('Not yet implemented.')
+    target_x, target_y, extent = _mesh_axes(target_proj, target_res[0],
+                                            target_res[1], target_extent[:2],
+                                            target_extent[2:])
+    target_shape = (len(target_y), len(target_x)) + bands
+    if out is None:
+        out = numpy.empty(target_shape, dtype=dtype)
+    elif isinstance(out, basestring):
+        out = numpy.lib.format.open_memmap(out, mode='w+', dtype=dtype,
+                                           shape=target_shape)
+    elif out.shape != target_shape:
+        raise ValueError('Expected out to have shape {}, got {}'.format(
+            target_shape, out.shape))
 
+    block_ny, block_nx = block_shape
+    for r0 in xrange(0, target_shape[0], block_ny):
+        for c0 in xrange(0, target_shape[1], block_nx):
+            x, y = numpy.meshgrid(target_x[c0:c0 + block_nx],
+                                  target_y[r0:r0 + block_ny])
+            out[r0:r0 + block_ny, c0:c0 + block_nx] = _warp_block(
+                read, source_axes, source_shape, source_origin,
+                source_proj, target_proj, x, y, method, fill_value,
+                approx_tolerance)
+    if isinstance(out, numpy.memmap):
+        out.flush()
+    return out, extent
 
-def warp_array(array, target_proj, source_proj=None, target_res=(400, 200), source_extent=None, target_extent=None):
+
+def warp_array(array, target_proj, source_proj=None, target_res=(400, 200), source_extent=None, target_extent=None,
+               approx_tolerance=None, method='nearest'):
     # source_extent is in source coordinates
     if source_extent is None:
         source_extent = [None] * 4
@@ -140,88 +466,635 @@ def warp_array(array, target_proj, source_proj=None, target_res=(400, 200), sour
 
     array = regrid(array, source_native_xy[0], source_native_xy[1],
                            source_proj, target_proj,
-                           target_native_x, target_native_y)
+                           target_native_x, target_native_y,
+                           approx_tolerance=approx_tolerance, method=method)
     return array, extent
 
 
-def regrid(array, source_x_coords, source_y_coords, source_cs, target_proj,
-           target_x_points, target_y_points):
-    # n.b. source_cs is actually a projection (the coord system of the
-    # source coordinates), but not necessarily the native projection of
-    # the source array (i.e. you can provide a warped image with lat lon
-    # coordinates).
+def _grid_axes(x, y):
+    """
+    Returns the 1d x and y axes of the 2d arrays x and y if they are the
+    result of meshgrid, otherwise None.
 
-    #XXX NB. target_x and target_y must currently be rectangular (i.e. be a 2d np array)
-    xyz = source_cs.as_geocentric().transform_points(source_cs,
-                                                     source_x_coords.flatten(),
-                                                     source_y_coords.flatten())
-    target_xyz = source_cs.as_geocentric().transform_points(target_proj,
-                                                            target_x_points.flatten(),
-                                                            target_y_points.flatten())
-
-    kdtree = scipy.spatial.cKDTree(xyz)
-    distances, indices = kdtree.query(target_xyz, k=1)
-    mask = numpy.isinf(distances)
-
-    desired_ny, desired_nx = target_x_points.shape
-    if array.ndim == 2:
-        # Handle missing neighours using a masked array
-        if numpy.any(mask):
-            indices = numpy.where(numpy.logical_not(mask), indices, 0)
-            array_1d = numpy.ma.array(array.reshape(-1)[indices], mask=mask)
-        else:
-            array_1d = array.reshape(-1)[indices]
+    """
+    x = numpy.asanyarray(x)
+    y = numpy.asanyarray(y)
+    if x.ndim != 2 or x.shape != y.shape:
+        return None
+    x_axis = x[0]
+    y_axis = y[:, 0]
+    if numpy.all(x == x_axis) and numpy.all(y == y_axis[:, numpy.newaxis]):
+        return x_axis, y_axis
+    return None
+
+
+def _regular_axis(axis):
+    """
+    Returns the first value and the step of the given 1d axis if it is
+    evenly spaced, otherwise None.
+
+    """
+    n = len(axis)
+    if n < 2:
+        return None
+    step = (axis[-1] - axis[0]) / float(n - 1)
+    if not numpy.isfinite(step) or step == 0:
+        return None
+    if numpy.any(numpy.abs(numpy.diff(axis) - step) > 1e-6 * abs(step)):
+        return None
+    return axis[0], step
+
+
+def _regular_axes(x, y):
+    """
+    Returns the (first value, step) of the x and y axes of the 2d arrays
+    x and y if they are a regular grid, otherwise None.
+
+    """
+    axes = _grid_axes(x, y)
+    if axes is None:
+        return None
+    x_axis = _regular_axis(axes[0])
+    y_axis = _regular_axis(axes[1])
+    if x_axis is None or y_axis is None:
+        return None
+    return x_axis, y_axis
+
+
+def _x_period(crs):
+    """
+    Returns the period over which x wraps around in the given coordinate
+    system, or None if it does not.
+
+    """
+    if isinstance(crs, ccrs._CylindricalProjection):
+        return abs(crs.x_limits[1] - crs.x_limits[0])
+    elif crs.is_geodetic():
+        return 360.0
+    return None
 
-        new_array = array_1d.reshape(desired_ny, desired_nx)
-    elif array.ndim == 3:
-        # Handle missing neighours using a masked array
-        if numpy.any(mask):
-            indices = numpy.where(numpy.logical_not(mask), indices, 0)
-            array_2d = array.reshape(-1, array.shape[-1])[indices]
-            mask, array_2d = numpy.broadcast_arrays(mask.reshape(-1, 1), array_2d)
-            array_2d = numpy.ma.array(array_2d, mask=mask)
-        else:
-            array_2d = array.reshape(-1, array.shape[-1])[indices]
 
-        new_array = array_2d.reshape(desired_ny, desired_nx, array.shape[-1])
+def _source_fractions(source_axes, source_shape, source_cs, target_proj,
+                      target_x_points, target_y_points,
+                      approx_tolerance=None):
+    """
+    Returns the fractional row and column indices of each target point
+    in a source grid which is regular in source_cs, whether they are
+    valid, and whether the columns wrap around.
+
+    The columns wrap around if source_cs is cylindrical and the source
+    covers its whole x range, in which case they are in the range
+    [-0.5, nx - 0.5).
+
+    Also returns the target points in source_cs, and whether they are
+    valid, for the round trip check (see _round_trip_invalid).
+
+    """
+    (x0, dx), (y0, dy) = source_axes
+    ny, nx = source_shape
+    approx = (approx_tolerance is not None and
+              numpy.ndim(target_x_points) == 2 and
+              numpy.shape(target_x_points) == numpy.shape(target_y_points))
+    if approx:
+        tolerance = _scaled_tolerance(target_proj, source_cs,
+                                      target_x_points, target_y_points,
+                                      approx_tolerance)
+        xyz, valid = approx_transform_points(source_cs, target_proj,
+                                             target_x_points,
+                                             target_y_points, tolerance,
+                                             return_valid=True)
+    elif (_separable(target_proj, source_cs) and
+            _grid_axes(target_x_points, target_y_points) is not None):
+        target_x_axis, target_y_axis = _grid_axes(target_x_points,
+                                                  target_y_points)
+        xyz, valid = source_cs.transform_grid(target_proj, target_x_axis,
+                                              target_y_axis,
+                                              return_valid=True)
+    else:
+        xyz, valid = source_cs.transform_points(target_proj,
+                                                target_x_points,
+                                                target_y_points,
+                                                return_valid=True)
+
+    wraps = False
+    with numpy.errstate(invalid='ignore'):
+        i = (xyz[..., 1] - y0) / dy
+        j = (xyz[..., 0] - x0) / dx
+        period = _x_period(source_cs)
+        if period is not None:
+            period = period / abs(dx)
+            j = numpy.mod(j + 0.5, period) - 0.5
+            wraps = abs(period - nx) < 1
+        valid = valid & numpy.isfinite(i) & numpy.isfinite(j)
+    i[~valid] = 0
+    j[~valid] = 0
+    return i, j, valid, wraps, (xyz, valid)
+
+
+def _regular_indices(source_axes, source_shape, source_cs, target_proj,
+                     target_x_points, target_y_points,
+                     approx_tolerance=None):
+    """
+    Returns the flat indices of the nearest source point to each target
+    point, for a source grid which is regular in source_cs, and a
+    boolean array which is True for the target points which have no
+    nearest neighbour, both of the shape of the target points.
+
+    Rather than searching for the nearest neighbours, each target point
+    is transformed into source_cs and rounded to the nearest index. The
+    x axis wraps around if source_cs is cylindrical.
+
+    Also returns the target points in source_cs, and whether they are
+    valid, for the round trip check (see _round_trip_invalid).
+
+    """
+    i, j, valid, wraps, source_points = _source_fractions(
+        source_axes, source_shape, source_cs, target_proj, target_x_points,
+        target_y_points, approx_tolerance)
+    indices, mask = _nearest_fractions(i, j, valid, wraps, source_shape)
+    return indices, mask, source_points
+
+
+def _nearest_fractions(i, j, valid, wraps, source_shape):
+    """
+    Returns the flat indices of the source points nearest to the given
+    fractional row and column indices (see _source_fractions), and a
+    boolean array which is True where there are none.
+
+    """
+    ny, nx = source_shape
+    i = numpy.floor(i + 0.5).astype(numpy.intp)
+    j = numpy.floor(j + 0.5).astype(numpy.intp)
+    if wraps:
+        j %= nx
+    valid = valid & (i >= 0) & (i < ny) & (j >= 0) & (j < nx)
+
+    indices = numpy.where(valid, i * nx + j, 0)
+    mask = numpy.logical_not(valid)
+    return indices, mask
+
+
+def _bilinear_weights(source_axes, source_shape, source_cs, target_proj,
+                      target_x_points, target_y_points,
+                      approx_tolerance=None):
+    """
+    Returns a sparse matrix of the weights of the source points which
+    bilinearly interpolate each target point, for a source grid which is
+    regular in source_cs.
+
+    Target points within half a cell of the edge of the source grid take
+    the values at its edge.
+
+    Also returns the target points in source_cs, and whether they are
+    valid, for the round trip check (see _round_trip_invalid).
+
+    """
+    i, j, valid, wraps, source_points = _source_fractions(
+        source_axes, source_shape, source_cs, target_proj, target_x_points,
+        target_y_points, approx_tolerance)
+    weights = _bilinear_fractions(i, j, valid, wraps, source_shape)
+    return weights, source_points
+
+
+def _bilinear_fractions(i, j, valid, wraps, source_shape):
+    """
+    Returns a sparse matrix of the weights of the source points which
+    bilinearly interpolate the given fractional row and column indices
+    (see _source_fractions).
+
+    """
+    ny, nx = source_shape
+    i = i.reshape(-1)
+    j = j.reshape(-1)
+    valid = valid.reshape(-1) & (i >= -0.5) & (i <= ny - 0.5)
+    if not wraps:
+        valid &= (j >= -0.5) & (j <= nx - 0.5)
+    rows = numpy.flatnonzero(valid)
+    i = i[rows]
+    j = j[rows]
+
+    i = numpy.clip(i, 0, ny - 1)
+    i0 = numpy.minimum(numpy.floor(i), max(ny - 2, 0)).astype(numpy.intp)
+    i1 = numpy.minimum(i0 + 1, ny - 1)
+    fi = i - i0
+    if wraps:
+        j0 = numpy.floor(j)
+        fj = j - j0
+        j0 = j0.astype(numpy.intp) % nx
+        j1 = (j0 + 1) % nx
+    else:
+        j = numpy.clip(j, 0, nx - 1)
+        j0 = numpy.minimum(numpy.floor(j), max(nx - 2, 0)).astype(numpy.intp)
+        j1 = numpy.minimum(j0 + 1, nx - 1)
+        fj = j - j0
+
+    rows = numpy.tile(rows, 4)
+    cols = numpy.concatenate([i0 * nx + j0, i0 * nx + j1,
+                              i1 * nx + j0, i1 * nx + j1])
+    data = numpy.concatenate([(1 - fi) * (1 - fj), (1 - fi) * fj,
+                              fi * (1 - fj), fi * fj])
+    weights = scipy.sparse.coo_matrix((data, (rows, cols)),
+                                      shape=(valid.size, ny * nx)).tocsr()
+    return weights
+
+
+def _conservative_weights(source_axes, source_shape, source_cs,
+                          target_proj, target_x_points, target_y_points,
+                          approx_tolerance=None, max_samples=8):
+    """
+    Returns a sparse matrix of the weights of the source points which
+    make up the area weighted mean of each target cell, for a source
+    grid which is regular in source_cs, and target points which are the
+    centres of a regular grid of cells.
+
+    The overlap of each target cell with the source cells is found by
+    sampling the target cell at a grid of points, enough to sample each
+    source cell it covers at the centre of the target grid, up to
+    ``max_samples`` a side.
+
+    """
+    target_axes = _regular_axes(target_x_points, target_y_points)
+    if target_axes is None:
+        raise ValueError('Conservative regridding needs a regular grid of '
+                         'target points.')
+    (_, target_dx), (_, target_dy) = target_axes
+    (_, dx), (_, dy) = source_axes
+    target_ny, target_nx = numpy.shape(target_x_points)
+
+    # The number of source cells across a target cell.
+    scale = _scaled_tolerance(target_proj, source_cs, target_x_points,
+                              target_y_points, 1.0)
+    cells = max(abs(target_dx / dx), abs(target_dy / dy)) * scale
+    samples = int(numpy.clip(numpy.ceil(cells), 2, max_samples))
+
+    offsets = (numpy.arange(samples) + 0.5) / samples - 0.5
+    x_axis, y_axis = _grid_axes(target_x_points, target_y_points)
+    sample_x, sample_y = numpy.meshgrid(
+        (x_axis[:, numpy.newaxis] + offsets * target_dx).reshape(-1),
+        (y_axis[:, numpy.newaxis] + offsets * target_dy).reshape(-1))
+    indices, mask, _ = _regular_indices(source_axes, source_shape,
+                                        source_cs, target_proj,
+                                        sample_x, sample_y, approx_tolerance)
+
+    # The target cell of each sample.
+    rows = (numpy.arange(target_ny * samples) // samples)[:, numpy.newaxis]
+    cols = (numpy.arange(target_nx * samples) // samples)[numpy.newaxis, :]
+    targets = (rows * target_nx + cols)[~mask]
+    indices = indices[~mask]
+
+    n_target = target_ny * target_nx
+    weights = scipy.sparse.coo_matrix(
+        (numpy.ones(indices.size), (targets, indices)),
+        shape=(n_target, source_shape[0] * source_shape[1])).tocsr()
+    # Each valid sample contributes equally to its target cell.
+    counts = numpy.bincount(targets, minlength=n_target).astype(numpy.float64)
+    counts[counts == 0] = 1
+    weights = scipy.sparse.diags(1 / counts, 0).dot(weights).tocsr()
+    return weights
+
+
+def _nearest_indices(source_x_coords, source_y_coords, source_cs,
+                     target_proj, target_x_points, target_y_points,
+                     approx_tolerance=None):
+    """
+    Returns the flat indices of the nearest source point to each target
+    point, and a boolean array which is True for the target points which
+    have no nearest neighbour, both of the shape of the target points.
+
+    """
+    geocentric = source_cs.as_geocentric()
+    xyz, source_valid = geocentric.transform_points(source_cs,
+                                                    source_x_coords,
+                                                    source_y_coords,
+                                                    return_valid=True)
+    approx = (approx_tolerance is not None and
+              numpy.ndim(target_x_points) == 2 and
+              numpy.shape(target_x_points) == numpy.shape(target_y_points))
+    if approx:
+        tolerance = _scaled_tolerance(target_proj, geocentric,
+                                      target_x_points, target_y_points,
+                                      approx_tolerance)
+        target_xyz, target_valid = approx_transform_points(
+            geocentric, target_proj, target_x_points, target_y_points,
+            tolerance, return_valid=True)
     else:
-        raise ValueError('Expected array.ndim to be 2 or 3, got {}'.format(array.ndim))
+        target_xyz, target_valid = geocentric.transform_points(
+            target_proj, target_x_points, target_y_points, return_valid=True)
+
+    # Only the successfully transformed points take part in the
+    # nearest neighbour search.
+    source_indices = numpy.flatnonzero(source_valid)
+    target_shape = target_valid.shape
+    if source_indices.size == 0:
+        # There are no neighbours to be had.
+        return (numpy.zeros(target_shape, dtype=numpy.intp),
+                numpy.ones(target_shape, dtype=bool))
+    target_valid = target_valid.reshape(-1)
+    kdtree = scipy.spatial.cKDTree(xyz.reshape(-1, 3)[source_indices])
+    indices = numpy.zeros(target_valid.shape, dtype=numpy.intp)
+    _, valid_indices = kdtree.query(target_xyz.reshape(-1, 3)[target_valid],
+                                    k=1)
+    indices[target_valid] = source_indices[valid_indices]
+    mask = numpy.logical_not(target_valid)
+    return indices.reshape(target_shape), mask.reshape(target_shape)
+
+
+def _round_trip_invalid(source_cs, target_proj, target_x_points,
+                        target_y_points, approx_tolerance=None,
+                        source_points=None):
+    """
+    Returns a boolean array which is True for the target points which do
+    not map to the source coordinate system and back to within a fixed
+    fractional offset of where they started.
 
-    # Do double transform to clip points that do not map back and forth
-    # to the same point to within a fixed fractional offset.
+    If given, source_points is the (xyz, valid) of the target points in
+    the source coordinate system, and may be overwritten. It isn't used
+    for a grid of target points in separable coordinate systems, whose
+    axes are transformed on their own.
+
+    """
     # XXX THIS ONLY NEEDS TO BE DONE FOR (PSEUDO-)CYLINDRICAL PROJECTIONS (OR ANY OTHERS
     # WHICH HAVE THE CONCEPT OF WRAPPING)
-    source_desired_xyz = source_cs.transform_points(target_proj,
-                                                    target_x_points.flatten(),
-                                                    target_y_points.flatten())
-    back_to_target_xyz = target_proj.transform_points(source_cs,
-                                                      source_desired_xyz[:, 0],
-                                                      source_desired_xyz[:, 1])
-    back_to_target_x = back_to_target_xyz[:, 0].reshape(desired_ny, desired_nx)
-    back_to_target_y = back_to_target_xyz[:, 1].reshape(desired_ny, desired_nx)
+    approx = (approx_tolerance is not None and
+              numpy.ndim(target_x_points) == 2 and
+              numpy.shape(target_x_points) == numpy.shape(target_y_points))
+    if approx:
+        # Approximate the round trip as a whole, so that its
+        # discontinuities are where the refinement happens.
+        def round_trip(xs, ys):
+            pts = source_cs.transform_points(target_proj, xs, ys)
+            return target_proj.transform_points(source_cs, pts[:, 0],
+                                                pts[:, 1], out=pts)
+        back_to_target_xyz = _approx_grid(round_trip,
+                                          numpy.asarray(target_x_points),
+                                          numpy.asarray(target_y_points),
+                                          approx_tolerance)
+        valid = back_valid = numpy.isfinite(
+            back_to_target_xyz[..., :2]).all(axis=-1)
+    elif (_separable(target_proj, source_cs) and
+            _grid_axes(target_x_points, target_y_points) is not None):
+        # The round trip maps grids to grids, so only the axes need to
+        # be transformed. NB. The origin of each separable CRS is on the
+        # equator.
+        target_x_axis, target_y_axis = _grid_axes(target_x_points,
+                                                  target_y_points)
+        source_x_axis = source_cs.transform_points(
+            target_proj, target_x_axis, numpy.zeros_like(target_x_axis))[:, 0]
+        source_y_axis = source_cs.transform_points(
+            target_proj, numpy.zeros_like(target_y_axis), target_y_axis)[:, 1]
+        back_to_target_xyz, back_valid = target_proj.transform_grid(
+            source_cs, source_x_axis, source_y_axis, return_valid=True)
+        valid = back_valid
+    else:
+        if source_points is None:
+            source_desired_xyz, valid = source_cs.transform_points(
+                target_proj, target_x_points, target_y_points,
+                return_valid=True)
+        else:
+            source_desired_xyz, valid = source_points
+        # Transform back in place, re-using the buffer of source points.
+        back_to_target_xyz, back_valid = target_proj.transform_points(
+            source_cs, source_desired_xyz[..., 0], source_desired_xyz[..., 1],
+            out=source_desired_xyz, return_valid=True)
+    back_to_target_x = back_to_target_xyz[..., 0]
+    back_to_target_y = back_to_target_xyz[..., 1]
     FRACTIONAL_OFFSET_THRESHOLD = 0.1 # data has moved by 10% of the map
     
     x_extent = numpy.abs(target_proj.x_limits[1] - target_proj.x_limits[0])
     y_extent = numpy.abs(target_proj.y_limits[1] - target_proj.y_limits[0])
 
-    non_self_inverse_points = (numpy.abs(target_x_points - back_to_target_x) /
-                               x_extent) > FRACTIONAL_OFFSET_THRESHOLD
-    if numpy.any(non_self_inverse_points):
-        if numpy.ma.isMaskedArray(new_array):
-            new_array.mask[non_self_inverse_points] = True
+    # Points which failed either transformation, or which moved too far.
+    invalid = numpy.logical_not(valid & back_valid)
+    invalid |= (numpy.abs(target_x_points - back_to_target_x) /
+                x_extent) > FRACTIONAL_OFFSET_THRESHOLD
+    invalid |= (numpy.abs(target_y_points - back_to_target_y) /
+                y_extent) > FRACTIONAL_OFFSET_THRESHOLD
+    return invalid
+
+
+#: The methods of regridding supported by Regridder.
+REGRID_METHODS = ('nearest', 'bilinear', 'conservative')
+
+
+class Regridder(object):
+    """
+    Regrids arrays from a source grid onto a target grid.
+
+    The nearest neighbours, or the interpolation weights, of the target
+    points are found once when the Regridder is created, so regridding
+    each array costs a single gather, or sparse matrix product. This
+    makes it suitable for time series and other stacks of fields on the
+    same grid.
+
+    """
+    def __init__(self, source_x_coords, source_y_coords, source_cs,
+                 target_proj, target_x_points, target_y_points,
+                 approx_tolerance=None, method='nearest'):
+        """
+        Args:
+
+            * source_x_coords, source_y_coords - The coordinates of the
+                source points, in source_cs.
+            * source_cs - The coordinate system of the source
+                coordinates. NB. this need not be the native projection
+                of the source array.
+            * target_proj - The projection of the target points.
+            * target_x_points, target_y_points - 2d arrays of the
+                coordinates of the target points, in target_proj.
+
+        Kwargs:
+
+            * approx_tolerance - If given, the transformations of the
+                target grid are approximated to within that many target
+                units (see approx_transform_points).
+            * method - One of 'nearest' (the default), 'bilinear' or
+                'conservative', i.e. the area weighted mean of the
+                source cells which overlap each target cell. The
+                'bilinear' and 'conservative' methods need a regular
+                source grid, and 'conservative' a regular target grid.
+
+        """
+        if method not in REGRID_METHODS:
+            raise ValueError('Unknown regrid method {!r}, expected one of '
+                             '{}'.format(method, REGRID_METHODS))
+        #XXX NB. target_x and target_y must currently be rectangular (i.e. be a 2d np array)
+        source_shape = numpy.shape(source_x_coords)
+        target_shape = numpy.shape(target_x_points)
+        indices = weights = source_points = None
+        source_axes = _regular_axes(source_x_coords, source_y_coords)
+        if method != 'nearest' and source_axes is None:
+            raise ValueError('The {!r} regrid method needs a regular grid '
+                             'of source points.'.format(method))
+
+        if method == 'bilinear':
+            weights, source_points = _bilinear_weights(
+                source_axes, source_shape, source_cs, target_proj,
+                target_x_points, target_y_points, approx_tolerance)
+        elif method == 'conservative':
+            weights = _conservative_weights(
+                source_axes, source_shape, source_cs, target_proj,
+                target_x_points, target_y_points, approx_tolerance)
+        elif source_axes is not None:
+            # A regular source grid needs no nearest neighbour search.
+            indices, missing, source_points = _regular_indices(
+                source_axes, source_shape, source_cs, target_proj,
+                target_x_points, target_y_points, approx_tolerance)
         else:
-            new_array = numpy.ma.array(new_array, mask=True)
-            new_array.mask[...] = False
-            if new_array.ndim == 3:
-                for i in range(new_array.shape[2]):
-                    new_array.mask[:, :, i] = non_self_inverse_points
-            else:
-                new_array.mask[...] = non_self_inverse_points
-    non_self_inverse_points = (numpy.abs(target_y_points - back_to_target_y) /
-                               y_extent) > FRACTIONAL_OFFSET_THRESHOLD
-    if numpy.any(non_self_inverse_points):
-        if numpy.ma.isMaskedArray(new_array):
-            new_array.mask[non_self_inverse_points] = True
+            indices, missing = _nearest_indices(source_x_coords,
+                                                source_y_coords, source_cs,
+                                                target_proj, target_x_points,
+                                                target_y_points,
+                                                approx_tolerance)
+        if weights is not None:
+            # The target points without any weights have no value.
+            missing = (numpy.diff(weights.indptr) == 0).reshape(target_shape)
+
+        # Do double transform to clip points that do not map back and forth
+        # to the same point to within a fixed fractional offset.
+        invalid = _round_trip_invalid(source_cs, target_proj,
+                                      target_x_points, target_y_points,
+                                      approx_tolerance, source_points)
+        self._set(method, source_shape, target_shape, missing | invalid,
+                  indices=indices, weights=weights)
+
+    def _set(self, method, source_shape, target_shape, mask, indices=None,
+             weights=None):
+        #: The method of regridding.
+        self.method = method
+        #: The shape of the source grid.
+        self.source_shape = tuple(int(n) for n in source_shape)
+        #: The shape of the target grid.
+        self.target_shape = tuple(int(n) for n in target_shape)
+        #: The flat index of the source point for each target point, for
+        #: the 'nearest' method.
+        self.indices = indices
+        #: The sparse matrix of the weights of the source points for each
+        #: target point, for the other methods.
+        self.weights = weights
+        #: True for the target points which have no value.
+        self.mask = mask
+
+    def _apply(self, array, axis):
+        """
+        Returns the regridded values of the 2d array, whose source points
+        are along the given axis.
+
+        """
+        if self.indices is not None:
+            return array.take(self.indices.reshape(-1), axis=axis)
+
+        if axis == -1:
+            array = array.T
+        if numpy.ma.is_masked(array):
+            # Weight only the source points which have values.
+            present = numpy.logical_not(numpy.ma.getmaskarray(array))
+            total = self.weights.dot(present.astype(numpy.float64))
+            values = self.weights.dot(array.filled(0))
+            with numpy.errstate(invalid='ignore', divide='ignore'):
+                result = numpy.ma.array(values / total, mask=total == 0)
+        else:
+            result = self.weights.dot(numpy.asarray(array))
+        if array.dtype.kind in 'iu':
+            result = numpy.round(result).astype(array.dtype)
+        if axis == -1:
+            result = result.T
+        return result
+
+    def __call__(self, array):
+        """
+        Returns the given array regridded onto the target grid.
+
+        The array may have the shape of the source grid, be a stack of
+        such arrays, e.g. of shape (time, y, x), or have trailing
+        dimensions, e.g. of shape (y, x, bands). The result is masked
+        where the target points have no value.
+
+        """
+        array = numpy.asanyarray(array)
+        source_ndim = len(self.source_shape)
+        if array.shape[:source_ndim] == self.source_shape:
+            # Trailing dimensions, e.g. (y, x) or (y, x, bands).
+            trailing = array.shape[source_ndim:]
+            new_array = self._apply(array.reshape(-1, _product(trailing)), 0)
+            new_array = new_array.reshape(self.target_shape + trailing)
+            mask = self.mask.reshape(self.target_shape +
+                                     (1, ) * len(trailing))
+        elif array.shape[-source_ndim:] == self.source_shape:
+            # Leading dimensions, e.g. (time, y, x).
+            leading = array.shape[:-source_ndim]
+            new_array = self._apply(array.reshape(-1, _product(
+                self.source_shape)), -1)
+            new_array = new_array.reshape(leading + self.target_shape)
+            mask = self.mask
+        else:
+            raise ValueError('Expected an array whose leading or trailing '
+                             'dimensions are {}, got {}'.format(
+                                 self.source_shape, array.shape))
+
+        # Handle missing neighbours using a masked array
+        if numpy.any(mask):
+            mask = mask | numpy.ma.getmaskarray(new_array)
+            new_array = numpy.ma.array(new_array, mask=mask)
+        return new_array
+
+    def save(self, fname):
+        """Saves this Regridder to the given .npz file."""
+        arrays = dict(method=numpy.array(self.method),
+                      source_shape=numpy.array(self.source_shape),
+                      target_shape=numpy.array(self.target_shape),
+                      mask=self.mask)
+        if self.indices is not None:
+            arrays['indices'] = self.indices
         else:
-            new_array = numpy.ma.array(new_array, mask=non_self_inverse_points)
-    return new_array
+            arrays.update(weights_data=self.weights.data,
+                          weights_indices=self.weights.indices,
+                          weights_indptr=self.weights.indptr)
+        numpy.savez(fname, **arrays)
+
+    @classmethod
+    def load(cls, fname):
+        """Returns the Regridder saved in the given .npz file."""
+        data = numpy.load(fname)
+        try:
+            regridder = cls.__new__(cls)
+            if 'indices' in data.files:
+                regridder._set(str(data['method']), data['source_shape'],
+                               data['target_shape'], data['mask'],
+                               indices=data['indices'])
+            else:
+                source_shape = data['source_shape']
+                target_shape = data['target_shape']
+                weights = scipy.sparse.csr_matrix(
+                    (data['weights_data'], data['weights_indices'],
+                     data['weights_indptr']),
+                    shape=(_product(target_shape), _product(source_shape)))
+                regridder._set(str(data['method']), source_shape,
+                               target_shape, data['mask'], weights=weights)
+        finally:
+            data.close()
+        return regridder
+
+
+def _product(shape):
+    """Returns the number of elements in an array of the given shape."""
+    return int(numpy.prod(shape, dtype=numpy.intp))
+
+
+def regrid(array, source_x_coords, source_y_coords, source_cs, target_proj,
+           target_x_points, target_y_points, approx_tolerance=None,
+           method='nearest'):
+    # n.b. source_cs is actually a projection (the coord system of the
+    # source coordinates), but not necessarily the native projection of
+    # the source array (i.e. you can provide a warped image with lat lon
+    # coordinates).
+    #
+    # If approx_tolerance is given, the transformations of the target
+    # grid are approximated to within that many target units (see
+    # approx_transform_points).
+    #
+    # See Regridder for the regrid methods. To regrid many arrays on the
+    # same grids, create a Regridder once and call it for each array.
+    regridder = Regridder(source_x_coords, source_y_coords, source_cs,
+                          target_proj, target_x_points, target_y_points,
+                          approx_tolerance=approx_tolerance, method=method)
+    return regridder(array)
@@ -125,14 +125,14 @@ class GoogleTiles(object):
     def tileextent(self, x_y_z):
         x, y, z = x_y_z
         # this was a copy from tiledomain
-        prj = ccrs.Mercator()
+        prj = self.crs
         x_lim, y_lim = self.tile_bbox(prj, x, y, z, bottom_up=True)
 
         return tuple(x_lim) + tuple(y_lim)
 
     def tiledomain(self, x_y_z):
         x, y, z = x_y_z
-        prj = ccrs.Mercator()
+        prj = self.crs
         x_lim, y_lim = self.tile_bbox(prj, x, y, z, bottom_up=True)
 
         result = ccrs.PlateCarree().transform_points(prj, x_lim.astype(numpy.float64), y_lim.astype(numpy.float64))
@@ -32,9 +32,16 @@ geometry representation of shapely.
 [<shapely.geometry.multipolygon.MultiPolygon object at ...>]
 
 """
+import hashlib
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
 from shapely.geometry import MultiLineString, MultiPolygon, Point, Polygon
 import shapefile
-import os
 
 
 __all__ = ['Reader', 'Record']
@@ -129,6 +136,115 @@ class Record(object):
         return value
 
 
+#: The environment variable which names the directory in which
+#: :meth:`Reader.projected_geometries` caches its results.
+PROJECTED_CACHE_ENV = 'CARTOPY_PROJECTED_CACHE'
+
+#: The most bytes which the projected cache keeps, beyond which its least
+#: recently used entries are removed.
+PROJECTED_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+# The version of the format of the projected cache, which is part of its
+# path so that a change of format never reads old files.
+_PROJECTED_CACHE_VERSION = 'v1'
+
+# The prefix of the directories in which cache entries are written before
+# being moved into place, and the age in seconds after which such a
+# directory is taken to have been left behind by a failed process.
+_PROJECTED_TMP_PREFIX = '.tmp-'
+_PROJECTED_TMP_MAX_AGE = 3600
+
+# The codes which identify each kind of projected geometry in the cache.
+_NONE, _EMPTY, _LINES, _POLYGONS = range(4)
+
+_PROJECTED_ARRAYS = ('types', 'geometry_offsets', 'part_offsets',
+                     'ring_offsets', 'coords')
+
+
+def _geometries_to_arrays(geometries):
+    """
+    Returns a dictionary of the arrays which describe the given projected
+    geometries, or None if any of them can't be described.
+
+    All the coordinates go in a single (N, 2) "coords" array, and each
+    geometry, part (line or polygon), and ring (line or polygon ring) is
+    given by the offsets of its first part, ring, or coordinate.
+
+    """
+    types = []
+    geometry_offsets = [0]
+    part_offsets = [0]
+    ring_offsets = [0]
+    coords = []
+    n_coords = 0
+    for geometry in geometries:
+        if geometry is None:
+            types.append(_NONE)
+            parts = []
+        elif isinstance(geometry, (list, tuple)) and not geometry:
+            types.append(_EMPTY)
+            parts = []
+        elif isinstance(geometry, MultiLineString):
+            types.append(_LINES)
+            parts = [[line] for line in geometry.geoms]
+        elif isinstance(geometry, MultiPolygon):
+            types.append(_POLYGONS)
+            parts = [[polygon.exterior] + list(polygon.interiors)
+                     for polygon in geometry.geoms]
+        else:
+            return None
+        for rings in parts:
+            for ring in rings:
+                ring_coords = numpy.asarray(ring.coords, dtype=numpy.float64)
+                coords.append(ring_coords.reshape(-1, 2))
+                n_coords += len(ring_coords)
+                ring_offsets.append(n_coords)
+            part_offsets.append(len(ring_offsets) - 1)
+        geometry_offsets.append(len(part_offsets) - 1)
+
+    if coords:
+        coords = numpy.concatenate(coords)
+    else:
+        coords = numpy.empty((0, 2))
+    return {'types': numpy.array(types, dtype=numpy.int8),
+            'geometry_offsets': numpy.array(geometry_offsets, dtype=numpy.intp),
+            'part_offsets': numpy.array(part_offsets, dtype=numpy.intp),
+            'ring_offsets': numpy.array(ring_offsets, dtype=numpy.intp),
+            'coords': coords}
+
+
+def _arrays_to_geometries(arrays):
+    """The inverse of :func:`_geometries_to_arrays`."""
+    types = arrays['types']
+    geometry_offsets = arrays['geometry_offsets']
+    part_offsets = arrays['part_offsets']
+    ring_offsets = arrays['ring_offsets']
+    coords = arrays['coords']
+
+    def ring(i):
+        return coords[ring_offsets[i]:ring_offsets[i + 1]]
+
+    geometries = []
+    for i, geometry_type in enumerate(types):
+        parts = range(geometry_offsets[i], geometry_offsets[i + 1])
+        if geometry_type == _NONE:
+            geometry = None
+        elif geometry_type == _EMPTY:
+            geometry = []
+        elif geometry_type == _LINES:
+            geometry = MultiLineString([ring(part_offsets[part])
+                                        for part in parts])
+        else:
+            polygons = []
+            for part in parts:
+                rings = [ring(j) for j in range(part_offsets[part],
+                                                part_offsets[part + 1])]
+                polygons.append((rings[0], rings[1:]))
+            geometry = MultiPolygon(polygons)
+        geometries.append(geometry)
+    return geometries
+
+
 class Reader(object):
     """
     Provides iterator based access to the contents of a shapefile.
@@ -160,6 +276,105 @@ class Reader(object):
             shape = self._reader.shape(i)
             yield _make_geometry(geometry_factory, shape)
 
+    def projected_geometries(self, projection, threshold=None,
+                             cache_dir=None):
+        """
+        Returns the list of the geometries projected into the given
+        projection (see :meth:`cartopy.crs.Projection.project_geometry`).
+
+        If a cache directory is given, or named by the
+        ``CARTOPY_PROJECTED_CACHE`` environment variable, the projected
+        geometries are kept there as arrays of coordinates (see
+        :meth:`projected_arrays`).
+
+        """
+        arrays, geometries = self._projected(projection, threshold,
+                                             cache_dir, as_arrays=False)
+        if geometries is None:
+            geometries = _arrays_to_geometries(arrays)
+        return geometries
+
+    def projected_arrays(self, projection, threshold=None, cache_dir=None):
+        """
+        Returns a dictionary of the arrays which describe the geometries
+        projected into the given projection, or, if they are not all
+        lines or polygons, the list of the projected geometries
+        themselves. Either may be drawn by :func:`mpl_axes_plot`.
+
+        The "coords" array holds the (N, 2) coordinates of every line and
+        polygon ring, and the "ring_offsets" array the offset of the
+        start of each, followed by N, as taken by
+        :func:`cartopy.mpl_integration.patch.lines_to_path`.
+
+        If a cache directory is given, or named by the
+        ``CARTOPY_PROJECTED_CACHE`` environment variable, the arrays are
+        kept there, keyed on the shapefile's path and modification time,
+        and the projection and threshold. Later calls memory-map them.
+        The threshold is then rounded down to a power of two times the
+        projection's default threshold, so that similar thresholds share
+        the same entry. The least recently used entries are removed once
+        the cache holds more than :data:`PROJECTED_CACHE_MAX_BYTES`.
+
+        """
+        arrays, geometries = self._projected(projection, threshold,
+                                             cache_dir, as_arrays=True)
+        if arrays is None:
+            return geometries
+        return arrays
+
+    def _projected(self, projection, threshold, cache_dir, as_arrays):
+        """
+        Returns the arrays which describe the projected geometries, or
+        None if they are not all lines or polygons (or weren't asked for),
+        and the projected geometries, or None if they came from the cache.
+
+        """
+        path, threshold = self._projected_cache_path(projection, threshold,
+                                                     cache_dir)
+        arrays = _load_projected(path)
+        if arrays is not None:
+            return arrays, None
+
+        geometries = self._project(projection, threshold)
+        if path is not None or as_arrays:
+            arrays = _geometries_to_arrays(geometries)
+            if path is not None and arrays is not None:
+                _save_projected(path, arrays)
+        return arrays, geometries
+
+    def _project(self, projection, threshold):
+        return [None if geometry is None else
+                projection.project_geometry(geometry, threshold=threshold)
+                for geometry in self.geometries()]
+
+    def _projected_cache_path(self, projection, threshold, cache_dir):
+        """
+        Returns the path of the cache entry of the projected geometries,
+        or None if there is no cache directory (or the geometries are
+        points, which aren't cached), and the threshold to project them
+        with.
+
+        The threshold is only rounded (see :func:`_cache_threshold`) when
+        there is a cache entry.
+
+        """
+        if threshold is None or not threshold > 0:
+            threshold = projection.threshold
+        if cache_dir is None:
+            cache_dir = os.environ.get(PROJECTED_CACHE_ENV)
+        if not cache_dir or self._reader.shapeType == shapefile.POINT:
+            return None, threshold
+        threshold = _cache_threshold(projection, threshold)
+        shp_path = os.path.abspath(self._reader.shp.name)
+        stat = os.stat(shp_path)
+        key = hashlib.sha1(repr((
+            shp_path, stat.st_mtime, stat.st_size,
+            type(projection).__name__, projection.proj4_init,
+            hashlib.sha1(projection.domain.wkb).hexdigest(),
+            float(threshold)))).hexdigest()
+        return (os.path.join(cache_dir, _PROJECTED_CACHE_VERSION, key),
+                threshold)
+
     def records(self):
         """Returns an iterator of Record instances."""
         geometry_factory = self._geometry_factory
@@ -172,6 +387,117 @@ class Reader(object):
             yield Record(shape_record.shape, geometry_factory, attributes, fields)
 
 
+def _cache_threshold(projection, threshold):
+    """
+    Returns the given threshold rounded down to a power of two times the
+    projection's default threshold.
+
+    """
+    default = projection.threshold
+    return default * 2.0 ** math.floor(math.log(threshold / float(default),
+                                                2))
+
+
+def _load_projected(path):
+    """
+    Returns the memory-mapped arrays of the given cache entry, or None if
+    there is no such entry, or it can't be read.
+
+    """
+    if path is None or not os.path.isdir(path):
+        return None
+    arrays = {}
+    try:
+        for name in _PROJECTED_ARRAYS:
+            filename = os.path.join(path, name + '.npy')
+            try:
+                arrays[name] = numpy.load(filename, mmap_mode='r')
+            except ValueError:
+                # Empty arrays can't be memory-mapped.
+                arrays[name] = numpy.load(filename)
+    except (IOError, OSError, ValueError):
+        # The entry may have just been removed by another process (see
+        # _prune_projected), or be unreadable, in which case the
+        # geometries are simply projected again.
+        return None
+    try:
+        # Mark the entry as recently used (see _prune_projected).
+        os.utime(path, None)
+    except OSError:
+        pass
+    return arrays
+
+
+def _entry_size(path):
+    size = 0
+    for name in os.listdir(path):
+        try:
+            size += os.path.getsize(os.path.join(path, name))
+        except OSError:
+            pass
+    return size
+
+
+def _prune_projected(cache_dir, max_bytes):
+    """
+    Removes the least recently used entries of the given directory until
+    they take up no more than max_bytes.
+
+    Entries which are still being written (see :func:`_save_projected`)
+    are left alone, unless they are so old that they must have been
+    abandoned.
+
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(_PROJECTED_TMP_PREFIX):
+            try:
+                age = time.time() - os.path.getmtime(path)
+            except OSError:
+                continue
+            if age > _PROJECTED_TMP_MAX_AGE:
+                shutil.rmtree(path, ignore_errors=True)
+            continue
+        try:
+            entries.append((os.path.getmtime(path), _entry_size(path), path))
+        except OSError:
+            # Another process may have just removed it.
+            pass
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def _save_projected(path, arrays):
+    # Write to a temporary directory, and then move it into place, so that
+    # other processes never see a partial cache entry.
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        try:
+            os.makedirs(parent)
+        except OSError:
+            # Another process may have just made it.
+            if not os.path.isdir(parent):
+                raise
+    tmp_path = tempfile.mkdtemp(prefix=_PROJECTED_TMP_PREFIX, dir=parent)
+    try:
+        for name in _PROJECTED_ARRAYS:
+            numpy.save(os.path.join(tmp_path, name + '.npy'), arrays[name])
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another process may have got there first.
+        if not os.path.isdir(path):
+            raise
+    finally:
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+    _prune_projected(parent, PROJECTED_CACHE_MAX_BYTES)
+
+
 def natural_earth(resolution='110m', category='physical', name='coastline', data_dir=None):
     """
     Returns the path to the requested natural earth shapefile, downloading and unziping if necessary.
@@ -217,15 +543,41 @@ def natural_earth(resolution='110m', category='physical', name='coastline', data
     return shapefiles[0]
 
 
-def mpl_axes_plot(axes, geometries, facecolor='none', **kwargs):
-    """Plot lines on the given axes, given the geometries."""
+def mpl_axes_plot(axes, geometries, facecolor='none', threshold=None,
+                  projected=False, extent=None, **kwargs):
+    """
+    Plot lines on the given axes, given the geometries.
+
+    The geometries are projected with the given threshold and extent (see
+    :meth:`cartopy.crs.Projection.project_geometry`), unless they are
+    already ``projected`` into the axes' projection. Projected geometries
+    may also be given as the arrays returned by
+    :meth:`Reader.projected_arrays`, which are drawn without building any
+    shapely geometries. A threshold of
+    'auto' is derived from the current resolution of the axes (see
+    :meth:`cartopy.mpl_integration.geoaxes.GeoAxes.projection_threshold`).
+
+    """
     # TODO: This interface should be exposed nicely on the geoaxes itself.
     import matplotlib.collections as mcollections
     import cartopy.mpl_integration.patch as patch
 
-    paths = []
-    for geom in geometries:
-        paths.extend(patch.geos_to_path(axes.projection.project_geometry(geom)))
+    if not projected:
+        if threshold == 'auto':
+            threshold = axes.projection_threshold()
+        geometries = (axes.projection.project_geometry(geom,
+                                                       threshold=threshold,
+                                                       extent=extent)
+                      for geom in geometries)
+
+    if projected and isinstance(geometries, dict):
+        paths = [patch.lines_to_path(geometries['coords'],
+                                     geometries['ring_offsets'])]
+    else:
+        paths = []
+        for geom in geometries:
+            if geom is not None:
+                paths.extend(patch.geos_to_path(geom))
     axes.add_collection(mcollections.PathCollection(paths, facecolor=facecolor, **kwargs), autolim=False)
 
 
@@ -29,6 +29,7 @@ import shapely.geometry
 import cartopy
 import cartopy.crs as ccrs
 import cartopy.img_transform
+import cartopy.trace
 import cartopy.mpl_integration.patch as patch
 
 
@@ -82,23 +83,54 @@ class InterProjectionTransform(mtransforms.Transform):
         if path.vertices.shape == (1, 2):
             return mpath.Path(self.transform(path.vertices))
 
-        transformed_geoms = []
+        points = []
+        codes = []
+        # The threshold and extent are always the projection's defaults
+        # here, so project_geometry is only needed for its cache.
+        cached = ccrs._geometry_cache is not None
         for geom in patch.path_to_geos(path):
-            transformed_geoms.append(self.target_projection.project_geometry(geom, self.source_projection))
-
-        if not transformed_geoms:
+            if (geom.geom_type in ('LineString', 'MultiLineString') and
+                    not cached):
+                # Lines only need their vertices for drawing, so skip
+                # creating the projected geometries.
+                lines = [geom] if geom.geom_type == 'LineString' else geom
+                line_path = patch.lines_to_path(*cartopy.trace.project_linear_many(
+                    lines, self.source_projection, self.target_projection, as_arrays=True))
+                points.append(line_path.vertices)
+                codes.append(line_path.codes)
+            else:
+                transformed_geom = self.target_projection.project_geometry(geom, self.source_projection)
+                for geom_path in patch.geos_to_path(transformed_geom):
+                    geom_points, geom_codes = patch.path_segments(geom_path, curves=False, simplify=False)
+                    points.append(geom_points)
+                    codes.append(geom_codes)
+
+        if not points:
             return mpath.Path(numpy.empty([0, 2]))
         else:
-            paths = patch.geos_to_path(transformed_geoms)
-            if not paths:
-                return mpath.Path(numpy.empty([0, 2]))
-            points, codes = zip(*[patch.path_segments(path, curves=False, simplify=False) for path in paths])
             return mpath.Path(numpy.concatenate(points, 0), numpy.concatenate(codes))
 
     def inverted(self):
         return InterProjectionTransform(self.target_projection, self.source_projection)
 
 
+def _valid_points(transform, x, y):
+    """
+    Returns the x and y of the given points after the given transform,
+    leaving out those which could not be transformed.
+
+    """
+    if isinstance(transform, InterProjectionTransform):
+        # The projection reports which points failed.
+        xyz, valid = transform.target_projection.transform_points(
+            transform.source_projection, numpy.asarray(x, dtype=float),
+            numpy.asarray(y, dtype=float), return_valid=True)
+    else:
+        xyz = transform.transform(numpy.vstack([x, y]).T.astype(float))
+        valid = numpy.isfinite(xyz).all(axis=1)
+    return xyz[valid, 0], xyz[valid, 1]
+
+
 class GeoAxes(matplotlib.axes.Axes):
     def __init__(self, *args, **kwargs):
         self.projection = kwargs.pop('map_projection')
@@ -181,6 +213,35 @@ class GeoAxes(matplotlib.axes.Axes):
 
         return u'%.4g, %.4g (%f\u00b0%s, %f\u00b0%s)' % (x, y, abs(lat), ns, abs(lon), ew)
 
+    def projection_threshold(self, pixel_fraction=0.5):
+        """
+        Returns the threshold with which to project geometries for this
+        axes (see :meth:`cartopy.crs.Projection.project_geometry`).
+
+        It is the given fraction of the current size of a pixel, in
+        projected units, so that geometries are projected no more
+        accurately than can be displayed, but it is never finer than the
+        projection's default threshold. A finer threshold must be given
+        explicitly.
+
+        """
+        if (self.ignore_existing_data_limits and self.get_autoscalex_on() and
+                self.get_autoscaley_on()):
+            # The map will be made global when it is drawn.
+            x0, x1 = self.projection.x_limits
+            y0, y1 = self.projection.y_limits
+        else:
+            x0, y0, x1, y1 = self.viewLim.extents
+        width, height = self.bbox.width, self.bbox.height
+        default = self.projection.threshold
+        if not (width > 0 and height > 0):
+            return default
+        pixel_size = max(abs(x1 - x0) / width, abs(y1 - y0) / height)
+        threshold = pixel_fraction * pixel_size
+        if not numpy.isfinite(threshold):
+            return default
+        return max(threshold, default)
+
     def coastlines(self, resolution='110m', **kwargs):
         """
         Adds coastal **outlines** to the current axes from the Natural Earth
@@ -191,6 +252,14 @@ class GeoAxes(matplotlib.axes.Axes):
             * resolution - a named resolution to use from the Natural Earth
                            dataset. Currently can be one of "110m", "50m", and
                            "10m".
+            * threshold  - the projection threshold. Defaults to that of the projection, or
+                           'auto' to derive a coarser one from the current size of a pixel
+                           (see :meth:`projection_threshold`).
+            * extent     - the (x0, x1, y0, y1) extent of the region of interest, in the
+                           axes' projection, e.g. ``ax.get_extent(ax.projection)``. Coastlines
+                           which lie outside a padded estimate of it are not
+                           projected (see
+                           :meth:`cartopy.crs.Projection.project_geometry`).
 
         .. note::
 
@@ -205,7 +274,19 @@ class GeoAxes(matplotlib.axes.Axes):
                                                    category='physical',
                                                    name='coastline')
 
-        shapereader.mpl_axes_plot(self, shapereader.Reader(coastline_path).geometries(), **kwargs)
+        threshold = kwargs.pop('threshold', None)
+        if threshold == 'auto':
+            threshold = self.projection_threshold()
+        extent = kwargs.pop('extent', None)
+        reader = shapereader.Reader(coastline_path)
+        if extent is None:
+            # NB. This uses the cache of projected geometries, if there is one
+            # (see cartopy.io.shapereader.Reader.projected_arrays).
+            geometries = reader.projected_arrays(self.projection, threshold=threshold)
+            shapereader.mpl_axes_plot(self, geometries, projected=True, **kwargs)
+        else:
+            shapereader.mpl_axes_plot(self, reader.geometries(), threshold=threshold,
+                                      extent=extent, **kwargs)
 
     # TODO: expose an interface similar to ax.add_image for shapely things, 
     # and another for adding paths/patches (consider the land shapefile and gshhs as the primary usecases).
@@ -402,6 +483,10 @@ class GeoAxes(matplotlib.axes.Axes):
         Extra kwarg:
         transform - is actually a PROJECTION NOT a transform
         regrid_shape - default is (750, 375). But may be changed to "auto" in the future...
+        regrid_tolerance - if given, the regridding transformations are approximated to within this many
+                           native units, which is much faster for large regrid shapes (default: None).
+        regrid_method - one of 'nearest', 'bilinear' or 'conservative' (default: 'nearest'). See
+                        :class:`cartopy.img_transform.Regridder`.
         extent = (left, right, bottom, top) - transform coordinates for the extent of the source image.
         target_extent = (left, right, bottom, top) - native coordinates for the extent of the desired image.
         origin - default is changed to 'lower'
@@ -410,6 +495,8 @@ class GeoAxes(matplotlib.axes.Axes):
         """
         transform = kwargs.pop('transform', None)
         regrid_shape = kwargs.pop('regrid_shape', (750, 375))
+        regrid_tolerance = kwargs.pop('regrid_tolerance', None)
+        regrid_method = kwargs.pop('regrid_method', 'nearest')
         update_datalim = kwargs.pop('update_datalim', True)
 
         kwargs.setdefault('origin', 'lower')
@@ -437,6 +524,8 @@ class GeoAxes(matplotlib.axes.Axes):
                                                            target_proj=self.projection,
                                                            target_res=regrid_shape,
                                                            target_extent=self.get_extent(self.projection),
+                                                           approx_tolerance=regrid_tolerance,
+                                                           method=regrid_method,
                                                            )
             # as a workaround to a matplotlib limitation, turn any images which are RGB with a mask into 
             # RGBA images with an alpha channel.
@@ -619,15 +708,7 @@ class GeoAxes(matplotlib.axes.Axes):
 
         if t and any(t.contains_branch_seperately(self.transData)):
             trans_to_data = t - self.transData
-            pts = np.vstack([X, Y]).T.astype(np.float)
-            transformed_pts = trans_to_data.transform(pts)
-            X = transformed_pts[..., 0]
-            Y = transformed_pts[..., 1]
-
-            # XXX Not a mpl 1.2 thing...
-            no_inf = (X != np.inf) & (Y != np.inf)
-            X = X[no_inf]
-            Y = Y[no_inf]
+            X, Y = _valid_points(trans_to_data, X, Y)
 
         minx = np.amin(X)
         maxx = np.amax(X)
@@ -752,15 +833,7 @@ class GeoAxes(matplotlib.axes.Axes):
 
         if t and any(t.contains_branch_seperately(self.transData)):
             trans_to_data = t - self.transData
-            pts = np.vstack([x, y]).T.astype(np.float)
-            transformed_pts = trans_to_data.transform(pts)
-            x = transformed_pts[..., 0]
-            y = transformed_pts[..., 1]
-            
-            # XXX Not a mpl 1.2 thing...
-            no_inf = (x != np.inf) & (y != np.inf)
-            x = x[no_inf]
-            y = y[no_inf]
+            x, y = _valid_points(trans_to_data, x, y)
         
         minx = np.amin(x)
         maxx = np.amax(x)
@@ -72,6 +72,19 @@ def geos_to_path(shape):
 
 
 
+def lines_to_path(coords, offsets):
+    """
+    Return a path of the lines given by an (N, 2) array of vertices, and the
+    offsets of the start of each line into it (followed by N), as returned by
+    :func:`cartopy.trace.project_linear` with ``as_arrays=True``.
+
+    """
+    codes = np.empty(len(coords), dtype=Path.code_type)
+    codes.fill(Path.LINETO)
+    codes[offsets[:-1]] = Path.MOVETO
+    return Path(coords, codes)
+
+
 from matplotlib.collections import PatchCollection
 import matplotlib.patches as mpatches
 import matplotlib.path as mpath
@@ -16,6 +16,9 @@
 # along with cartopy.  If not, see <http://www.gnu.org/licenses/>.
 
 import operator
+import os
+import shutil
+import tempfile
 import unittest
 
 import matplotlib
@@ -81,6 +84,213 @@ class TestRegrid(unittest.TestCase):
                                target_proj, target_x, target_y)
 
 
+def test_source_outside_projection():
+    # An irregular source, none of whose points can be transformed.
+    source_x, source_y = numpy.meshgrid(numpy.linspace(0, 1, 10) ** 2 * 10,
+                                        numpy.linspace(100, 120, 5))
+    data = numpy.arange(source_x.size).reshape(source_x.shape)
+    target_proj = ccrs.PlateCarree()
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(target_proj,
+                                                                  8, 4)
+    result = cartopy.img_transform.regrid(data, source_x, source_y,
+                                          ccrs.Geodetic(), target_proj,
+                                          target_x, target_y)
+    assert result.shape == (4, 8)
+    assert numpy.ma.getmaskarray(result).all()
+
+
+def test_round_trip_invalid_separable():
+    # The first row of the target grid is at a pole, so it has no
+    # Mercator coordinates, but the rest of the grid does.
+    target_x, target_y = numpy.meshgrid(numpy.linspace(-170, 170, 35),
+                                        numpy.linspace(-90, 80, 18))
+    invalid = cartopy.img_transform._round_trip_invalid(ccrs.Mercator(),
+                                                        ccrs.PlateCarree(),
+                                                        target_x, target_y)
+    assert invalid[0].all()
+    assert not invalid[1:].any()
+
+
+def test_regridder():
+    source_proj = ccrs.PlateCarree()
+    source_x, source_y, _ = cartopy.img_transform.mesh_projection(source_proj,
+                                                                  40, 20)
+    target_proj = ccrs.Robinson()
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(target_proj,
+                                                                  30, 15)
+    regridder = cartopy.img_transform.Regridder(source_x, source_y,
+                                                source_proj, target_proj,
+                                                target_x, target_y)
+    data = numpy.arange(3 * 20 * 40, dtype=numpy.float64)
+
+    # The same result as regrid, for each layout of the data.
+    for shape in [(20, 40), (20, 40, 3), (3, 20, 40)]:
+        array = data.reshape(shape)
+        expected = cartopy.img_transform.regrid(array, source_x, source_y,
+                                                source_proj, target_proj,
+                                                target_x, target_y)
+        result = regridder(array)
+        numpy.testing.assert_array_equal(numpy.ma.getmaskarray(result),
+                                         numpy.ma.getmaskarray(expected))
+        numpy.testing.assert_array_equal(result, expected)
+
+    # Each time step of a stack is regridded as if on its own.
+    stack = regridder(data.reshape(3, 20, 40))
+    assert stack.shape == (3, 15, 30)
+    numpy.testing.assert_array_equal(stack[1],
+                                     regridder(data.reshape(3, 20, 40)[1]))
+
+    with numpy.testing.assert_raises(ValueError):
+        regridder(data[:30 * 20].reshape(20, 30))
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        fname = os.path.join(tmp_dir, 'regridder.npz')
+        regridder.save(fname)
+        loaded = cartopy.img_transform.Regridder.load(fname)
+        array = data[:20 * 40].reshape(20, 40)
+        numpy.testing.assert_array_equal(loaded(array), regridder(array))
+        numpy.testing.assert_array_equal(loaded.mask, regridder.mask)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_regular_source():
+    # A global source, regridded onto a target which is shifted by 180
+    # degrees, so that the source x axis must wrap around.
+    source_proj = ccrs.PlateCarree()
+    source_x, source_y, _ = cartopy.img_transform.mesh_projection(source_proj,
+                                                                  36, 18)
+    data = numpy.arange(18 * 36).reshape(18, 36)
+    target_proj = ccrs.PlateCarree(central_longitude=180)
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(target_proj,
+                                                                  36, 18)
+    result = cartopy.img_transform.regrid(data, source_x, source_y,
+                                          source_proj, target_proj,
+                                          target_x, target_y)
+    assert not numpy.ma.is_masked(result)
+    numpy.testing.assert_array_equal(result, numpy.roll(data, 18, axis=1))
+
+    # The same as the nearest neighbour search of an irregular source.
+    target_proj = ccrs.Robinson()
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(target_proj,
+                                                                  40, 20)
+    indices, mask, _ = cartopy.img_transform._regular_indices(
+        cartopy.img_transform._regular_axes(source_x, source_y),
+        source_x.shape, source_proj, target_proj, target_x, target_y)
+    nearest, nearest_mask = cartopy.img_transform._nearest_indices(
+        source_x, source_y, source_proj, target_proj, target_x, target_y)
+    numpy.testing.assert_array_equal(mask, nearest_mask)
+    valid = numpy.logical_not(mask)
+    assert (indices[valid] == nearest[valid]).mean() > 0.95
+
+    # Target points beyond a regional source have no value.
+    source_x, source_y = numpy.meshgrid(numpy.arange(-10, 10.5),
+                                        numpy.arange(40, 60.5))
+    data = numpy.ones(source_x.shape)
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(source_proj,
+                                                                  36, 18)
+    result = cartopy.img_transform.regrid(data, source_x, source_y,
+                                          source_proj, source_proj,
+                                          target_x, target_y)
+    assert 0 < numpy.ma.count(result) < result.size
+
+
+def test_regrid_methods():
+    proj = ccrs.PlateCarree()
+    source_x, source_y, _ = cartopy.img_transform.mesh_projection(proj,
+                                                                  36, 18)
+    data = numpy.arange(18 * 36, dtype=numpy.float64).reshape(18, 36)
+
+    # Bilinear interpolation reproduces a linear field, and wraps around
+    # between the first and last columns.
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(proj,
+                                                                  72, 36)
+    linear = numpy.tile(numpy.arange(36, dtype=numpy.float64), (18, 1))
+    result = cartopy.img_transform.regrid(linear, source_x, source_y, proj,
+                                          proj, target_x, target_y,
+                                          method='bilinear')
+    numpy.testing.assert_allclose(result[5, 1:-1],
+                                  numpy.arange(70) * 0.5 + 0.25)
+    numpy.testing.assert_allclose(result[5, [0, -1]], [8.75, 26.25])
+
+    # Conservative regridding onto cells of 2x2 source cells is their
+    # mean, and ignores masked source points.
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(proj,
+                                                                  18, 9)
+    regridder = cartopy.img_transform.Regridder(source_x, source_y, proj,
+                                                proj, target_x, target_y,
+                                                method='conservative')
+    expected = data.reshape(9, 2, 18, 2).mean(axis=3).mean(axis=1)
+    numpy.testing.assert_allclose(regridder(data), expected)
+    masked = numpy.ma.array(data, mask=data < 36)
+    numpy.testing.assert_allclose(regridder(masked)[0],
+                                  data[1].reshape(18, 2).mean(axis=1))
+
+    # Integer images keep their type.
+    rgb = numpy.arange(18 * 36 * 3, dtype=numpy.uint8).reshape(18, 36, 3)
+    assert regridder(rgb).dtype == numpy.uint8
+
+    with numpy.testing.assert_raises(ValueError):
+        cartopy.img_transform.Regridder(source_x, source_y, proj, proj,
+                                        target_x, target_y, method='cubic')
+
+
+def test_warp_img():
+    source_proj = ccrs.PlateCarree()
+    source_x, source_y, _ = cartopy.img_transform.mesh_projection(source_proj,
+                                                                  36, 18)
+    rgb = numpy.arange(18 * 36 * 3, dtype=numpy.uint8).reshape(18, 36, 3)
+    target_proj = ccrs.Robinson()
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(target_proj,
+                                                                  40, 20)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        # An image file, whose first row is at the top.
+        source = os.path.join(tmp_dir, 'source.npy')
+        numpy.save(source, rgb[::-1])
+        target = os.path.join(tmp_dir, 'target.npy')
+        for method in ['nearest', 'bilinear']:
+            expected = cartopy.img_transform.regrid(rgb, source_x, source_y,
+                                                    source_proj, target_proj,
+                                                    target_x, target_y,
+                                                    method=method)
+            result, extent = cartopy.img_transform.warp_img(
+                source, target_proj, source_proj, target_res=(40, 20),
+                block_shape=(7, 9), out=target, method=method)
+            assert isinstance(result, numpy.memmap)
+            numpy.testing.assert_array_equal(numpy.load(target),
+                                             numpy.ma.filled(expected, 0))
+            del result
+
+        # An array, whose first row is at the bottom.
+        result, _ = cartopy.img_transform.warp_img(
+            rgb, target_proj, source_proj, target_res=(40, 20),
+            source_origin='lower', block_shape=(20, 13))
+        expected = cartopy.img_transform.regrid(rgb, source_x, source_y,
+                                                source_proj, target_proj,
+                                                target_x, target_y)
+        numpy.testing.assert_array_equal(result, numpy.ma.filled(expected, 0))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_approx_transform_points():
+    source_cs = ccrs.Geodetic()
+    target_proj = ccrs.Robinson()
+    target_x, target_y, _ = cartopy.img_transform.mesh_projection(target_proj,
+                                                                  300, 150)
+    exact = source_cs.transform_points(target_proj, target_x, target_y)
+    approx = cartopy.img_transform.approx_transform_points(source_cs,
+                                                           target_proj,
+                                                           target_x,
+                                                           target_y, 1e-3)
+    finite = numpy.isfinite(exact)
+    numpy.testing.assert_array_equal(numpy.isfinite(approx), finite)
+    assert numpy.abs(approx[finite] - exact[finite]).max() <= 1e-3
+
+
 def image_comparison(baseline_images=None, extensions=('png', ), tol=1e-8):
     # changes the mpl default to only use PNGs, and increases the tolerance to be highly rigorous.
     return mpl_image_comparison(baseline_images, extensions, tol)
@@ -173,6 +173,39 @@ def test_cursor_values():
     r = ax.format_coord(x, y)
     assert_equal(r.encode('ascii', 'ignore'), '1.606e+07, 2.363e+06 (22.095524N, 173.709136E)')
 
+def test_projection_threshold():
+    # A large axes never gets a finer threshold than the projection's.
+    fig = plt.figure(figsize=(20, 10), dpi=100)
+    ax = fig.add_axes([0, 0, 1, 1], projection=ccrs.PlateCarree())
+    assert_equal(ax.projection_threshold(), ax.projection.threshold)
+    plt.close(fig)
+
+    # A thumbnail gets a coarser one.
+    fig = plt.figure(figsize=(1, 0.5), dpi=100)
+    ax = fig.add_axes([0, 0, 1, 1], projection=ccrs.PlateCarree())
+    assert ax.projection_threshold() > ax.projection.threshold
+    plt.close(fig)
+
+
+def test_transform_path_geometry_cache():
+    import matplotlib.path as mpath
+    from cartopy.mpl_integration.geoaxes import InterProjectionTransform
+    transform = InterProjectionTransform(ccrs.Geodetic(), ccrs.Robinson())
+    path = mpath.Path([[-10, 30], [10, 60], [40, 50]])
+    uncached = transform.transform_path_non_affine(path)
+    ccrs.enable_geometry_cache()
+    try:
+        first = transform.transform_path_non_affine(path)
+        second = transform.transform_path_non_affine(path)
+        stats = ccrs.geometry_cache_stats()
+    finally:
+        ccrs.disable_geometry_cache()
+    # Lines are drawn from the cache when it is enabled.
+    assert_equal(stats['hits'], 1)
+    np.testing.assert_array_almost_equal(first.vertices, uncached.vertices)
+    np.testing.assert_array_equal(second.vertices, first.vertices)
+
+
 #
 #@image_comparison(baseline_images=['image_transform'])
 #def test_image_transforms():
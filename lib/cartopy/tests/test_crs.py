@@ -20,6 +20,7 @@ from io import BytesIO
 import pickle
 import unittest
 
+from nose.tools import assert_raises
 import numpy
 
 import cartopy.crs as ccrs
@@ -48,6 +49,236 @@ class TestCRS(unittest.TestCase):
         numpy.testing.assert_array_almost_equal(r_inverted, [lon, lat])
 
 
+def test_hash_and_equality():
+    assert ccrs.PlateCarree() == ccrs.PlateCarree()
+    assert ccrs.PlateCarree() != ccrs.PlateCarree(central_longitude=10)
+    assert ccrs.Geodetic() == ccrs.Geodetic()
+    assert ccrs.Geodetic() != ccrs.PlateCarree()
+    assert hash(ccrs.Mercator()) == hash(ccrs.Mercator())
+    assert hash(ccrs.PlateCarree(0)) == hash(ccrs.PlateCarree(0.0))
+
+    lookup = {ccrs.PlateCarree(): 'pc', ccrs.Geodetic(): 'geod'}
+    assert lookup[ccrs.PlateCarree()] == 'pc'
+    assert lookup[ccrs.Geodetic()] == 'geod'
+
+
+def test_proj4_handle_reuse():
+    ccrs.Robinson(central_longitude=12.5)
+    before = ccrs.proj4_handle_stats()
+    for _ in range(5):
+        ccrs.Robinson(central_longitude=12.5)
+    after = ccrs.proj4_handle_stats()
+    assert after['created'] == before['created']
+    # Robinson also constructs its geodetic counterpart to sample its
+    # boundary, so at least five of the handles were reused.
+    assert after['reused'] - before['reused'] >= 5
+    assert after['registered'] == before['registered']
+
+
+def test_transform_points_nd():
+    pc = ccrs.PlateCarree()
+    geod = ccrs.Geodetic()
+    lons, lats = numpy.meshgrid(numpy.linspace(-170, 170, 5),
+                                numpy.linspace(-80, 80, 4))
+
+    result = pc.transform_points(geod, lons, lats)
+    assert result.shape == (4, 5, 3)
+    numpy.testing.assert_array_almost_equal(result[..., 0], lons)
+    numpy.testing.assert_array_almost_equal(result[..., 1], lats)
+
+    # Non-contiguous, single precision input.
+    result = pc.transform_points(geod, lons.astype(numpy.float32).T,
+                                 lats.astype(numpy.float32).T)
+    assert result.shape == (5, 4, 3)
+    numpy.testing.assert_array_almost_equal(result[..., 0], lons.T, 4)
+
+
+def test_transform_points_out():
+    merc = ccrs.Mercator()
+    geod = ccrs.Geodetic()
+    lons = numpy.array([-45., 0, 45])
+    lats = numpy.array([-30., 0, 30])
+    expected = merc.transform_points(geod, lons, lats)
+
+    out = numpy.empty((3, 3))
+    result = merc.transform_points(geod, lons, lats, out=out)
+    assert result is out
+    numpy.testing.assert_array_equal(out, expected)
+
+    # The result may be transformed back in place.
+    result = geod.transform_points(merc, out[:, 0], out[:, 1], out=out)
+    numpy.testing.assert_array_almost_equal(result[:, 0], lons)
+    numpy.testing.assert_array_almost_equal(result[:, 1], lats)
+
+    # Even with the x and y columns swapped.
+    out[:, 0] = lats
+    out[:, 1] = lons
+    result = merc.transform_points(geod, out[:, 1], out[:, 0], out=out)
+    numpy.testing.assert_array_equal(result, expected)
+
+    with assert_raises(ValueError):
+        merc.transform_points(geod, lons, lats, out=numpy.empty((3, 2)))
+
+
+def test_transform_points_threads():
+    merc = ccrs.Mercator()
+    pc = ccrs.PlateCarree()
+    n = 200001
+    x = numpy.linspace(-179, 179, n)
+    y = numpy.linspace(-170, 170, n)
+    expected = pc.transform_points(merc, x, y, threads=1)
+    result = pc.transform_points(merc, x, y, threads=4)
+    numpy.testing.assert_array_equal(result, expected)
+
+
+def test_default_threads():
+    initial = ccrs.get_default_threads()
+    try:
+        ccrs.set_default_threads(3)
+        assert ccrs.get_default_threads() == 3
+        with assert_raises(ValueError):
+            ccrs.set_default_threads(0)
+    finally:
+        ccrs.set_default_threads(initial)
+
+
+def test_transform_points_valid():
+    ortho = ccrs.Orthographic()
+    geod = ccrs.Geodetic()
+    # The last two points are on the far side of the globe.
+    lons = numpy.array([0., 45, 135, 180])
+    lats = numpy.array([0., 10, 0, 10])
+
+    result, valid = ortho.transform_points(geod, lons, lats,
+                                           return_valid=True)
+    numpy.testing.assert_array_equal(valid, [True, True, False, False])
+    assert numpy.all(numpy.isfinite(result[:2, :2]))
+    assert numpy.all(numpy.isinf(result[2:, :2]))
+
+    result = ortho.transform_points(geod, lons, lats, nan_invalid=True)
+    assert numpy.all(numpy.isnan(result[2:, :2]))
+
+
+def test_transform_point_invalid():
+    ortho = ccrs.Orthographic()
+    x, y = ortho.transform_point(180, 10, ccrs.Geodetic())
+    assert numpy.isnan(x) and numpy.isnan(y)
+
+
+def test_transform_points_fast_paths():
+    lons, lats = numpy.meshgrid(numpy.linspace(-360, 360, 37),
+                                numpy.linspace(-85, 85, 18))
+    crss = [ccrs.Geodetic(), ccrs.PlateCarree(),
+            ccrs.PlateCarree(central_longitude=-45),
+            ccrs.RotatedPole(pole_longitude=177.5, pole_latitude=37.5),
+            ccrs.RotatedGeodetic(pole_longitude=-60, pole_latitude=60)]
+    try:
+        for src_crs in crss:
+            for dest_crs in crss:
+                ccrs.set_fast_paths(True)
+                fast = dest_crs.transform_points(src_crs, lons, lats)
+                ccrs.set_fast_paths(False)
+                slow = dest_crs.transform_points(src_crs, lons, lats)
+                numpy.testing.assert_array_almost_equal(fast, slow,
+                                                        decimal=6)
+    finally:
+        ccrs.set_fast_paths(True)
+    assert ccrs.fast_paths_enabled()
+
+
+def test_transform_grid():
+    x = numpy.linspace(-200, 200, 41)
+    y = numpy.linspace(-90, 90, 19)
+    xx, yy = numpy.meshgrid(x, y)
+    geod = ccrs.Geodetic()
+    for proj in [ccrs.Mercator(), ccrs.PlateCarree(central_longitude=30),
+                 ccrs.Robinson()]:
+        expected, expected_valid = proj.transform_points(geod, xx, yy,
+                                                         return_valid=True)
+        result, valid = proj.transform_grid(geod, x, y, return_valid=True)
+        numpy.testing.assert_array_equal(valid, expected_valid)
+        numpy.testing.assert_array_almost_equal(result[valid],
+                                                expected[valid])
+        # The x coordinates survive an invalid y axis value (e.g. the poles
+        # of Mercator), and vice versa.
+        numpy.testing.assert_array_equal(
+            result[..., 0], numpy.repeat(result[9:10, :, 0], len(y), 0))
+        numpy.testing.assert_array_equal(
+            result[..., 1], numpy.repeat(result[:, 20:21, 1], len(x), 1))
+
+
+def test_geometry_cache():
+    import shapely.geometry as sgeom
+    line = sgeom.LineString([(-10, 30), (10, 60)])
+    proj = ccrs.Robinson()
+    assert ccrs.geometry_cache_stats() is None
+    ccrs.enable_geometry_cache()
+    try:
+        first = proj.project_geometry(line)
+        # An equal geometry, and an equal projection, hit the cache.
+        second = ccrs.Robinson().project_geometry(sgeom.LineString(line))
+        assert second is first
+        assert proj.project_geometry(line, threshold=1e3) is not first
+        stats = ccrs.geometry_cache_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['entries'] == 2
+
+        # Empty results are shared, so must be immutable.
+        osgb = ccrs.OSGB()
+        outside = sgeom.MultiLineString([[(140, -30), (150, -35)],
+                                         [(141, -31), (151, -36)]])
+        empty = osgb.project_geometry(outside)
+        assert empty == ()
+        assert osgb.project_geometry(outside) is empty
+
+        # A budget for a single result.
+        ccrs.enable_geometry_cache(1)
+        key = ccrs._geometry_cache.key(line, proj.as_geodetic(), proj, None)
+        ccrs.enable_geometry_cache(ccrs._geometry_cache.nbytes(key, first))
+        proj.project_geometry(line)
+        # A coarser, and so no larger, result.
+        proj.project_geometry(line, threshold=2e5)
+        assert proj.project_geometry(line) is not first
+        stats = ccrs.geometry_cache_stats()
+        assert stats['hits'] == 0
+        assert stats['evictions'] >= 1
+        assert stats['bytes'] <= stats['max_bytes']
+
+        # Even empty results count against the budget.
+        ccrs.enable_geometry_cache(10000)
+        for i in range(100):
+            assert osgb.project_geometry(outside, threshold=i + 1) == ()
+        stats = ccrs.geometry_cache_stats()
+        assert stats['evictions'] > 0
+        assert stats['bytes'] <= stats['max_bytes']
+    finally:
+        ccrs.disable_geometry_cache()
+    assert ccrs.geometry_cache_stats() is None
+
+
+def test_sampled_boundary():
+    for cls in (ccrs.Robinson, ccrs.InterruptedGoodeHomolosine):
+        first = cls()
+        second = cls()
+        # The boundary and domain are only sampled once.
+        assert second.boundary is first.boundary
+        assert second.domain is first.domain
+        assert second.x_limits == first.x_limits
+        assert second.y_limits == first.y_limits
+
+        other = cls(central_longitude=45)
+        assert other.boundary is not first.boundary
+        assert other.domain.is_valid
+
+    proj = ccrs.Robinson()
+    geodetic = proj.as_geodetic()
+    x0, y0 = proj.transform_point(180, 0, geodetic)
+    numpy.testing.assert_allclose(proj.x_limits, (-x0, x0))
+    x1, y1 = proj.transform_point(0, 90, geodetic)
+    numpy.testing.assert_allclose(proj.y_limits, (-y1, y1))
+
+
 def test_pickle():
     # check that we can pickle a simple CRS
     fh = BytesIO()
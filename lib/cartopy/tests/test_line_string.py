@@ -23,6 +23,7 @@ import numpy
 from shapely import geometry
 
 import cartopy.crs as ccrs
+import cartopy.trace
 
 
 class TestLineString(unittest.TestCase):
@@ -72,6 +73,144 @@ class TestLineString(unittest.TestCase):
         #show(projection, multi_line_string)
         self.assertEqual(len(multi_line_string), 2)
 
+    def test_threshold(self):
+        projection = ccrs.Robinson()
+        line_string = geometry.LineString([(-150, 10), (150, 70)])
+        fine = projection.project_geometry(line_string, threshold=1e3)
+        coarse = projection.project_geometry(line_string, threshold=1e5)
+        n_fine = sum(len(line.coords) for line in fine)
+        n_coarse = sum(len(line.coords) for line in coarse)
+        self.assertLess(n_coarse, n_fine)
+        with self.assertRaises(ValueError):
+            projection.project_geometry(line_string, threshold=0)
+
+    def test_extent(self):
+        projection = ccrs.Robinson()
+        geodetic = projection.as_geodetic()
+        x0, y0 = projection.transform_point(-10, 50, geodetic)
+        x1, y1 = projection.transform_point(2, 60, geodetic)
+        extent = (x0, x1, y0, y1)
+        box = geometry.box(x0, y0, x1, y1)
+
+        far_away = geometry.LineString([(100, -40), (120, -30)])
+        self.assertTrue(projection.project_geometry(far_away,
+                                                    extent=extent).is_empty)
+
+        lons = numpy.linspace(-170, 170, 341)
+        across = geometry.LineString(zip(lons, numpy.linspace(50, 60, 341)))
+        # A geodetic line which enters the extent is kept whole, as its
+        # great circles may leave the envelope of the extent.
+        self.assertTrue(projection.project_geometry(across, extent=extent)
+                        .equals(projection.project_geometry(across)))
+
+        # A planar one is clipped.
+        src_crs = ccrs.PlateCarree()
+        clipped = projection.project_geometry(across, src_crs, extent=extent)
+        full = projection.project_geometry(across, src_crs)
+        self.assertLess(sum(len(line.coords) for line in clipped),
+                        sum(len(line.coords) for line in full))
+        # Within the extent, nothing has changed.
+        self.assertAlmostEqual(clipped.intersection(box).length /
+                               full.intersection(box).length, 1)
+
+    def test_project_linear_many(self):
+        projection = ccrs.Robinson(170.5)
+        src_crs = projection.as_geodetic()
+        line_strings = [geometry.LineString([(-10, 30), (10, 60)]),
+                        geometry.LineString([(150, 0), (-150, 0)]),
+                        geometry.LineString([(-10, 0), (10, 0)])]
+        results = cartopy.trace.project_linear_many(line_strings, src_crs,
+                                                    projection)
+        self.assertEqual(len(results), len(line_strings))
+        for line_string, result in zip(line_strings, results):
+            expected = cartopy.trace.project_linear(line_string, src_crs,
+                                                    projection)
+            self.assertTrue(result.equals(expected))
+
+        multi_line_string = geometry.MultiLineString(line_strings)
+        results = cartopy.trace.project_linear_many(multi_line_string,
+                                                    src_crs, projection)
+        self.assertEqual(len(results), len(line_strings))
+        self.assertEqual(cartopy.trace.project_linear_many([], src_crs,
+                                                           projection), [])
+
+    def test_as_arrays(self):
+        projection = ccrs.Robinson(170.5)
+        src_crs = projection.as_geodetic()
+        line_strings = [geometry.LineString([(-10, 30), (10, 60)]),
+                        geometry.LineString([(150, 0), (-150, 0)])]
+        coords, offsets = cartopy.trace.project_linear_many(
+            line_strings, src_crs, projection, as_arrays=True)
+        expected = [line for line_string in line_strings
+                    for line in cartopy.trace.project_linear(line_string,
+                                                             src_crs,
+                                                             projection)]
+        self.assertEqual(coords.shape, (offsets[-1], 2))
+        self.assertEqual(len(offsets), len(expected) + 1)
+        for i, line in enumerate(expected):
+            numpy.testing.assert_array_equal(
+                coords[offsets[i]:offsets[i + 1]], numpy.array(line.coords))
+
+        coords, offsets = cartopy.trace.project_linear(
+            line_strings[1], src_crs, projection, as_arrays=True)
+        self.assertEqual(list(offsets), [0, len(coords)])
+
+        coords, offsets = cartopy.trace.project_linear_many(
+            [], src_crs, projection, as_arrays=True)
+        self.assertEqual(coords.shape, (0, 2))
+        self.assertEqual(list(offsets), [0])
+
+    def test_stats(self):
+        projection = ccrs.Robinson(170.5)
+        src_crs = projection.as_geodetic()
+        line_strings = [geometry.LineString([(-10, 30), (10, 60)]),
+                        geometry.LineString([(-10, 0), (10, 0)])]
+        self.assertIsNone(cartopy.trace.get_stats())
+        stats = cartopy.trace.enable_stats(per_geometry=True)
+        try:
+            results = cartopy.trace.project_linear_many(line_strings, src_crs,
+                                                        projection)
+            counters = stats.as_dict()
+            self.assertEqual(counters['calls'], 1)
+            self.assertEqual(counters['segments'], 2)
+            self.assertEqual(counters['lines'],
+                             sum(len(result) for result in results))
+            self.assertGreater(counters['bisect_iterations'], 0)
+            self.assertGreater(counters['interpolate_calls'], 0)
+            self.assertEqual(len(stats.geometries), 2)
+            # The edge of the map, at -9.5, splits the second line in two.
+            self.assertEqual(stats.geometries[1][1]['lines'], 2)
+
+            stats.reset()
+            self.assertEqual(stats.as_dict()['segments'], 0)
+            self.assertEqual(stats.geometries, [])
+        finally:
+            self.assertIs(cartopy.trace.disable_stats(), stats)
+        cartopy.trace.project_linear(line_strings[0], src_crs, projection)
+        self.assertEqual(stats.as_dict()['calls'], 0)
+
+    def test_dense_line_skips_bisection(self):
+        projection = ccrs.Robinson()
+        src_crs = projection.as_geodetic()
+        lons = numpy.linspace(-30, 30, 601)
+        line_string = geometry.LineString(zip(lons, numpy.sin(lons) * 5))
+        stats = cartopy.trace.enable_stats()
+        try:
+            multi_line_string = cartopy.trace.project_linear(line_string,
+                                                             src_crs,
+                                                             projection)
+        finally:
+            cartopy.trace.disable_stats()
+        self.assertEqual(len(multi_line_string), 1)
+        self.assertEqual(len(multi_line_string[0].coords), len(lons))
+        counters = stats.as_dict()
+        self.assertEqual(counters['segments'], len(lons) - 1)
+        self.assertEqual(counters['bisect_iterations'], 0)
+        # One projection per vertex, and one per straightness test.
+        self.assertEqual(counters['interpolate_calls'], len(lons) - 1)
+        self.assertEqual(counters['project_calls'],
+                         len(lons) + counters['interpolate_calls'])
+
 
 class FakeProjection(ccrs.PlateCarree):
     def __init__(self, left_offset=0, right_offset=0):
@@ -16,11 +16,13 @@
 # along with cartopy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import threading
 import unittest
 
 import numpy
 from shapely.geometry import Polygon
 import shapely.geometry
+import shapely.ops
 
 import cartopy.crs as ccrs
 
@@ -47,6 +49,23 @@ class TestBoundary(unittest.TestCase):
         # fails.
         multi_polygon = projection.project_geometry(polygon)
 
+    def test_many_boundary_crossings(self):
+        # A comb whose teeth all cross the top of the map gives many lines
+        # to attach to the boundary, which must all end up in one polygon.
+        projection = ccrs.Mercator()
+        teeth = [shapely.geometry.box(x, 50, x + 8, 250)
+                 for x in range(-170, 170, 17)]
+        comb = shapely.ops.unary_union([shapely.geometry.box(-170, 0,
+                                                             170, 100)] +
+                                       teeth)
+        multi_polygon = projection.project_geometry(comb, projection)
+        self.assertEqual(len(multi_polygon), 1)
+        polygon = multi_polygon[0]
+        self.assertTrue(polygon.is_valid)
+        expected = comb.intersection(projection.domain)
+        self.assertAlmostEqual(polygon.symmetric_difference(expected).area,
+                               0, delta=1e-3 * expected.area)
+
     def test_out_of_bounds(self):
         # Check that a polygon that is completely out of the map boundary
         # doesn't produce an empty result.
@@ -87,6 +106,55 @@ class TestMisc(unittest.TestCase):
         self.assertEqual(len(multi_polygon), 1)
         self.assertEqual(len(multi_polygon[0].exterior.coords), 4)
 
+    def test_threads(self):
+        projection = ccrs.Robinson(170.5)
+        polygons = [Polygon([(lon, 30), (lon + 20, 60), (lon + 20, 50)])
+                    for lon in range(-180, 180, 30)]
+        multi_polygon = shapely.geometry.MultiPolygon(polygons)
+        expected = projection.project_geometry(multi_polygon, threads=1)
+        result = projection.project_geometry(multi_polygon, threads=4)
+        self.assertTrue(result.equals(expected))
+
+        results = projection.project_geometries(polygons, threads=4)
+        self.assertEqual(len(results), len(polygons))
+        for polygon, result in zip(polygons, results):
+            self.assertTrue(result.equals(projection.project_geometry(polygon)))
+
+        # The same pool of threads is reused by later calls.
+        pool = ccrs._acquire_thread_pool(4)
+        ccrs._release_thread_pool(pool)
+        projection.project_geometries(polygons, threads=4)
+        projection.project_geometries(polygons, threads=2)
+        self.assertIs(ccrs._acquire_thread_pool(4), pool)
+        ccrs._release_thread_pool(pool)
+
+    def test_concurrent_threads(self):
+        # Calls which need a larger pool must not break the calls which
+        # are still using the smaller one.
+        projection = ccrs.Robinson()
+        polygons = [Polygon([(lon, 30), (lon + 20, 60), (lon + 20, 50)])
+                    for lon in range(-180, 180, 10)]
+        expected = projection.project_geometries(polygons, threads=1)
+        errors = []
+
+        def project(threads):
+            try:
+                for _ in range(5):
+                    results = projection.project_geometries(polygons,
+                                                            threads=threads)
+                    for result, expected_result in zip(results, expected):
+                        assert result.equals(expected_result)
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=project, args=(threads, ))
+                   for threads in range(2, 10)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+
 
 class TestQuality(unittest.TestCase):
     def setUp(self):
@@ -283,6 +351,41 @@ class TestHoles(PolygonTests):
 
         assert len(list(target.project_geometry(poly, source))) == 1
 
+    def test_many_interiors(self):
+        proj = ccrs.PlateCarree()
+        holes = [[(x, -10), (x, 10), (x + 10, 10), (x + 10, -10)]
+                 for x in range(-95, 95, 20)]
+        left = Polygon([(-100, -50), (-100, 50), (0, 50), (0, -50)],
+                       [hole for hole in holes if hole[0][0] < 0])
+        right = Polygon([(0, -50), (0, 50), (100, 50), (100, -50)],
+                        [hole for hole in holes if hole[0][0] > 0])
+        multi_polygon = proj.project_geometry(
+            shapely.geometry.MultiPolygon([left, right]), proj)
+        # Each hole stays with its own polygon.
+        self.assertEqual(len(multi_polygon), 2)
+        self.assertEqual(sorted(len(polygon.interiors)
+                                for polygon in multi_polygon), [5, 5])
+        self.assertAlmostEqual(multi_polygon.area, left.area + right.area,
+                               delta=1e-6 * left.area)
+
+    def test_interior_in_bounds_but_outside(self):
+        # A ring inside the bounds of an L-shaped exterior, but not inside
+        # the exterior itself, is not one of its holes.
+        proj = ccrs.PlateCarree()
+        exterior = shapely.geometry.LinearRing([(0, 0), (0, 40), (10, 40),
+                                                (10, 10), (40, 10), (40, 0)])
+        interior = shapely.geometry.LinearRing([(20, 20), (30, 20),
+                                                (30, 30), (20, 30)])
+        self.assertFalse(exterior.is_ccw)
+        self.assertTrue(interior.is_ccw)
+        multi_polygon = proj._rings_to_multi_polygon([exterior, interior])
+        self.assertEqual(len(multi_polygon), 2)
+        self.assertEqual(len(multi_polygon[0].interiors), 0)
+        # The left over ring is inverted with respect to the boundary.
+        self.assertEqual(len(multi_polygon[1].interiors), 1)
+        self.assertAlmostEqual(multi_polygon[1].area,
+                               proj.domain.area - 100)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -16,10 +16,14 @@
 # along with cartopy.  If not, see <http://www.gnu.org/licenses/>.
 
 import os.path
+import shutil
+import tempfile
 import unittest
 
+import numpy
 from shapely.geometry import MultiPolygon, Polygon
 
+import cartopy.crs as ccrs
 import cartopy.io.shapereader as shp
 
 LAKES_PATH = shp.natural_earth(resolution='110m', category='physical', name='lakes')
@@ -108,5 +112,75 @@ class TestRivers(unittest.TestCase):
         self._assert_geometry(river)
 
 
+class TestProjectedCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def check(self, path):
+        reader = shp.Reader(path)
+        projection = ccrs.Robinson()
+        expected = reader.projected_geometries(projection,
+                                               cache_dir=self.cache_dir)
+        self.assertEqual(len(expected), len(reader))
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'v1'))),
+                         1)
+
+        # The second time round, nothing should be projected.
+        def fail(*args, **kwargs):
+            raise AssertionError('The cache was not used.')
+        projection.project_geometry = fail
+        result = reader.projected_geometries(projection,
+                                             cache_dir=self.cache_dir)
+        self.assertEqual(len(result), len(expected))
+        for geometry, expected_geometry in zip(result, expected):
+            self.assertEqual(geometry.type, expected_geometry.type)
+            self.assertTrue(geometry.equals(expected_geometry))
+
+        # The arrays come straight from the cache.
+        arrays = reader.projected_arrays(projection, cache_dir=self.cache_dir)
+        self.assertIsInstance(arrays['coords'], numpy.memmap)
+        self.assertEqual(arrays['ring_offsets'][-1], len(arrays['coords']))
+
+        # A similar threshold shares the cache entry...
+        reader.projected_arrays(projection, threshold=1.5e5,
+                                cache_dir=self.cache_dir)
+        # ... but a coarser one is a different cache entry.
+        del projection.project_geometry
+        reader.projected_geometries(projection, threshold=2e5,
+                                    cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'v1'))),
+                         2)
+
+        # The least recently used entries are removed beyond the limit,
+        # but not those which are still being written.
+        tmp_path = tempfile.mkdtemp(prefix='.tmp-',
+                                    dir=os.path.join(self.cache_dir, 'v1'))
+        max_bytes = shp.PROJECTED_CACHE_MAX_BYTES
+        shp.PROJECTED_CACHE_MAX_BYTES = 0
+        try:
+            reader.projected_geometries(projection, threshold=4e5,
+                                        cache_dir=self.cache_dir)
+        finally:
+            shp.PROJECTED_CACHE_MAX_BYTES = max_bytes
+        self.assertEqual(os.listdir(os.path.join(self.cache_dir, 'v1')),
+                         [os.path.basename(tmp_path)])
+
+    def test_lakes(self):
+        self.check(LAKES_PATH)
+
+    def test_unreadable_entry(self):
+        # An entry which has been removed by another process while it was
+        # being read is treated as missing.
+        path = os.path.join(self.cache_dir, 'entry')
+        os.mkdir(path)
+        self.assertIsNone(shp._load_projected(path))
+
+    def test_rivers(self):
+        self.check(RIVERS_PATH)
+
+
 if __name__ == '__main__':
     unittest.main()
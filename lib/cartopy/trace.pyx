@@ -21,20 +21,40 @@ cdef extern from "geos_c.h":
     ctypedef struct GEOSGeometry:
         pass
 
-from cartopy._crs cimport CRS
+from libc.string cimport memcpy
+from libcpp.vector cimport vector
 
+from cartopy._crs cimport CRS, _thread_proj4
 
+
+from collections import OrderedDict
+import threading
+
+import numpy as np
+cimport numpy as np
 from shapely.geometry.base import BaseGeometry
 from shapely.geometry import MultiLineString
 from shapely.geometry.base import geom_factory
-from shapely.geos import lgeos
 
 
 cdef extern from "proj_api.h":
     ctypedef void *projPJ
 
 
-cdef extern from "_trace.h":
+cdef extern from "geos_c.h":
+    void finishGEOS_r(GEOSContextHandle_t handle)
+
+
+cdef extern from "_trace.h" nogil:
+    ctypedef struct TraceStats:
+        unsigned long segments
+        unsigned long bisect_iterations
+        unsigned long interpolate_calls
+        unsigned long project_calls
+        unsigned long state_queries
+        unsigned long lines
+        unsigned long points
+
     cdef cppclass Interpolator:
         pass
 
@@ -44,19 +64,69 @@ cdef extern from "_trace.h":
     cdef cppclass CartesianInterpolator:
         CartesianInterpolator(projPJ src_proj, projPJ dest_proj)
 
+    cdef cppclass Domain:
+        Domain(GEOSContextHandle_t handle, GEOSGeometry *g_domain,
+               double xmin, double ymin, double xmax, double ymax)
+
     # XXX Rename? It handles LinearRings too.
     GEOSGeometry *_project_line_string(GEOSContextHandle_t handle,
                                        GEOSGeometry *g_line_string,
                                        Interpolator *interpolator,
-                                       GEOSGeometry *g_domain, double handle)
+                                       Domain *domain, double threshold,
+                                       TraceStats *stats)
+
+    void _project_line_strings(GEOSContextHandle_t handle,
+                               GEOSGeometry **g_line_strings, unsigned int n,
+                               Interpolator *interpolator,
+                               Domain *domain, double threshold,
+                               GEOSGeometry **g_results,
+                               TraceStats *stats)
+
+    void _project_line_strings_arrays(GEOSContextHandle_t handle,
+                                      GEOSGeometry **g_line_strings,
+                                      unsigned int n,
+                                      Interpolator *interpolator,
+                                      Domain *domain, double threshold,
+                                      vector[double] &coords,
+                                      vector[unsigned int] &offsets,
+                                      TraceStats *stats)
+
+    GEOSContextHandle_t _new_geos_context()
 
 # XXX What should go here?
 ctypedef long ptr
 
 
+cdef class _GEOSContext:
+    """
+    Owns a reentrant GEOS context, for the use of a single thread.
+
+    """
+    cdef GEOSContextHandle_t handle
+
+    def __cinit__(self):
+        self.handle = _new_geos_context()
+
+    def __dealloc__(self):
+        if self.handle != NULL:
+            finishGEOS_r(self.handle)
+
+
+# Each thread's GEOS context. Unlike shapely's global context, these can
+# be used without the GIL.
+_thread_state = threading.local()
+
+
+cdef _GEOSContext _thread_geos_context():
+    try:
+        return _thread_state.geos_context
+    except AttributeError:
+        context = _thread_state.geos_context = _GEOSContext()
+        return context
+
+
 cdef GEOSContextHandle_t get_geos_context_handle():
-    cdef ptr handle = lgeos.geos_handle
-    return <GEOSContextHandle_t>handle
+    return _thread_geos_context().handle
 
 
 cdef GEOSGeometry *geos_from_shapely(shapely_geom) except *:
@@ -76,8 +146,237 @@ cdef shapely_from_geos(GEOSGeometry *geom):
     return multi_line_string
 
 
+cdef class _PreparedDomain:
+    """
+    The prepared GEOS geometry, and envelope, of a projection's domain.
+
+    """
+    cdef Domain *domain
+    # The shapely domain from which this was prepared.
+    cdef readonly object geometry
+    # The GEOS context which the domain was prepared with.
+    cdef _GEOSContext context
+
+    def __cinit__(self, geometry):
+        xmin, ymin, xmax, ymax = geometry.bounds
+        self.geometry = geometry
+        self.context = _thread_geos_context()
+        self.domain = new Domain(self.context.handle,
+                                 geos_from_shapely(geometry),
+                                 xmin, ymin, xmax, ymax)
+
+    def __dealloc__(self):
+        del self.domain
+
+
+# The most prepared domains which each thread keeps.
+_MAX_PREPARED_DOMAINS = 16
+
+
+cdef _PreparedDomain _prepared_domain(dest_projection):
+    """
+    Returns the calling thread's prepared domain of the given projection.
+
+    Each thread keeps its most recently used prepared domains, which are
+    freed along with the thread.
+
+    """
+    # NB. GEOS prepared geometries build their indices lazily, so they
+    # must not be shared between threads.
+    cdef _PreparedDomain prepared
+    domain = dest_projection.domain
+    try:
+        prepared_domains = _thread_state.prepared_domains
+    except AttributeError:
+        prepared_domains = _thread_state.prepared_domains = OrderedDict()
+    # NB. Each prepared domain refers to its domain, so the id of a
+    # domain isn't reused while it is in the cache.
+    key = id(domain)
+    prepared = prepared_domains.pop(key, None)
+    if prepared is None:
+        prepared = _PreparedDomain(domain)
+        if len(prepared_domains) >= _MAX_PREPARED_DOMAINS:
+            prepared_domains.popitem(last=False)
+    prepared_domains[key] = prepared
+    return prepared
+
+
+cdef Interpolator *_interpolator(CRS src_crs, CRS dest_projection) except NULL:
+    # Use the calling thread's own proj.4 handles, so the interpolator
+    # can be used without the GIL.
+    cdef projPJ src_proj = _thread_proj4(src_crs)
+    cdef projPJ dest_proj = _thread_proj4(dest_projection)
+    if src_crs.is_geodetic():
+        return <Interpolator *>new SphericalInterpolator(src_proj, dest_proj)
+    else:
+        return <Interpolator *>new CartesianInterpolator(src_proj, dest_proj)
+
+
+class Stats(object):
+    """
+    Counters of the work done by :func:`project_linear` and
+    :func:`project_linear_many`, accumulated over all threads.
+
+    If enabled with ``per_geometry=True``, the :attr:`geometries`
+    attribute lists a ``(geometry, counters)`` tuple for each projected
+    line, where counters is a dictionary of the same counters, which
+    helps to find the geometries which are slow to project.
+
+    """
+    #: The names of the counters.
+    fields = ('segments', 'bisect_iterations', 'interpolate_calls',
+              'project_calls', 'state_queries', 'lines', 'points')
+
+    def __init__(self, per_geometry=False):
+        self.per_geometry = per_geometry
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Sets all the counters to zero."""
+        with self._lock:
+            for field in self.fields:
+                setattr(self, field, 0)
+            self.calls = 0
+            self.geometries = []
+
+    def as_dict(self):
+        """Returns the total counters, and the number of calls, as a dict."""
+        with self._lock:
+            result = dict((field, getattr(self, field))
+                          for field in self.fields)
+            result['calls'] = self.calls
+        return result
+
+    def __repr__(self):
+        counters = self.as_dict()
+        return '<Stats {}>'.format(', '.join(
+            '{}={}'.format(field, counters[field])
+            for field in ('calls',) + self.fields))
+
+    def _add(self, geometries, counters):
+        with self._lock:
+            self.calls += 1
+            for geometry, geometry_counters in zip(geometries, counters):
+                for field in self.fields:
+                    setattr(self, field, getattr(self, field) +
+                            geometry_counters[field])
+                if self.per_geometry:
+                    self.geometries.append((geometry, geometry_counters))
+
+
+# The Stats currently being accumulated, or None if disabled.
+_stats = None
+
+
+def enable_stats(per_geometry=False):
+    """
+    Starts counting the work done when projecting lines, and returns the
+    :class:`Stats` to which it is added.
+
+    Kwargs:
+
+    * per_geometry:
+        Whether to also record the counters of each projected line,
+        along with the line itself. Defaults to False.
+
+    """
+    global _stats
+    _stats = Stats(per_geometry)
+    return _stats
+
+
+def disable_stats():
+    """
+    Stops counting the work done when projecting lines, and returns the
+    final :class:`Stats`, or None if they were not enabled.
+
+    """
+    global _stats
+    stats, _stats = _stats, None
+    return stats
+
+
+def get_stats():
+    """
+    Returns the :class:`Stats` currently being accumulated, or None if
+    they are not enabled.
+
+    """
+    return _stats
+
+
+cdef _add_stats(stats, geometries, vector[TraceStats] &c_stats):
+    cdef unsigned int i
+    # NB. Cython converts each TraceStats struct into a dict.
+    counters = [c_stats[i] for i in range(c_stats.size())]
+    stats._add(geometries, counters)
+
+
+cdef double _threshold(dest_projection, threshold) except? -1:
+    if threshold is None:
+        threshold = dest_projection.threshold
+    if not threshold > 0:
+        raise ValueError('The threshold must be positive, got '
+                         '{!r}.'.format(threshold))
+    return threshold
+
+
+cdef _project_arrays(list geometries, CRS src_crs, dest_projection,
+                     double c_threshold):
+    """
+    Projects the given lines, and returns the vertices of all the
+    resulting lines as an (N, 2) array, along with the offsets of the
+    start of each line into it (followed by N).
+
+    """
+    cdef:
+        GEOSContextHandle_t handle = get_geos_context_handle()
+        Interpolator *interpolator
+        _PreparedDomain prepared
+        vector[GEOSGeometry *] g_linears
+        vector[double] c_coords
+        vector[unsigned int] c_offsets
+        vector[TraceStats] c_stats
+        TraceStats *p_stats = NULL
+        unsigned int i, n = len(geometries)
+        np.ndarray[np.double_t, ndim=2] coords
+        np.ndarray[np.intp_t, ndim=1] offsets
+
+    if n > 0:
+        for geometry in geometries:
+            g_linears.push_back(geos_from_shapely(geometry))
+
+        prepared = _prepared_domain(dest_projection)
+
+        stats = _stats
+        if stats is not None:
+            c_stats.resize(n)
+            p_stats = &c_stats[0]
+
+        interpolator = _interpolator(src_crs, dest_projection)
+        with nogil:
+            _project_line_strings_arrays(handle, &g_linears[0], n,
+                                         interpolator, prepared.domain,
+                                         c_threshold, c_coords, c_offsets,
+                                         p_stats)
+        del interpolator
+        if stats is not None:
+            _add_stats(stats, geometries, c_stats)
+
+    coords = np.empty((c_coords.size() // 2, 2), dtype=np.float64)
+    if c_coords.size():
+        memcpy(&coords[0, 0], &c_coords[0], c_coords.size() * sizeof(double))
+    offsets = np.empty(c_offsets.size() + 1, dtype=np.intp)
+    for i in range(c_offsets.size()):
+        offsets[i] = c_offsets[i]
+    offsets[c_offsets.size()] = coords.shape[0]
+    return coords, offsets
+
+
 def project_linear(geometry not None, CRS src_crs not None,
-                   dest_projection not None):
+                   dest_projection not None, threshold=None,
+                   as_arrays=False):
     """
     Returns the MultiLineString which results from projecting the given
     geometry from the source projection into the destination projection.
@@ -92,27 +391,132 @@ def project_linear(geometry not None, CRS src_crs not None,
     * dest_projection:
         The cartopy.crs.Projection defining the projection for the
         resulting projected line.
+
+    Kwargs:
+
+    * threshold:
+        The maximum distance, in destination projection units, by which
+        the projected line may deviate from the true curve. Defaults to
+        the threshold of the destination projection.
+    * as_arrays:
+        If True, no GEOS geometries are created, and instead the tuple
+        ``(coords, offsets)`` is returned. coords is an (N, 2) array of
+        the vertices of all the resulting lines, and line i is
+        ``coords[offsets[i]:offsets[i + 1]]``. Defaults to False.
     
     """
     cdef:
-        double threshold = dest_projection.threshold
-        GEOSContextHandle_t handle = get_geos_context_handle()
-        GEOSGeometry *g_linear = geos_from_shapely(geometry)
+        double c_threshold = _threshold(dest_projection, threshold)
+        GEOSContextHandle_t handle
+        GEOSGeometry *g_linear
         Interpolator *interpolator
-        GEOSGeometry *g_domain
+        _PreparedDomain prepared
         GEOSGeometry *g_multi_line_string
+        vector[TraceStats] c_stats
+        TraceStats *p_stats = NULL
 
-    g_domain = geos_from_shapely(dest_projection.domain)
+    if as_arrays:
+        return _project_arrays([geometry], src_crs, dest_projection,
+                               c_threshold)
 
-    if src_crs.is_geodetic():
-        interpolator = <Interpolator *>new SphericalInterpolator(
-                src_crs.proj4, (<CRS>dest_projection).proj4)
-    else:
-        interpolator = <Interpolator *>new CartesianInterpolator(
-                src_crs.proj4, (<CRS>dest_projection).proj4)
+    handle = get_geos_context_handle()
+    g_linear = geos_from_shapely(geometry)
+    prepared = _prepared_domain(dest_projection)
+
+    # Only count the work done if anybody's interested.
+    stats = _stats
+    if stats is not None:
+        c_stats.resize(1)
+        p_stats = &c_stats[0]
+
+    interpolator = _interpolator(src_crs, dest_projection)
 
-    g_multi_line_string = _project_line_string(handle, g_linear,
-                                               interpolator, g_domain, threshold)
+    with nogil:
+        g_multi_line_string = _project_line_string(handle, g_linear,
+                                                   interpolator,
+                                                   prepared.domain,
+                                                   c_threshold, p_stats)
     del interpolator
+    if stats is not None:
+        _add_stats(stats, [geometry], c_stats)
     multi_line_string = shapely_from_geos(g_multi_line_string)
     return multi_line_string
+
+
+def project_linear_many(geometries not None, CRS src_crs not None,
+                        dest_projection not None, threshold=None,
+                        as_arrays=False):
+    """
+    Returns the list of MultiLineStrings which results from projecting
+    each of the given geometries from the source projection into the
+    destination projection.
+
+    This is equivalent to calling :func:`project_linear` for each
+    geometry, but the interpolator is only set up once.
+
+    Args:
+
+    * geometries:
+        A sequence of shapely LineStrings and/or LinearRings, or a
+        MultiLineString, to be projected.
+    * src_crs:
+        The cartopy.crs.CRS defining the coordinate system of the lines
+        to be projected.
+    * dest_projection:
+        The cartopy.crs.Projection defining the projection for the
+        resulting projected lines.
+
+    Kwargs:
+
+    * threshold:
+        As for :func:`project_linear`.
+    * as_arrays:
+        If True, returns the ``(coords, offsets)`` arrays of the lines
+        resulting from all the geometries, as for :func:`project_linear`.
+        Defaults to False.
+
+    """
+    cdef:
+        double c_threshold = _threshold(dest_projection, threshold)
+        GEOSContextHandle_t handle = get_geos_context_handle()
+        Interpolator *interpolator
+        _PreparedDomain prepared
+        vector[GEOSGeometry *] g_linears
+        vector[GEOSGeometry *] g_results
+        vector[TraceStats] c_stats
+        TraceStats *p_stats = NULL
+        unsigned int i, n
+
+    if hasattr(geometries, 'geoms'):
+        geometries = geometries.geoms
+    # NB. Keep a reference to the shapely geometries for the duration of
+    # the call, as we borrow their GEOS geometries.
+    geometries = list(geometries)
+    if as_arrays:
+        return _project_arrays(geometries, src_crs, dest_projection,
+                               c_threshold)
+    n = len(geometries)
+    if n == 0:
+        return []
+
+    for geometry in geometries:
+        g_linears.push_back(geos_from_shapely(geometry))
+    g_results.resize(n)
+
+    prepared = _prepared_domain(dest_projection)
+
+    stats = _stats
+    if stats is not None:
+        c_stats.resize(n)
+        p_stats = &c_stats[0]
+
+    interpolator = _interpolator(src_crs, dest_projection)
+    with nogil:
+        _project_line_strings(handle, &g_linears[0], n, interpolator,
+                              prepared.domain, c_threshold, &g_results[0],
+                              p_stats)
+    del interpolator
+    if stats is not None:
+        _add_stats(stats, geometries, c_stats)
+
+    return [shapely_from_geos(g_results[i]) for i in range(n)]
@@ -150,7 +150,7 @@ setup(
     # requires proj4 headers
     ext_modules=[
         Extension('cartopy.trace', ['lib/cartopy/trace.pyx', 'lib/cartopy/_trace.cpp'],
-                  include_dirs=[get_config_var('INCLUDEDIR'), './lib/cartopy'],
+                  include_dirs=[get_config_var('INCLUDEDIR'), './lib/cartopy', numpy.get_include()],
                   libraries=['geos_c', 'proj'],
                   library_dirs=[get_config_var('LIBDIR')],
                   runtime_library_dirs=[get_config_var('LIBDIR')],